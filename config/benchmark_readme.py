@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for the ZMK keymap parser and README generator.
+
+Generates synthetic keymaps of configurable size, times each phase of
+generate_readme.py repeatedly and reports throughput, latency percentiles
+and peak memory as JSON. A previous JSON report can be passed as a
+baseline to flag regressions.
+
+Usage:
+    python3 benchmark_readme.py                          # default sizes
+    python3 benchmark_readme.py --layers 32 --macros 500 --output bench.json
+    python3 benchmark_readme.py --baseline bench.json    # compare with a stored run
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import tempfile
+import tracemalloc
+from typing import Dict, List, Optional
+
+from generate_readme import ZMKKeymapParser, GENERATOR_VERSION
+
+KEYCODES = ['A', 'B', 'C', 'D', 'E', 'F', 'G', 'H', 'I', 'J', 'K', 'L', 'M', 'N', 'O', 'P',
+            'Q', 'R', 'S', 'T', 'U', 'V', 'W', 'X', 'Y', 'Z', 'N1', 'N2', 'N3', 'N4', 'N5',
+            'TAB', 'ESC', 'SPACE', 'RET', 'BSPC', 'DEL', 'LEFT', 'RIGHT', 'UP', 'DOWN',
+            'MINUS', 'EQUAL', 'LBRC', 'RBRC', 'SEMI', 'SQT', 'COMMA', 'DOT', 'FSLH']
+MODIFIERS = ['LCTRL', 'LALT', 'LGUI', 'LSHFT', 'RCTRL', 'RALT', 'RGUI', 'RSHFT']
+
+
+def generate_keymap(layers: int = 8, keys: int = 44, macros: int = 50, macro_depth: int = 3,
+                    combos: int = 20, comment_noise: int = 0, seed: int = 0) -> str:
+    """Build a synthetic keymap.
+
+    ``macro_depth`` chains each macro through that many other macros before
+    reaching a keycode, and ``comment_noise`` inserts that many block and
+    line comments plus runs of whitespace between the bindings of each row.
+    """
+    rng = random.Random(seed)
+    lines = ['#include <behaviors.dtsi>', '#include <dt-bindings/zmk/keys.h>', '']
+    for index in range(layers):
+        lines.append(f'#define L{index} {index}')
+
+    # Macro chains: M<i>_<depth> -> M<i>_<depth-1> -> ... -> keycode
+    macro_names = []
+    for index in range(macros):
+        depth = max(1, macro_depth)
+        lines.append(f'#define M{index}_0 LC({rng.choice(KEYCODES)})  // leaf {index}')
+        for level in range(1, depth):
+            lines.append(f'#define M{index}_{level} M{index}_{level - 1}')
+        macro_names.append(f'M{index}_{depth - 1}')
+    lines.append('')
+
+    def binding(layer: int) -> str:
+        roll = rng.random()
+        if roll < 0.35:
+            return f'&kp {rng.choice(KEYCODES)}'
+        if roll < 0.5:
+            return f'&hm {rng.choice(MODIFIERS)} {rng.choice(KEYCODES)}'
+        if roll < 0.6 and macro_names:
+            return f'&kp {rng.choice(macro_names)}'
+        if roll < 0.7:
+            return f'&lt L{rng.randrange(layers)} {rng.choice(KEYCODES)}'
+        if roll < 0.75:
+            return f'&mo L{rng.randrange(layers)}'
+        if roll < 0.9 and layer:
+            return '&trans'
+        return '&none'
+
+    def noise() -> str:
+        if not comment_noise:
+            return ' '
+        pieces = []
+        for _ in range(comment_noise):
+            pieces.append(rng.choice([' /* } > { < */ ', '\t\t   ', ' /* ' + 'x' * 40 + ' */ ']))
+        return ''.join(pieces)
+
+    lines.append('/ {')
+    lines.append('    behaviors {')
+    lines.append('        hm: homerow_mods {')
+    lines.append('            compatible = "zmk,behavior-hold-tap";')
+    lines.append('            #binding-cells = <2>;')
+    lines.append('            tapping-term-ms = <175>;')
+    lines.append('            flavor = "tap-preferred";')
+    lines.append('            bindings = <&kp>, <&kp>;')
+    lines.append('        };')
+    lines.append('    };')
+    lines.append('')
+    lines.append('    combos {')
+    lines.append('        compatible = "zmk,combos";')
+    for index in range(combos):
+        first = rng.randrange(max(1, keys - 1))
+        lines.append(f'        combo_synthetic_{index} {{')
+        lines.append('            timeout-ms = <50>;')
+        lines.append(f'            key-positions = <{first} {first + 1}>;')
+        lines.append(f'            layers = <L{rng.randrange(layers)}>;')
+        lines.append(f'            bindings = <&kp {rng.choice(KEYCODES)}>;')
+        lines.append('        };')
+    lines.append('    };')
+    lines.append('')
+    lines.append('    keymap {')
+    lines.append('        compatible = "zmk,keymap";')
+    for layer in range(layers):
+        lines.append(f'        layer_{layer}_layer {{')
+        lines.append(f'            label = "Layer {layer}";')
+        lines.append('            bindings = <')
+        row = []
+        for key in range(keys):
+            row.append(binding(layer))
+            if len(row) == 12 or key == keys - 1:
+                lines.append(noise().join(row))
+                if comment_noise:
+                    lines.append('// ' + '-' * 60)
+                row = []
+        lines.append('            >;')
+        lines.append('        };')
+    lines.append('    };')
+    lines.append('};')
+    return '\n'.join(lines) + '\n'
+
+
+def percentile(samples: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of a list of samples."""
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(fraction * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def _phase_parse(keymap_file: str, conf_file: str):
+    parser = ZMKKeymapParser(keymap_file, conf_file)
+    return lambda: parser.parse_keymap()
+
+
+def _phase_tables(keymap_file: str, conf_file: str):
+    parser = ZMKKeymapParser(keymap_file, conf_file)
+    parser.parse_keymap()
+
+    def run():
+        for layer_name, layer_data in parser.layers.items():
+            parser.generate_layer_table(layer_name, layer_data)
+    return run
+
+
+def _phase_readme(keymap_file: str, conf_file: str):
+    return lambda: ZMKKeymapParser(keymap_file, conf_file).generate_readme()
+
+
+PHASES = {
+    'parse_keymap': _phase_parse,
+    'generate_layer_table': _phase_tables,
+    'generate_readme': _phase_readme,
+}
+
+
+def run_phase(name: str, keymap_file: str, conf_file: str, repeat: int, warmup: int) -> Dict:
+    """Time one phase ``repeat`` times, then measure its peak memory once."""
+    setup = PHASES[name]
+    samples = []
+    for iteration in range(warmup + repeat):
+        # Every iteration gets a fresh parser so no state is reused between runs
+        run = setup(keymap_file, conf_file)
+        start = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - start
+        if iteration >= warmup:
+            samples.append(elapsed)
+
+    run = setup(keymap_file, conf_file)
+    tracemalloc.start()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'repeat': repeat,
+        'min_s': min(samples),
+        'mean_s': sum(samples) / len(samples),
+        'p50_s': percentile(samples, 0.50),
+        'p90_s': percentile(samples, 0.90),
+        'p99_s': percentile(samples, 0.99),
+        'peak_bytes': peak,
+    }
+
+
+def run_benchmarks(config: Dict, phases: List[str], repeat: int, warmup: int) -> Dict:
+    """Generate a synthetic keymap for config and benchmark the given phases."""
+    content = generate_keymap(**config)
+    with tempfile.TemporaryDirectory() as directory:
+        keymap_file = os.path.join(directory, 'synthetic.keymap')
+        conf_file = os.path.join(directory, 'synthetic.conf')
+        with open(keymap_file, 'w') as f:
+            f.write(content)
+        with open(conf_file, 'w') as f:
+            f.write('CONFIG_ZMK_DISPLAY=y\n')
+
+        total_keys = config['layers'] * config['keys']
+        total_bytes = len(content.encode())
+        results = {}
+        for name in phases:
+            stats = run_phase(name, keymap_file, conf_file, repeat, warmup)
+            stats['keys_per_s'] = total_keys / stats['p50_s'] if stats['p50_s'] else 0.0
+            stats['bytes_per_s'] = total_bytes / stats['p50_s'] if stats['p50_s'] else 0.0
+            results[name] = stats
+
+    return {
+        'generator_version': GENERATOR_VERSION,
+        'python': platform.python_version(),
+        'config': config,
+        'keymap_bytes': total_bytes,
+        'total_keys': total_keys,
+        'phases': results,
+    }
+
+
+def compare(report: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """Return a line per phase comparing median time with the baseline."""
+    lines = []
+    regressions = []
+    for name, stats in report['phases'].items():
+        old = baseline.get('phases', {}).get(name)
+        if not old:
+            lines.append(f"{name:22} no baseline")
+            continue
+        ratio = stats['p50_s'] / old['p50_s'] if old['p50_s'] else float('inf')
+        marker = 'REGRESSION' if ratio > threshold else 'ok'
+        if ratio > threshold:
+            regressions.append(name)
+        lines.append(f"{name:22} {old['p50_s'] * 1000:9.3f} ms -> {stats['p50_s'] * 1000:9.3f} ms  x{ratio:5.2f}  {marker}")
+    if baseline.get('config') != report['config']:
+        lines.append("warning: baseline was recorded with a different keymap configuration")
+    return lines if not regressions else lines + [f"regressed: {', '.join(regressions)}"]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point."""
+    arg_parser = argparse.ArgumentParser(description="Benchmark the ZMK README generator.")
+    arg_parser.add_argument('--layers', type=int, default=8)
+    arg_parser.add_argument('--keys', type=int, default=44, help="keys per layer")
+    arg_parser.add_argument('--macros', type=int, default=50)
+    arg_parser.add_argument('--macro-depth', type=int, default=3, help="macro nesting depth")
+    arg_parser.add_argument('--combos', type=int, default=20)
+    arg_parser.add_argument('--comment-noise', type=int, default=0,
+                            help="comments/whitespace runs inserted between bindings")
+    arg_parser.add_argument('--seed', type=int, default=0)
+    arg_parser.add_argument('--repeat', type=int, default=20)
+    arg_parser.add_argument('--warmup', type=int, default=2)
+    arg_parser.add_argument('--phase', action='append', choices=sorted(PHASES),
+                            help="phase to run (default: all); may be repeated")
+    arg_parser.add_argument('--output', help="write the JSON report to this file")
+    arg_parser.add_argument('--baseline', help="JSON report to compare against")
+    arg_parser.add_argument('--threshold', type=float, default=1.10,
+                            help="slowdown ratio counted as a regression (default: %(default)s)")
+    arg_parser.add_argument('--dump-keymap', help="write the synthetic keymap here and exit")
+    args = arg_parser.parse_args(argv)
+
+    config = {
+        'layers': args.layers,
+        'keys': args.keys,
+        'macros': args.macros,
+        'macro_depth': args.macro_depth,
+        'combos': args.combos,
+        'comment_noise': args.comment_noise,
+        'seed': args.seed,
+    }
+    if args.dump_keymap:
+        with open(args.dump_keymap, 'w') as f:
+            f.write(generate_keymap(**config))
+        return 0
+
+    report = run_benchmarks(config, args.phase or list(PHASES), args.repeat, args.warmup)
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+        lines = compare(report, baseline, args.threshold)
+        print('\n'.join(lines), file=sys.stderr)
+        if lines and lines[-1].startswith('regressed:'):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,599 @@
+#!/usr/bin/env python3
+"""
+Firmware image inspector for ZMK ``.uf2`` builds and raw ``.bin`` images.
+
+Images are memory-mapped rather than read. UF2 files are decoded block by
+block (magic numbers, target address, payload size, family ID) into the
+flash ranges they program; a ``.bin`` is taken as one range starting at
+the target's load address. From that the inspector reports the image
+size and how much of the target's application flash is left.
+
+It also looks for the keymap inside the image. For ZMK it finds the
+behavior device names (``key_press``, ``layer_tap``, ...) and then the
+binding table whose records point at them, and compares every binding
+with the parsed keymap. For QMK images such as the Voyager's it finds the
+``keymaps[layer][row][col]`` keycode matrices.
+
+Many images can be compared in one run, and generate_readme.py --firmware
+adds the same figures to the README.
+
+Usage:
+    python3 firmware_inspect.py ../Voyager/voyager.bin
+    python3 firmware_inspect.py build/*.uf2 --keymap clickety_split_pepito.keymap
+    python3 firmware_inspect.py left.uf2 right.uf2 --json
+"""
+
+import os
+import sys
+import mmap
+import json
+import struct
+import argparse
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+from generate_readme import ZMKKeymapParser
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+UF2_MAGIC_START0 = 0x0A324655
+UF2_MAGIC_START1 = 0x9E5D5157
+UF2_MAGIC_END = 0x0AB16F30
+UF2_BLOCK_SIZE = 512
+UF2_HEADER = struct.Struct('<8I')
+UF2_FLAG_NOT_MAIN_FLASH = 0x00000001
+UF2_FLAG_FAMILY_ID = 0x00002000
+
+# Application flash of the targets we build for. ``flash_end`` is where the
+# application area ends (ZMK keeps its settings partition right after it),
+# ``load`` is where a raw .bin is flashed and ``matrix`` the QMK matrix size.
+TARGETS = {
+    'nrf52840': {'name': 'nRF52840', 'family': 0xADA52840, 'firmware': 'zmk', 'flash_end': 0xEC000},
+    'rp2040': {'name': 'RP2040', 'family': 0xE48BFF56, 'firmware': 'zmk', 'flash_end': 0x10200000},
+    'stm32f303': {'name': 'STM32F303', 'family': 0x6B846188, 'load': 0x08000000, 'flash_end': 0x08040000},
+    'voyager': {'name': 'STM32F303 (Voyager)', 'firmware': 'qmk', 'load': 0x08002000, 'flash_end': 0x08040000,
+                'matrix': (12, 7)},
+}
+
+# Device names of ZMK's built-in behaviors; custom ones use their node name
+ZMK_BEHAVIOR_DEVICES = {
+    'kp': 'key_press', 'mo': 'momentary_layer', 'lt': 'layer_tap', 'mt': 'mod_tap', 'trans': 'transparent',
+    'none': 'none', 'to': 'to_layer', 'tog': 'toggle_layer', 'sl': 'sticky_layer', 'sk': 'sticky_key',
+    'kt': 'key_toggle', 'bt': 'bluetooth', 'out': 'outputs', 'sys_reset': 'sysreset', 'bootloader': 'bootload',
+    'caps_word': 'caps_word', 'key_repeat': 'key_repeat', 'ext_power': 'extpower', 'rgb_ug': 'rgb_ug',
+    'bl': 'bcklight', 'mkp': 'mouse_key_press',
+}
+
+# HID keyboard page usage ids of the common ZMK keycodes
+HID_USAGES = {name: 0x04 + index for index, name in enumerate('ABCDEFGHIJKLMNOPQRSTUVWXYZ')}
+HID_USAGES.update({f'N{digit}': 0x1E + index for index, digit in enumerate('1234567890')})
+HID_USAGES.update({f'F{number}': 0x39 + number for number in range(1, 13)})
+HID_USAGES.update({
+    'RET': 0x28, 'ENTER': 0x28, 'ESC': 0x29, 'BSPC': 0x2A, 'TAB': 0x2B, 'SPACE': 0x2C, 'MINUS': 0x2D,
+    'EQUAL': 0x2E, 'LBKT': 0x2F, 'RBKT': 0x30, 'BSLH': 0x31, 'SEMI': 0x33, 'SQT': 0x34, 'GRAVE': 0x35,
+    'COMMA': 0x36, 'DOT': 0x37, 'FSLH': 0x38, 'CAPS': 0x39, 'PSCRN': 0x46, 'INS': 0x49, 'HOME': 0x4A,
+    'PG_UP': 0x4B, 'DEL': 0x4C, 'END': 0x4D, 'PG_DN': 0x4E, 'RIGHT': 0x4F, 'LEFT': 0x50, 'DOWN': 0x51,
+    'UP': 0x52, 'LCTRL': 0xE0, 'LSHFT': 0xE1, 'LALT': 0xE2, 'LGUI': 0xE3, 'RCTRL': 0xE4, 'RSHFT': 0xE5,
+    'RALT': 0xE6, 'RGUI': 0xE7,
+})
+# Shifted keycodes are LS() of an unshifted one in ZMK's keys.h
+SHIFTED_USAGES = {
+    'EXCL': 'N1', 'AT': 'N2', 'HASH': 'N3', 'DLLR': 'N4', 'PRCNT': 'N5', 'CARET': 'N6', 'AMPS': 'N7',
+    'STAR': 'N8', 'ASTRK': 'N8', 'LPAR': 'N9', 'RPAR': 'N0', 'UNDER': 'MINUS', 'PLUS': 'EQUAL',
+    'LBRC': 'LBKT', 'RBRC': 'RBKT', 'PIPE': 'BSLH', 'COLON': 'SEMI', 'DQT': 'SQT', 'TILDE': 'GRAVE',
+    'LT': 'COMMA', 'GT': 'DOT', 'QMARK': 'FSLH',
+}
+# Modifier functions and their bits in the top byte of a ZMK keycode
+MODIFIER_BITS = {'LC': 0x01, 'LS': 0x02, 'LA': 0x04, 'LG': 0x08, 'RC': 0x10, 'RS': 0x20, 'RA': 0x40, 'RG': 0x80}
+
+
+def zmk_keycode(name: str) -> Optional[int]:
+    """The 32-bit value ZMK stores for a keycode name, e.g. ``LS(A)``; None if unknown."""
+    modifiers = 0
+    while name[:2] in MODIFIER_BITS and name[2:3] == '(' and name.endswith(')'):
+        modifiers |= MODIFIER_BITS[name[:2]]
+        name = name[3:-1]
+    if name in SHIFTED_USAGES:
+        modifiers |= MODIFIER_BITS['LS']
+        name = SHIFTED_USAGES[name]
+    usage = HID_USAGES.get(name)
+    if usage is None:
+        return None
+    return modifiers << 24 | 0x07 << 16 | usage
+
+
+def _number(text: str) -> Optional[int]:
+    try:
+        return int(text, 0)
+    except ValueError:
+        return None
+
+
+class FirmwareImage:
+    """A memory-mapped firmware file and the flash ranges it programs.
+
+    ``ranges`` lists ``(address, file offset, length)`` for every payload
+    in address order; nothing is copied until data() is asked for a UF2's
+    flash contents, which are scattered over 512-byte blocks.
+    """
+
+    # A QMK keymap table must have this many layers to identify a raw image
+    QMK_MIN_LAYERS = 2
+
+    def __init__(self, path: str, target: Optional[str] = None):
+        self.path = path
+        self._file = open(path, 'rb')
+        self.file_size = os.fstat(self._file.fileno()).st_size
+        self.map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self.file_size else b''
+        self.family = None
+        self.blocks = 0
+        self.bad_blocks = 0
+        self.ranges = []
+        self._qmk_tables = {}
+        if self.file_size >= UF2_BLOCK_SIZE and struct.unpack_from('<2I', self.map, 0) == (UF2_MAGIC_START0,
+                                                                                           UF2_MAGIC_START1):
+            self.format = 'uf2'
+            self._decode_uf2()
+        else:
+            self.format = 'bin'
+        self.target = self._find_target(target)
+        if self.format == 'bin':
+            self.ranges = [(self._load_address(), 0, self.file_size)]
+
+    def close(self):
+        if isinstance(self.map, mmap.mmap):
+            self.map.close()
+        self._file.close()
+
+    def __enter__(self) -> 'FirmwareImage':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _decode_uf2(self):
+        """Validate each block's framing and record the main-flash payloads."""
+        ranges = []
+        for offset in range(0, self.file_size - UF2_BLOCK_SIZE + 1, UF2_BLOCK_SIZE):
+            start0, start1, flags, address, length, _, _, family = UF2_HEADER.unpack_from(self.map, offset)
+            end, = struct.unpack_from('<I', self.map, offset + UF2_BLOCK_SIZE - 4)
+            if start0 != UF2_MAGIC_START0 or start1 != UF2_MAGIC_START1 or end != UF2_MAGIC_END or length > 476:
+                self.bad_blocks += 1
+                continue
+            if flags & UF2_FLAG_NOT_MAIN_FLASH:
+                continue
+            if flags & UF2_FLAG_FAMILY_ID:
+                self.family = family
+            self.blocks += 1
+            ranges.append((address, offset + UF2_HEADER.size, length))
+        ranges.sort()
+        self.ranges = ranges
+
+    def _find_target(self, name: Optional[str]) -> Optional[Dict]:
+        """Target by explicit name, UF2 family ID, or a raw image's contents.
+
+        A raw image starts with a Cortex-M vector table: the initial stack
+        pointer, then the reset handler. An STM32 image whose reset handler
+        lies past a bootloader and that holds a QMK keymap table for one of
+        the QMK targets' matrices is that target (the Voyager); any other
+        STM32 image is a plain STM32F303 build.
+        """
+        if name:
+            if name not in TARGETS:
+                raise ValueError(f"unknown target {name!r}; choose from {', '.join(TARGETS)}")
+            return TARGETS[name]
+        if self.family is not None:
+            for target in TARGETS.values():
+                if target.get('family') == self.family:
+                    return target
+            return None
+        if self.format != 'bin' or self.file_size < 8:
+            return None
+        stack, reset = struct.unpack_from('<2I', self.map, 0)
+        if stack >> 24 != 0x20 or reset >> 24 != 0x08:
+            return None
+        for target in TARGETS.values():
+            if target.get('firmware') != 'qmk' or not target['load'] <= reset < target['flash_end']:
+                continue
+            rows, cols = target['matrix']
+            found = self.qmk_table(rows * cols)
+            if found is not None and found[1] >= self.QMK_MIN_LAYERS:
+                return target
+        return TARGETS['stm32f303']
+
+    def qmk_table(self, size: int, candidates: int = 64) -> Optional[Tuple[int, int]]:
+        """find_qmk_table over the image's flash contents, computed once per layer size."""
+        key = (size, candidates)
+        if key not in self._qmk_tables:
+            self._qmk_tables[key] = find_qmk_table(self.map if self.format == 'bin' else self.data()[1],
+                                                   size, candidates)
+        return self._qmk_tables[key]
+
+    def _load_address(self) -> int:
+        return self.target.get('load', 0) if self.target else 0
+
+    @property
+    def start(self) -> int:
+        return self.ranges[0][0] if self.ranges else 0
+
+    @property
+    def end(self) -> int:
+        return max((address + length for address, _, length in self.ranges), default=0)
+
+    @property
+    def size(self) -> int:
+        """Bytes of flash the image programs."""
+        return sum(length for _, _, length in self.ranges)
+
+    def free(self) -> Optional[int]:
+        """Application flash left after the image, if the target is known."""
+        if not self.target or not self.ranges:
+            return None
+        return self.target['flash_end'] - self.end
+
+    def data(self) -> Tuple[int, object]:
+        """``(base address, buffer)`` covering the image's flash contents.
+
+        A .bin is returned as the mapping itself. UF2 payloads are gathered
+        into one buffer (gaps read as erased flash, 0xFF).
+        """
+        if self.format == 'bin':
+            return self.start, self.map
+        buffer = bytearray(b'\xff') * (self.end - self.start)
+        view = memoryview(self.map)
+        for address, offset, length in self.ranges:
+            buffer[address - self.start:address - self.start + length] = view[offset:offset + length]
+        view.release()
+        return self.start, buffer
+
+
+def find_string(data, name: str) -> int:
+    """Offset of a NUL-terminated string that starts on its own, or -1."""
+    needle = name.encode() + b'\0'
+    offset = data.find(needle)
+    while offset > 0 and data[offset - 1] != 0:
+        offset = data.find(needle, offset + 1)
+    return offset
+
+
+class ZMKKeymapLocator:
+    """Finds a parsed ZMK keymap's binding table in a firmware image.
+
+    Each binding is stored as ``{const char *behavior_dev; uint32_t param1;
+    uint32_t param2;}``, optionally after a 16-bit behavior id, so records
+    are 12 or 16 bytes. The behavior names are located first; the table is
+    then where the first layer's records point at them in order.
+    """
+
+    STRIDES = ((12, 0), (16, 4))
+
+    def __init__(self, parser: ZMKKeymapParser):
+        self.parser = parser
+        self.layers = list(parser.layers.values())
+        self.devices = dict(ZMK_BEHAVIOR_DEVICES)
+        for name, behavior in parser.behaviors.items():
+            if name not in ZMK_BEHAVIOR_DEVICES:
+                self.devices[name] = behavior.get('node', name)
+
+    def expected(self, binding) -> Tuple[str, Optional[int], Optional[int]]:
+        """Device name and the params it should carry (None where unknown)."""
+        behavior, params = binding.behavior, binding.params
+        device = self.devices.get(behavior, behavior)
+        values = []
+        for param in params[:2]:
+            number = _number(param)
+            values.append(number if number is not None else zmk_keycode(param))
+        if behavior in ('trans', 'none'):
+            values = [0, 0]
+        values += [None] * (2 - len(values))
+        return device, values[0], values[1]
+
+    def locate(self, image: FirmwareImage) -> Dict:
+        """Where the table is and how many bindings match the parsed keymap."""
+        base, data = image.data()
+        addresses = {}
+        for name in set(self.devices[binding.behavior] if binding.behavior in self.devices else binding.behavior
+                        for layer in self.layers for binding in layer):
+            offset = find_string(data, name)
+            if offset >= 0:
+                addresses[name] = base + offset
+        result = {'firmware': 'zmk', 'behaviors_found': sorted(addresses), 'table': None}
+        if not self.layers or not len(self.layers[0]):
+            return result
+
+        expected = [[self.expected(binding) for binding in layer] for layer in self.layers]
+        anchor = expected[0][0][0]
+        if anchor not in addresses:
+            return result
+        needle = struct.pack('<I', addresses[anchor])
+        best = None
+        offset = data.find(needle)
+        while offset >= 0:
+            for stride, pointer in self.STRIDES:
+                start = offset - pointer
+                score = self._score(data, start, stride, pointer, expected[0], addresses)
+                if best is None or score > best[0]:
+                    best = (score, start, stride, pointer)
+            offset = data.find(needle, offset + 1)
+        if best is None or best[0] < len(expected[0]) // 2:
+            return result
+
+        _, start, stride, pointer = best
+        layers = []
+        layer_start = start
+        names = list(self.parser.layers)
+        for index, layer in enumerate(expected):
+            mismatches = self._mismatches(data, layer_start, stride, pointer, layer, addresses)
+            layers.append({'layer': names[index], 'address': base + layer_start, 'bindings': len(layer),
+                           'matched': len(layer) - len(mismatches), 'mismatches': mismatches[:10]})
+            layer_start += len(layer) * stride
+        result['table'] = {'address': base + start, 'record_size': stride, 'layers': layers}
+        return result
+
+    def _records(self, data, start: int, stride: int, pointer: int, count: int):
+        if start < 0 or start + count * stride > len(data):
+            return None
+        return [struct.unpack_from('<3I', data, start + index * stride + pointer) for index in range(count)]
+
+    def _score(self, data, start, stride, pointer, expected, addresses) -> int:
+        records = self._records(data, start, stride, pointer, len(expected))
+        if records is None:
+            return -1
+        return sum(1 for record, want in zip(records, expected) if self._matches(record, want, addresses))
+
+    def _mismatches(self, data, start, stride, pointer, expected, addresses) -> List[Dict]:
+        records = self._records(data, start, stride, pointer, len(expected))
+        if records is None:
+            return [{'position': position, 'expected': want[0], 'found': None}
+                    for position, want in enumerate(expected)]
+        devices = {address: name for name, address in addresses.items()}
+        return [{'position': position, 'expected': list(want),
+                 'found': [devices.get(record[0], hex(record[0])), record[1], record[2]]}
+                for position, (record, want) in enumerate(zip(records, expected))
+                if not self._matches(record, want, addresses)]
+
+    @staticmethod
+    def _matches(record, want, addresses) -> bool:
+        device, param1, param2 = want
+        address = addresses.get(device)
+        return ((address is None or record[0] == address) and
+                (param1 is None or record[1] == param1) and (param2 is None or record[2] == param2))
+
+
+def _qmk_layers(words, index: int, size: int) -> int:
+    """How many layers follow index while keeping KC_NO in the first layer's empty slots."""
+    holes = [position for position in range(size) if words[index + position] == 0]
+    count = 0
+    while index + size <= len(words):
+        layer = words[index:index + size]
+        if any(word >= 0x8000 for word in layer) or any(layer[position] for position in holes):
+            break
+        count += 1
+        index += size
+    return count
+
+
+def _words(data, alignment: int):
+    """Little-endian 16-bit words of data from alignment on, as a view where possible."""
+    end = len(data) - (len(data) - alignment) % 2
+    view = memoryview(data)[alignment:end]
+    if sys.byteorder == 'little':
+        return view.cast('H')
+    words = array('H', view.tobytes())
+    view.release()
+    words.byteswap()
+    return words
+
+
+def find_qmk_table(data, size: int, candidates: int = 64) -> Optional[Tuple[int, int]]:
+    """``(byte offset, layer count)`` of QMK's ``uint16_t keymaps[][rows][cols]`` in data, or None.
+
+    Windows of one layer with no values outside QMK's keycode range are
+    ranked by how many basic keycodes (``KC_A`` to ``KC_RGUI``) they hold.
+    Of the best few, the table is the one followed by the most layers that
+    keep ``KC_NO`` in the same slots, since those are matrix positions
+    without a key; that rejects windows straddling the table's edge. The
+    data is scanned through a memoryview, so a mapped image is not copied.
+    """
+    ranked = []
+    views = []
+    try:
+        for alignment in (0, 1):
+            words = _words(data, alignment)
+            views.append(words)
+            if len(words) < size:
+                continue
+            # Sliding-window counts of basic keycodes and of out-of-range values
+            count_basic = sum(1 for word in words[:size] if 0x04 <= word <= 0xE7)
+            count_invalid = sum(1 for word in words[:size] if word >= 0x8000)
+            for index in range(len(words) - size + 1):
+                if index:
+                    entering, leaving = words[index + size - 1], words[index - 1]
+                    count_basic += (0x04 <= entering <= 0xE7) - (0x04 <= leaving <= 0xE7)
+                    count_invalid += (entering >= 0x8000) - (leaving >= 0x8000)
+                if not count_invalid and count_basic >= size // 4:
+                    ranked.append((count_basic, alignment, index))
+        if not ranked:
+            return None
+        ranked.sort(key=lambda candidate: -candidate[0])
+        best = max(ranked[:candidates], key=lambda candidate: (
+            _qmk_layers(views[candidate[1]], candidate[2], size), candidate[0]))
+        _, alignment, index = best
+        return alignment + 2 * index, _qmk_layers(views[alignment], index, size)
+    finally:
+        for words in views:
+            if isinstance(words, memoryview):
+                words.release()
+
+
+def locate_qmk_keymap(image: FirmwareImage, rows: int, cols: int, candidates: int = 64) -> Dict:
+    """Find QMK's keymap matrices in an image and summarize each layer (see find_qmk_table)."""
+    base, data = image.data()
+    size = rows * cols
+    result = {'firmware': 'qmk', 'matrix': [rows, cols], 'table': None}
+    found = image.qmk_table(size, candidates)
+    if found is None:
+        return result
+    offset, count = found
+    layers = []
+    keys = 0
+    words = _words(data, offset % 2)
+    try:
+        index = offset // 2
+        for number in range(count):
+            layer = words[index + number * size:index + (number + 1) * size]
+            layers.append({'address': base + offset + 2 * size * number,
+                           'basic': sum(1 for word in layer if 0x04 <= word <= 0xE7),
+                           'transparent': sum(1 for word in layer if word == 1)})
+        keys = size - sum(1 for word in words[index:index + size] if word == 0)
+    finally:
+        if isinstance(words, memoryview):
+            words.release()
+    result['table'] = {'address': base + offset, 'keys': keys, 'layers': layers}
+    return result
+
+
+def inspect(path: str, parser: Optional[ZMKKeymapParser] = None, target: Optional[str] = None) -> Dict:
+    """Size, free flash and keymap location of one firmware image."""
+    with FirmwareImage(path, target) as image:
+        info = image.target or {}
+        report = {
+            'path': path,
+            'format': image.format,
+            'target': info.get('name'),
+            'family': f'0x{image.family:08X}' if image.family is not None else None,
+            'file_size': image.file_size,
+            'blocks': image.blocks,
+            'bad_blocks': image.bad_blocks,
+            'start': image.start,
+            'end': image.end,
+            'size': image.size,
+            'flash_end': info.get('flash_end'),
+            'free': image.free(),
+            'keymap': None,
+        }
+        if 'matrix' in info:
+            report['keymap'] = locate_qmk_keymap(image, *info['matrix'])
+        elif parser is not None and info.get('firmware', 'zmk') == 'zmk' and image.ranges:
+            report['keymap'] = ZMKKeymapLocator(parser).locate(image)
+    return report
+
+
+def find_images(paths: List[str]) -> List[str]:
+    """Expand directories into the .uf2 and .bin files below them."""
+    images = []
+    for path in paths:
+        if not os.path.isdir(path):
+            images.append(path)
+            continue
+        for directory, _, files in sorted(os.walk(path)):
+            images.extend(os.path.join(directory, name) for name in sorted(files)
+                          if name.endswith(('.uf2', '.bin')))
+    return images
+
+
+def inspect_all(paths: List[str], parser: Optional[ZMKKeymapParser] = None,
+                target: Optional[str] = None) -> List[Dict]:
+    """Inspect many images, adding each one's size change against the first."""
+    reports = [inspect(path, parser, target) for path in find_images(paths)]
+    for report in reports[1:]:
+        report['delta'] = report['size'] - reports[0]['size']
+    return reports
+
+
+def format_size(size: Optional[int]) -> str:
+    if size is None:
+        return 'unknown'
+    return f"{size / 1024:.1f} KiB"
+
+
+def describe_keymap(keymap: Optional[Dict]) -> str:
+    """Short summary of where the keymap was found, for tables."""
+    if not keymap:
+        return 'not checked'
+    table = keymap['table']
+    if table is None:
+        return 'not found'
+    layers = table['layers']
+    if keymap['firmware'] == 'qmk':
+        return f"{len(layers)} layers at 0x{table['address']:08X}"
+    matched = sum(layer['matched'] for layer in layers)
+    total = sum(layer['bindings'] for layer in layers)
+    return f"{len(layers)} layers at 0x{table['address']:08X}, {matched}/{total} bindings match"
+
+
+def free_text(report: Dict) -> str:
+    if report['free'] is None:
+        return 'unknown'
+    available = report['flash_end'] - report['start']
+    percent = 100 * report['free'] / available if available > 0 else 0
+    return f"{format_size(report['free'])} ({percent:.0f}%)"
+
+
+def markdown_table(reports: List[Dict], root: Optional[str] = None) -> str:
+    """The README's firmware table; paths are shown relative to root."""
+    table = ["| Image | Target | Size | Free Flash | Keymap |",
+             "|-------|--------|------|------------|--------|"]
+    for report in reports:
+        path = os.path.relpath(report['path'], root) if root else os.path.basename(report['path'])
+        table.append(f"| `{path}` | {report['target'] or 'unknown'} ({report['format']}) | "
+                     f"{format_size(report['size'])} | {free_text(report)} | {describe_keymap(report['keymap'])} |")
+    return "\n".join(table)
+
+
+def _record_text(record: Optional[List]) -> str:
+    if record is None:
+        return 'nothing'
+    device, *params = record
+    return ' '.join([device] + ['*' if param is None else f'0x{param:X}' for param in params])
+
+
+def format_text(reports: List[Dict]) -> str:
+    """One block per image."""
+    lines = []
+    for report in reports:
+        lines.append(f"{report['path']}: {report['format']}, {report['target'] or 'unknown target'}")
+        if report['format'] == 'uf2':
+            lines.append(f"  {report['blocks']} blocks, family {report['family'] or 'none'}"
+                         + (f", {report['bad_blocks']} invalid" if report['bad_blocks'] else ''))
+        lines.append(f"  flash 0x{report['start']:08X}-0x{report['end']:08X}: {report['size']} bytes "
+                     f"({format_size(report['size'])}), free {free_text(report)}"
+                     + (f", {report['delta']:+d} bytes vs first" if 'delta' in report else ''))
+        lines.append(f"  keymap: {describe_keymap(report['keymap'])}")
+        keymap = report['keymap']
+        if keymap and keymap['table'] and keymap['firmware'] == 'zmk':
+            for layer in keymap['table']['layers']:
+                for mismatch in layer['mismatches']:
+                    lines.append(f"    {layer['layer']} pos {mismatch['position']}: expected "
+                                 f"{_record_text(mismatch['expected'])}, found {_record_text(mismatch['found'])}")
+    return '\n'.join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point."""
+    arg_parser = argparse.ArgumentParser(description="Inspect ZMK .uf2 and raw .bin firmware images.")
+    arg_parser.add_argument('images', nargs='+', help="firmware files or directories containing them")
+    arg_parser.add_argument('--keymap', help="ZMK keymap to cross-check the binding tables against")
+    arg_parser.add_argument('--target', choices=sorted(TARGETS), help="override the detected target")
+    arg_parser.add_argument('--json', action='store_true', help="print the reports as JSON")
+    args = arg_parser.parse_args(argv)
+
+    try:
+        parser = None
+        if args.keymap:
+            parser = ZMKKeymapParser(args.keymap, '')
+            parser.parse_keymap()
+        reports = inspect_all(args.images, parser, args.target)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+
+    if args.json:
+        print(json.dumps(reports, indent=2))
+    else:
+        print(format_text(reports))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,19 +4,1827 @@ ZMK Keymap Parser and README Generator for Pepito-Macro Split Keyboard
 
 This script parses the ZMK keymap configuration and generates a comprehensive
 README with visual keyboard layout tables for all layers.
+
+Usage:
+    python3 generate_readme.py                 # regenerate readme.md
+    python3 generate_readme.py --no-cache      # ignore the parse/render cache
+    python3 generate_readme.py --clear-cache   # empty the cache first
+    python3 generate_readme.py --batch ROOT    # every keymap/conf pair below ROOT
+    python3 generate_readme.py --build-yaml ../build.yaml
+    python3 generate_readme.py --layout layouts/corne.json
+    python3 generate_readme.py --watch         # regenerate on every save
+    python3 generate_readme.py --profile trace.json --profile-format chrome
+    python3 generate_readme.py --check         # exit 1 if readme.md is stale
+    python3 generate_readme.py --format md,svg,html,json --output-dir out
+    python3 generate_readme.py --kconfig build/zephyr/.config
+    python3 generate_readme.py --firmware ../Voyager/voyager.bin --firmware build/
+    python3 generate_readme.py --changed-matrix base-manifest.json   # build.yaml entries to rebuild
 """
 
 import re
 import os
-from typing import Dict, List, Tuple, Optional
+import ast
+import sys
+import hashlib
+import pickle
+import argparse
+import functools
+import unicodedata
+from array import array
+import json
+import tempfile
+import tracemalloc
+import warnings
+import contextlib
+import time
+import select
+import struct
+import ctypes
+import ctypes.util
+from xml.sax.saxutils import escape
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, List, Tuple, Optional, FrozenSet, Iterator, Iterable
+
+# Bump whenever parsed structures or rendered output change so that cached
+# results from older versions of this script are never reused.
+GENERATOR_VERSION = '13'
+
+# Physical layout descriptions used to draw the layer tables
+LAYOUTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'layouts')
+DEFAULT_LAYOUT = os.path.join(LAYOUTS_DIR, 'clickety_split_pepito.json')
+
+
+class MacroExpander:
+    """Single-pass expander for the C preprocessor macros used in keymaps.
+
+    Every ``#define`` in a file is collected once into a lookup table keyed by
+    macro name. Expansion scans the text left to right with one precompiled
+    token matcher and only consults the table for whole-word tokens, so the
+    cost grows with the length of the text rather than with the number of
+    macros. Macro bodies are rescanned recursively until no further
+    expansion applies; a macro is never expanded inside its own expansion,
+    which is how the C preprocessor breaks cycles such as ``A -> B -> A``.
+    ``#ifdef``/``#ifndef``/``#if``/``#elif``/``#else``/``#endif`` are
+    tracked too, so definitions in an inactive group are ignored and
+    ``active`` tells a caller whether the text it is reading is compiled.
+    """
+
+    DEFINE_PATTERN = re.compile(r'^[ \t]*#[ \t]*(define|undef)[ \t]+(\w+)(\([^)]*\))?(.*)$', re.MULTILINE)
+    CONDITIONAL_PATTERN = re.compile(r'^[ \t]*#[ \t]*(ifdef|ifndef|if|elif|else|endif)\b(.*)$', re.DOTALL)
+    DIRECTIVE_PATTERN = re.compile(r'^[ \t]*#[ \t]*(?:define|undef|ifdef|ifndef|if|elif|else|endif)\b.*$',
+                                   re.MULTILINE)
+    # C comparison operators for #if; evaluated left to right like C, not chained like Python
+    COMPARE_OPERATORS = {
+        ast.Eq: lambda a, b: a == b, ast.NotEq: lambda a, b: a != b,
+        ast.Lt: lambda a, b: a < b, ast.LtE: lambda a, b: a <= b,
+        ast.Gt: lambda a, b: a > b, ast.GtE: lambda a, b: a >= b,
+    }
+    TOKEN_PATTERN = re.compile(r'"(?:[^"\\]|\\.)*"|\w+')
+    BODY_PATTERN = re.compile(r'##|#\s*\w+|"(?:[^"\\]|\\.)*"|\w+|\s+|.')
+
+    def __init__(self, macros: Optional[Dict[str, str]] = None,
+                 functions: Optional[Dict[str, Tuple[Tuple[str, ...], str]]] = None):
+        # Object-like macros: NAME -> body
+        self.macros = dict(macros or {})
+        # Function-like macros: NAME -> ((param, ...), body)
+        self.functions = dict(functions or {})
+        self.substitutions = 0
+        self.cycles = set()
+        self._memo = {}
+        # One [enclosing group active, a branch was taken, this branch active] entry per open #if
+        self._conditions = []
+
+    @classmethod
+    def from_source(cls, content: str) -> 'MacroExpander':
+        """Collect every #define/#undef from preprocessor source text."""
+        # Join continuation lines before scanning for directives
+        content = re.sub(r'\\\r?\n', ' ', content)
+        return cls.from_directives(match.group() for match in cls.DIRECTIVE_PATTERN.finditer(content))
+
+    @classmethod
+    def from_directives(cls, directives) -> 'MacroExpander':
+        """Build an expander from individual preprocessor directive lines."""
+        expander = cls()
+        for directive in directives:
+            expander.apply_directive(directive)
+        return expander
+
+    @property
+    def active(self) -> bool:
+        """Whether text at this point is compiled, i.e. not in a false #if group."""
+        return not self._conditions or self._conditions[-1][2]
+
+    @property
+    def depth(self) -> int:
+        """Number of #if groups still open."""
+        return len(self._conditions)
+
+    def is_defined(self, name: str) -> bool:
+        return name in self.macros or name in self.functions
+
+    def apply_directive(self, directive: str):
+        """Apply a #define, #undef or conditional line; other directives are ignored.
+
+        Raises ValueError for ``#else``/``#elif``/``#endif`` without an open
+        ``#if`` and for ``#if`` expressions that cannot be evaluated.
+        """
+        directive = re.sub(r'\\\r?\n', ' ', directive)
+        conditional = self.CONDITIONAL_PATTERN.match(directive)
+        if conditional:
+            self._apply_conditional(conditional.group(1), self._strip_comments(conditional.group(2)).strip())
+            return
+        match = self.DEFINE_PATTERN.match(directive)
+        if not match or not self.active:
+            return
+        kind, name, params, body = match.groups()
+        if kind == 'undef':
+            self.undefine(name)
+            return
+        body = self._strip_comments(body).strip()
+        if params is not None:
+            names = tuple(p.strip() for p in params[1:-1].split(',') if p.strip())
+            self.define_function(name, names, body)
+        else:
+            self.define(name, body)
+
+    def _apply_conditional(self, kind: str, argument: str):
+        if kind in ('ifdef', 'ifndef', 'if'):
+            enclosing = self.active
+            if not enclosing:
+                # Nothing in a skipped group is evaluated
+                value = False
+            elif kind == 'if':
+                value = self._condition(argument)
+            else:
+                value = self.is_defined(argument.split()[0] if argument else '') == (kind == 'ifdef')
+            self._conditions.append([enclosing, value, value])
+            return
+        if not self._conditions:
+            raise ValueError(f"#{kind} without #if")
+        enclosing, taken, _ = self._conditions[-1]
+        if kind == 'endif':
+            self._conditions.pop()
+        elif kind == 'else':
+            self._conditions[-1] = [enclosing, True, enclosing and not taken]
+        else:
+            value = enclosing and not taken and self._condition(argument)
+            self._conditions[-1] = [enclosing, taken or value, value]
+
+    def _condition(self, expression: str) -> bool:
+        """Evaluate an #if expression; identifiers left after expansion are 0, as in C."""
+        text = re.sub(r'\bdefined\s*(?:\(\s*(\w+)\s*\)|(\w+))',
+                      lambda m: '1' if self.is_defined(m.group(1) or m.group(2)) else '0', expression)
+        text = self.expand(text)
+        text = re.sub(r'\b[A-Za-z_]\w*', '0', text)
+        text = re.sub(r'\b(0[xX][0-9a-fA-F]+|\d+)[uUlL]+\b', r'\1', text)
+        text = re.sub(r'!(?!=)', ' not ', text.replace('&&', ' and ').replace('||', ' or '))
+        try:
+            tree = ast.parse(text.strip(), mode='eval')
+        except SyntaxError:
+            raise ValueError(f"cannot evaluate #if {expression}")
+        try:
+            return bool(self._evaluate_condition(tree.body, expression))
+        except ValueError:
+            raise ValueError(f"cannot evaluate #if {expression}")
+
+    @classmethod
+    def _evaluate_condition(cls, node: ast.AST, expression: str) -> int:
+        if isinstance(node, ast.BoolOp):
+            if isinstance(node.op, ast.And):
+                return int(all(cls._evaluate_condition(value, expression) for value in node.values))
+            return int(any(cls._evaluate_condition(value, expression) for value in node.values))
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+            return int(not cls._evaluate_condition(node.operand, expression))
+        if isinstance(node, ast.Compare) and all(type(op) in cls.COMPARE_OPERATORS for op in node.ops):
+            left = cls._evaluate_condition(node.left, expression)
+            for op, comparator in zip(node.ops, node.comparators):
+                left = int(cls.COMPARE_OPERATORS[type(op)](left, cls._evaluate_condition(comparator, expression)))
+            return left
+        return DTProperty._evaluate(node, expression)
+
+    @staticmethod
+    def _strip_comments_multiline(text: str) -> str:
+        """Remove comments from text that may span several lines."""
+        return re.sub(r'//[^\n]*|/\*.*?\*/', ' ', text, flags=re.DOTALL)
+
+    @staticmethod
+    def _strip_comments(text: str) -> str:
+        """Remove // and /* */ comments from a directive body."""
+        text = re.sub(r'/\*.*?\*/', ' ', text)
+        return re.sub(r'//.*$', '', text)
+
+    def define(self, name: str, body: str):
+        """Register an object-like macro."""
+        self.functions.pop(name, None)
+        self.macros[name] = body
+        self._memo.clear()
+
+    def define_function(self, name: str, params: Tuple[str, ...], body: str):
+        """Register a function-like macro such as ``#define LT_(n, k) &lt n k``."""
+        self.macros.pop(name, None)
+        self.functions[name] = (params, body)
+        self._memo.clear()
+
+    def undefine(self, name: str):
+        """Remove a macro of either kind."""
+        self.macros.pop(name, None)
+        self.functions.pop(name, None)
+        self._memo.clear()
+
+    def expand(self, text: str) -> str:
+        """Fully expand all macros in text."""
+        if not self.macros and not self.functions:
+            return text
+        return self._expand(text, frozenset())
+
+    def _expand(self, text: str, active: FrozenSet[str]) -> str:
+        """Expand text with the macros in ``active`` disabled."""
+        macros = self.macros
+        functions = self.functions
+        pieces = []
+        pos = 0
+        search = self.TOKEN_PATTERN.search
+        match = search(text)
+        while match:
+            name = match.group()
+            start, end = match.span()
+            if name[0] == '"':
+                pass
+            elif name in active:
+                if name in macros or name in functions:
+                    self.cycles.add(name)
+            elif name in macros:
+                pieces.append(text[pos:start])
+                pieces.append(self._expand_object(name, active))
+                self.substitutions += 1
+                pos = end
+            elif name in functions:
+                call = self._split_call(text, end)
+                if call is not None:
+                    args, end = call
+                    pieces.append(text[pos:start])
+                    pieces.append(self._expand_function(name, args, active))
+                    self.substitutions += 1
+                    pos = end
+            match = search(text, end)
+        if not pieces:
+            return text
+        pieces.append(text[pos:])
+        return ''.join(pieces)
+
+    def _expand_object(self, name: str, active: FrozenSet[str]) -> str:
+        """Expand an object-like macro, memoizing cycle-free results."""
+        if not active and name in self._memo:
+            return self._memo[name]
+        cycles = len(self.cycles)
+        result = self._expand(self.macros[name], active | {name})
+        if not active and len(self.cycles) == cycles:
+            self._memo[name] = result
+        return result
+
+    def _expand_function(self, name: str, args: List[str], active: FrozenSet[str]) -> str:
+        """Substitute arguments into a function-like macro body and rescan it."""
+        params, body = self.functions[name]
+        raw = {}
+        for index, param in enumerate(params):
+            if param == '...':
+                raw['__VA_ARGS__'] = ', '.join(args[index:])
+                break
+            raw[param] = args[index] if index < len(args) else ''
+        # Arguments are fully expanded before substitution, except next to # and ##
+        tokens = self.BODY_PATTERN.findall(body)
+        significant = [i for i, token in enumerate(tokens) if not token.isspace()]
+        pasted = set()
+        for before, index, after in zip([None] + significant, significant, significant[1:] + [None]):
+            if tokens[index] == '##':
+                pasted.update(i for i in (before, after) if i is not None)
+        pieces = []
+        for index, token in enumerate(tokens):
+            if token.startswith('#') and token != '##' and token[1:].strip() in raw:
+                value = raw[token[1:].strip()]
+                pieces.append('"' + value.replace('\\', '\\\\').replace('"', '\\"') + '"')
+            elif token in raw:
+                pieces.append(raw[token] if index in pasted else self._expand(raw[token], active))
+            else:
+                pieces.append(token)
+        body = re.sub(r'\s*##\s*', '', ''.join(pieces))
+        return self._expand(body, active | {name})
+
+    @staticmethod
+    def _split_call(text: str, pos: int) -> Optional[Tuple[List[str], int]]:
+        """Split ``(a, (b, c))`` starting at pos into arguments and the end offset."""
+        length = len(text)
+        while pos < length and text[pos] in ' \t\r\n':
+            pos += 1
+        if pos >= length or text[pos] != '(':
+            return None
+        depth = 0
+        args = []
+        start = pos + 1
+        for index in range(pos, length):
+            char = text[index]
+            if char == '(':
+                depth += 1
+            elif char == ')':
+                depth -= 1
+                if depth == 0:
+                    args.append(text[start:index].strip())
+                    if args == ['']:
+                        args = []
+                    return args, index + 1
+            elif char == ',' and depth == 1:
+                args.append(text[start:index].strip())
+                start = index + 1
+        return None
+
+
+def _common_prefix_length(a: str, b: str) -> int:
+    """Length of the common prefix of two strings, comparing halves in C."""
+    low, high = 0, min(len(a), len(b))
+    while low < high:
+        middle = (low + high + 1) // 2
+        if a[low:middle] == b[low:middle]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+def _common_suffix_length(a: str, b: str, limit: int) -> int:
+    """Length of the common suffix of two strings, at most limit."""
+    low, high = 0, limit
+    while low < high:
+        middle = (low + high + 1) // 2
+        if a[len(a) - middle:len(a) - low] == b[len(b) - middle:len(b) - low]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+class DTSyntaxError(ValueError):
+    """Raised when a keymap is not valid devicetree source."""
+
+    def __init__(self, message: str, source: str, offset: int, filename: str = '<keymap>'):
+        line = source.count('\n', 0, offset) + 1
+        column = offset - source.rfind('\n', 0, offset)
+        super().__init__(f"{filename}:{line}:{column}: {message}")
+        self.offset = offset
+        self.line = line
+        self.column = column
+
+
+class DTProperty:
+    """A devicetree property such as ``bindings = <&kp A &kp B>;``."""
+
+    __slots__ = ('name', 'values', 'start', 'end')
+
+    def __init__(self, name: str, values: List[Tuple[str, str]], start: int, end: int):
+        self.name = name
+        # (kind, text) pairs; kind is 'string', 'cells', 'bytes' or 'ref'
+        self.values = values
+        self.start = start
+        self.end = end
+
+    @property
+    def cells(self) -> str:
+        """Contents of all ``< >`` cell lists, joined with spaces."""
+        return ' '.join(text[1:-1].strip() for kind, text in self.values if kind == 'cells')
+
+    @property
+    def strings(self) -> List[str]:
+        """All string values without their quotes."""
+        return [text[1:-1] for kind, text in self.values if kind == 'string']
+
+    def value(self, expander: Optional[MacroExpander] = None):
+        """Convert the property to a Python value, expanding macros in cells."""
+        if not self.values:
+            return True
+        if all(kind == 'string' for kind, _ in self.values):
+            strings = self.strings
+            return strings[0] if len(strings) == 1 else strings
+        cells = [cell.strip()[1:-1].strip() if kind == 'cells' else cell for kind, cell in self.values]
+        if expander is not None:
+            cells = [expander.expand(cell) for cell in cells]
+        try:
+            numbers = [self._integer(item) for cell in cells for item in self.split_cells(cell)]
+        except ValueError:
+            return cells[0] if len(cells) == 1 else cells
+        return numbers[0] if len(numbers) == 1 else numbers
+
+    @staticmethod
+    def split_cells(text: str) -> List[str]:
+        """Split cell list contents on whitespace, keeping ``( )`` groups whole."""
+        items = []
+        depth = 0
+        start = None
+        for index, char in enumerate(text):
+            if char.isspace() and depth == 0:
+                if start is not None:
+                    items.append(text[start:index])
+                    start = None
+                continue
+            if start is None:
+                start = index
+            if char == '(':
+                depth += 1
+            elif char == ')':
+                depth -= 1
+        if start is not None:
+            items.append(text[start:])
+        return items
+
+    # Operators allowed in integer cell expressions and their C semantics
+    BINARY_OPERATORS = {
+        ast.Add: lambda a, b: a + b,
+        ast.Sub: lambda a, b: a - b,
+        ast.Mult: lambda a, b: a * b,
+        ast.Div: lambda a, b: abs(a) // abs(b) * (1 if (a < 0) == (b < 0) else -1),
+        ast.Mod: lambda a, b: a - abs(a) // abs(b) * (1 if (a < 0) == (b < 0) else -1) * b,
+        ast.LShift: lambda a, b: a << b,
+        ast.RShift: lambda a, b: a >> b,
+        ast.BitOr: lambda a, b: a | b,
+        ast.BitAnd: lambda a, b: a & b,
+        ast.BitXor: lambda a, b: a ^ b,
+    }
+    UNARY_OPERATORS = {ast.USub: lambda a: -a, ast.UAdd: lambda a: a, ast.Invert: lambda a: ~a}
+    # Cells are 32-bit; anything far outside 64 bits is not a devicetree value
+    INTEGER_LIMIT = 1 << 64
+
+    @staticmethod
+    def _integer(item: str) -> int:
+        """Evaluate an integer cell such as ``175``, ``0x10`` or ``(100 + 75)``."""
+        if not item.startswith('('):
+            return int(item, 0)
+        try:
+            tree = ast.parse(item, mode='eval')
+        except SyntaxError:
+            raise ValueError(item)
+        return DTProperty._evaluate(tree.body, item)
+
+    @staticmethod
+    def _evaluate(node: ast.AST, item: str) -> int:
+        """Evaluate a parsed expression with only integer arithmetic and bitwise operators."""
+        if isinstance(node, ast.Constant) and type(node.value) is int:
+            value = node.value
+        elif isinstance(node, ast.UnaryOp) and type(node.op) in DTProperty.UNARY_OPERATORS:
+            value = DTProperty.UNARY_OPERATORS[type(node.op)](DTProperty._evaluate(node.operand, item))
+        elif isinstance(node, ast.BinOp) and type(node.op) in DTProperty.BINARY_OPERATORS:
+            left = DTProperty._evaluate(node.left, item)
+            right = DTProperty._evaluate(node.right, item)
+            if isinstance(node.op, (ast.Div, ast.Mod)) and right == 0:
+                raise ValueError(item)
+            if isinstance(node.op, (ast.LShift, ast.RShift)) and not 0 <= right < 64:
+                raise ValueError(item)
+            value = DTProperty.BINARY_OPERATORS[type(node.op)](left, right)
+        else:
+            raise ValueError(item)
+        if abs(value) >= DTProperty.INTEGER_LIMIT:
+            raise ValueError(item)
+        return value
+
+
+class DTNode:
+    """A devicetree node with its properties, children and source offsets."""
+
+    __slots__ = ('name', 'labels', 'properties', 'children', 'parent', 'start', 'end')
+
+    def __init__(self, name: str, labels: List[str], start: int):
+        self.name = name
+        self.labels = labels
+        self.properties = {}
+        self.children = []
+        self.parent = None
+        # Offsets into the source text covering the whole node, labels to ';'
+        self.start = start
+        self.end = start
+
+    @property
+    def label(self) -> Optional[str]:
+        """The first label, e.g. ``hm`` for ``hm: homerow_mods``."""
+        return self.labels[0] if self.labels else None
+
+    def get(self, name: str, expander: Optional[MacroExpander] = None, default=None):
+        """Return the converted value of a property or a default."""
+        prop = self.properties.get(name)
+        return default if prop is None else prop.value(expander)
+
+    def walk(self):
+        """Yield this node and all of its descendants depth-first."""
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            yield node
+            stack.extend(reversed(node.children))
+
+
+class DeviceTree:
+    """Streaming lexer and recursive-descent parser for the keymap devicetree subset.
+
+    The source is tokenized in a single forward pass with one compiled
+    pattern; comments are dropped, preprocessor directives are kept as
+    tokens, and ``< >`` cell lists are captured whole by a balanced scan
+    (they may contain arbitrarily nested parenthesized expressions). Nodes and properties remember the offsets
+    of the text they were parsed from. Groups excluded by ``#if``/``#ifdef``
+    are skipped.
+    """
+
+    TOKEN_PATTERN = re.compile(r"""
+        (?P<ws>\s+)
+      | (?P<comment>//[^\n]*|/\*.*?\*/)
+      | (?P<directive>\#[ \t]*(?:include|define|undef|ifdef|ifndef|if|elif|else|endif|pragma|error|warning|line)\b(?:\\\r?\n|[^\n])*)
+      | (?P<string>"(?:[^"\\]|\\.)*")
+      | (?P<cells><)
+      | (?P<bytes>\[[^\]]*\])
+      | (?P<ref>&\{[^}]*\}|&[\w,.+\-@]+)
+      | (?P<label>[A-Za-z_][\w\-]*)[ \t]*:(?!:)
+      | (?P<keyword>/[a-z\-]+/)
+      | (?P<name>[\w,.+\-\#@]+|/)
+      | (?P<punct>[{};=,])
+    """, re.VERBOSE | re.DOTALL)
+    # Next line of a skipped #if group that starts with '#'; group 1 is the '#'
+    SKIPPED_LINE_PATTERN = re.compile(r'^[ \t]*(\#)', re.MULTILINE)
+
+    def __init__(self, source: str, filename: str = '<keymap>'):
+        self.source = source
+        self.filename = filename
+        self.roots = []
+        self.directives = []
+        self.includes = []
+
+    @classmethod
+    def parse(cls, source: str, filename: str = '<keymap>') -> 'DeviceTree':
+        """Tokenize and parse source text into a node tree."""
+        tree = cls(source, filename)
+        tree._tokens = tree._tokenize(0, len(source))
+        tree._index = 0
+        while tree._index < len(tree._tokens):
+            node = tree._parse_statement(None)
+            if node is not None:
+                tree.roots.append(node)
+        del tree._tokens, tree._index
+        return tree
+
+    def _tokenize(self, start: int, end: int) -> List[Tuple[str, str, int]]:
+        """Split source[start:end] into (kind, text, offset) tokens.
+
+        Text in a false ``#if``/``#ifdef`` group is not tokenized; only its
+        directives are read, to find where the group ends.
+        """
+        tokens = []
+        source = self.source
+        match = self.TOKEN_PATTERN.match
+        conditions = MacroExpander()
+        pos = start
+        while pos < end:
+            if not conditions.active:
+                line = self.SKIPPED_LINE_PATTERN.search(source, pos, end)
+                pos = end if line is None else line.start(1)
+                if pos >= end:
+                    break
+            m = match(source, pos, end)
+            if m is None:
+                raise DTSyntaxError(f"unexpected character {source[pos]!r}", source, pos, self.filename)
+            kind = m.lastgroup
+            if kind != 'directive' and not conditions.active:
+                pos = m.end()
+                continue
+            if kind == 'cells':
+                cells_end = self._scan_cells(pos, end)
+                text = source[pos:cells_end]
+                if '/' in text:
+                    text = MacroExpander._strip_comments_multiline(text)
+                tokens.append((kind, text, pos))
+                pos = cells_end
+                continue
+            if kind == 'directive':
+                text = m.group()
+                self.directives.append(text)
+                try:
+                    conditions.apply_directive(text)
+                except ValueError as e:
+                    raise DTSyntaxError(str(e), source, pos, self.filename)
+                include = re.match(r'\#\s*include\s*[<"]([^>"]+)[>"]', text)
+                if include and conditions.active:
+                    self.includes.append(include.group(1))
+            elif kind == 'label':
+                tokens.append((kind, m.group('label'), pos))
+            elif kind != 'ws' and kind != 'comment':
+                tokens.append((kind, m.group(), pos))
+            pos = m.end()
+        if conditions.depth:
+            raise DTSyntaxError("unterminated #if", source, end, self.filename)
+        return tokens
+
+    def _scan_cells(self, start: int, end: int) -> int:
+        """End offset of the ``< >`` cell list opening at start.
+
+        Parentheses may nest to any depth and ``<``/``>`` inside them are
+        shift or comparison operators; comments are skipped.
+        """
+        source = self.source
+        depth = 0
+        pos = start + 1
+        while pos < end:
+            char = source[pos]
+            if char == '/' and source.startswith('//', pos):
+                newline = source.find('\n', pos, end)
+                pos = end if newline < 0 else newline
+                continue
+            if char == '/' and source.startswith('/*', pos):
+                close = source.find('*/', pos + 2, end)
+                if close < 0:
+                    break
+                pos = close + 2
+                continue
+            if char == '(':
+                depth += 1
+            elif char == ')':
+                if depth == 0:
+                    raise DTSyntaxError("unbalanced ')' in cell list", source, pos, self.filename)
+                depth -= 1
+            elif char == '>' and depth == 0:
+                return pos + 1
+            elif char in '<{};' and depth == 0:
+                break
+            pos += 1
+        raise DTSyntaxError("unterminated cell list", source, start, self.filename)
+
+    def _peek(self, offset: int = 0) -> Tuple[str, str, int]:
+        index = self._index + offset
+        if index < len(self._tokens):
+            return self._tokens[index]
+        return ('eof', '', len(self.source))
+
+    def _expect(self, text: str) -> Tuple[str, str, int]:
+        token = self._peek()
+        if token[1] != text or token[0] not in ('punct', 'name'):
+            raise DTSyntaxError(f"expected {text!r}, found {token[1] or 'end of file'!r}", self.source, token[2], self.filename)
+        self._index += 1
+        return token
+
+    def _parse_statement(self, parent: Optional[DTNode]) -> Optional[DTNode]:
+        """Parse a node or, inside a node, a property; returns the node if any."""
+        kind, text, start = self._peek()
+        if kind == 'punct' and text == ';':
+            self._index += 1
+            return None
+        if kind == 'keyword':
+            # /dts-v1/;, /delete-node/ name;, /delete-property/ name; and friends
+            while self._peek()[0] != 'eof' and self._peek()[1] != ';':
+                self._index += 1
+            self._index += 1
+            return None
+        labels = []
+        while kind == 'label':
+            labels.append(text)
+            self._index += 1
+            kind, text, _ = self._peek()
+        if kind not in ('name', 'ref'):
+            raise DTSyntaxError(f"unexpected {text or 'end of file'!r}", self.source, self._peek()[2], self.filename)
+        self._index += 1
+        following = self._peek()
+        if following[1] == '{' and following[0] == 'punct':
+            return self._parse_node(text, labels, start, parent)
+        if parent is None:
+            raise DTSyntaxError(f"property {text!r} outside of a node", self.source, start, self.filename)
+        values = []
+        if following[1] == '=' and following[0] == 'punct':
+            self._index += 1
+            while True:
+                value_kind, value_text, value_start = self._peek()
+                if value_kind not in ('string', 'cells', 'bytes', 'ref'):
+                    raise DTSyntaxError(f"bad value for {text!r}", self.source, value_start, self.filename)
+                values.append((value_kind, value_text))
+                self._index += 1
+                if self._peek()[1] != ',':
+                    break
+                self._index += 1
+        end = self._expect(';')[2] + 1
+        parent.properties[text] = DTProperty(text, values, start, end)
+        return None
+
+    def _parse_node(self, name: str, labels: List[str], start: int, parent: Optional[DTNode]) -> DTNode:
+        """Parse ``{ ... };`` after a node name."""
+        node = DTNode(name, labels, start)
+        node.parent = parent
+        self._expect('{')
+        while not (self._peek()[0] == 'punct' and self._peek()[1] == '}'):
+            if self._peek()[0] == 'eof':
+                raise DTSyntaxError(f"unterminated node {name!r}", self.source, start, self.filename)
+            child = self._parse_statement(node)
+            if child is not None:
+                node.children.append(child)
+        self._index += 1
+        node.end = self._expect(';')[2] + 1
+        return node
+
+    def reparse(self, source: str) -> Optional[DTNode]:
+        """Update the tree for edited source, re-lexing only the edited node.
+
+        The edit is located by comparing the old and new text; the deepest
+        node enclosing it (or, if the edit does not fit that node, the next
+        one out) is re-tokenized and re-parsed from the new source, and the
+        offsets of everything after it are shifted. Returns the new
+        node, or None when the edit could not be isolated (directives or
+        top-level structure changed) and the whole source was parsed again.
+        """
+        old = self.source
+        prefix = _common_prefix_length(old, source)
+        suffix = _common_suffix_length(old, source, min(len(old), len(source)) - prefix)
+        old_end = len(old) - suffix
+        delta = len(source) - len(old)
+
+        # Nodes whose text strictly encloses the edit, outermost first
+        enclosing = []
+        siblings = self.roots
+        while True:
+            for node in siblings:
+                if node.start < prefix and old_end < node.end:
+                    enclosing.append(node)
+                    siblings = node.children
+                    break
+            else:
+                break
+
+        # Re-parse the deepest one; if the edit does not fit it (say a sibling
+        # was inserted next to it), try the nodes around it
+        for target in reversed(enclosing):
+            directives = len(self.directives)
+            self.source = source
+            try:
+                self._tokens = self._tokenize(target.start, target.end + delta)
+                self._index = 0
+                replacement = self._parse_statement(target.parent)
+                complete = self._index == len(self._tokens)
+            except DTSyntaxError:
+                replacement, complete = None, False
+            finally:
+                self._tokens, self._index = [], 0
+            if (complete and replacement is not None and replacement.name == target.name
+                    and len(self.directives) == directives):
+                self._shift(old_end, delta)
+                replacement.parent = target.parent
+                container = target.parent.children if target.parent is not None else self.roots
+                container[container.index(target)] = replacement
+                return replacement
+            del self.directives[directives:]
+            self.source = old
+
+        tree = DeviceTree.parse(source, self.filename)
+        self.source, self.roots = tree.source, tree.roots
+        self.directives, self.includes = tree.directives, tree.includes
+        return None
+
+    def _shift(self, old_end: int, delta: int):
+        """Move offsets at or after old_end by delta after an in-place edit."""
+        for node in self.walk():
+            if node.start >= old_end:
+                node.start += delta
+            if node.end >= old_end:
+                node.end += delta
+            for prop in node.properties.values():
+                if prop.start >= old_end:
+                    prop.start += delta
+                    prop.end += delta
+
+    def walk(self):
+        """Yield every node in document order."""
+        for root in self.roots:
+            yield from root.walk()
+
+    def find_compatible(self, compatible: str) -> List[DTNode]:
+        """Return all nodes whose compatible string matches."""
+        matches = []
+        for node in self.walk():
+            value = node.get('compatible', default=())
+            if value == compatible or (isinstance(value, list) and compatible in value):
+                matches.append(node)
+        return matches
+
+    def find_by_label(self, label: str) -> Optional[DTNode]:
+        """Return the node declared with the given label."""
+        for node in self.walk():
+            if label in node.labels:
+                return node
+        return None
+
+
+class Profiler:
+    """Per-phase wall time, allocation and counter recorder.
+
+    Phases are timed with ``with profiler.phase('name'):`` and may nest.
+    When allocation tracing is on, tracemalloc reports the net bytes each
+    phase allocated and its peak traced memory. A disabled profiler hands
+    out a shared no-op context so instrumented code costs almost nothing.
+    """
+
+    _NULL_PHASE = contextlib.nullcontext()
+
+    def __init__(self, enabled: bool = True, trace_allocations: bool = True):
+        self.enabled = enabled
+        self.trace_allocations = enabled and trace_allocations
+        self.records = []
+        self.counters = {}
+        self._stack = []
+        self._origin = time.perf_counter()
+        if self.trace_allocations and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def phase(self, name: str, **args):
+        """Context manager timing one phase; extra keyword args are recorded with it."""
+        if not self.enabled:
+            return self._NULL_PHASE
+        return self._phase(name, args)
+
+    @contextlib.contextmanager
+    def _phase(self, name: str, args: Dict):
+        record = {'name': name, 'args': args, 'depth': len(self._stack)}
+        if self.trace_allocations:
+            current, peak = tracemalloc.get_traced_memory()
+            if self._stack:
+                # Fold the peak so far into the enclosing phase before resetting it
+                self._stack[-1]['peak_bytes'] = max(self._stack[-1]['peak_bytes'], peak)
+            tracemalloc.reset_peak()
+            record['start_bytes'] = current
+            record['peak_bytes'] = current
+        self._stack.append(record)
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            end = time.perf_counter()
+            self._stack.pop()
+            record['start_ms'] = (start - self._origin) * 1000
+            record['duration_ms'] = (end - start) * 1000
+            if self.trace_allocations:
+                current, peak = tracemalloc.get_traced_memory()
+                record['peak_bytes'] = max(record['peak_bytes'], peak)
+                record['allocated_bytes'] = current - record.pop('start_bytes')
+                if self._stack:
+                    self._stack[-1]['peak_bytes'] = max(self._stack[-1]['peak_bytes'], record['peak_bytes'])
+            self.records.append(record)
+
+    def count(self, name: str, value: int = 1):
+        """Add to a named counter."""
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def set_counter(self, name: str, value: int):
+        """Set a named counter to an absolute value."""
+        if self.enabled:
+            self.counters[name] = value
+
+    def to_json(self) -> Dict:
+        """Phases in start order plus totals per phase name and the counters."""
+        phases = sorted(self.records, key=lambda record: record['start_ms'])
+        totals = {}
+        for record in phases:
+            total = totals.setdefault(record['name'], {'calls': 0, 'duration_ms': 0.0})
+            total['calls'] += 1
+            total['duration_ms'] += record['duration_ms']
+        return {'generator_version': GENERATOR_VERSION, 'phases': phases, 'totals': totals, 'counters': self.counters}
+
+    def to_chrome_trace(self) -> Dict:
+        """Events in the Chrome trace format (chrome://tracing, Perfetto)."""
+        events = []
+        for record in sorted(self.records, key=lambda record: record['start_ms']):
+            args = dict(record['args'])
+            for field in ('allocated_bytes', 'peak_bytes'):
+                if field in record:
+                    args[field] = record[field]
+            events.append({'name': record['name'], 'ph': 'X', 'pid': os.getpid(), 'tid': 0,
+                           'ts': record['start_ms'] * 1000, 'dur': record['duration_ms'] * 1000, 'args': args})
+        end = max((event['ts'] + event['dur'] for event in events), default=0)
+        events.append({'name': 'counters', 'ph': 'C', 'pid': os.getpid(), 'tid': 0, 'ts': end, 'args': self.counters})
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def write(self, path: str, trace_format: str = 'json'):
+        """Write the profile as plain JSON or a Chrome trace."""
+        data = self.to_chrome_trace() if trace_format == 'chrome' else self.to_json()
+        with open(path, 'w') as f:
+            json.dump(data, f, indent=2)
+            f.write('\n')
+
+
+class ReadmeCache:
+    """Content-addressed on-disk cache for parsed keymaps and rendered sections.
+
+    Entries are pickled into ``<directory>/<kind>-<sha256>.pickle`` where the
+    hash covers the generator version and the inputs that produced the entry,
+    so a changed input simply misses and a stale entry is never read. When
+    the directory grows past ``max_bytes`` the least recently used entries
+    are removed.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 8 * 1024 * 1024, enabled: bool = True):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(*parts) -> str:
+        """Hash the generator version together with the given inputs."""
+        digest = hashlib.sha256(GENERATOR_VERSION.encode())
+        for part in parts:
+            data = part if isinstance(part, bytes) else repr(part).encode()
+            digest.update(len(data).to_bytes(8, 'little'))
+            digest.update(data)
+        return digest.hexdigest()
+
+    def _path(self, kind: str, key: str) -> str:
+        return os.path.join(self.directory, f"{kind}-{key}.pickle")
+
+    def get(self, kind: str, key: str):
+        """Return the cached value or None on a miss."""
+        if not self.enabled:
+            return None
+        path = self._path(kind, key)
+        try:
+            with open(path, 'rb') as f:
+                value = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+            self.misses += 1
+            return None
+        # Touch the entry so eviction drops the least recently used ones first
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self.hits += 1
+        return value
+
+    def put(self, kind: str, key: str, value):
+        """Store a value atomically and evict old entries if over the limit."""
+        if not self.enabled:
+            return
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self._path(kind, key))
+        except OSError:
+            return
+        self.evict()
+
+    def cached(self, kind: str, key: str, compute):
+        """Return the cached value for key, computing and storing it on a miss."""
+        value = self.get(kind, key)
+        if value is None:
+            value = compute()
+            self.put(kind, key, value)
+        return value
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits max_bytes."""
+        try:
+            entries = [entry for entry in os.scandir(self.directory) if entry.name.endswith('.pickle')]
+        except OSError:
+            return
+        stats = []
+        for entry in entries:
+            try:
+                stat = entry.stat()
+            except OSError:
+                # Removed concurrently by another generator process
+                continue
+            stats.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in stats)
+        for _, size, path in sorted(stats):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+
+    def clear(self):
+        """Delete every cache entry."""
+        try:
+            entries = list(os.scandir(self.directory))
+        except OSError:
+            return
+        for entry in entries:
+            if entry.name.endswith(('.pickle', '.tmp')):
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    pass
+
+
+class KeyboardLayout:
+    """Physical key arrangement used to draw the ASCII layer tables.
+
+    A layout is a list of rows; each row is a list of segments with an
+    ``indent`` (spaces before the segment), an optional ``title`` and the
+    key positions drawn left to right. The whole table is compiled once
+    into a single format string with one placeholder per key, so rendering
+    a layer is one ``str.format`` call over its labels. An optional
+    ``fingers`` list assigns each key position a hand and finger such as
+    ``"LI"`` (left index) or ``"RT"`` (right thumb) for typing analysis.
+    """
+
+    def __init__(self, name: str, rows: List[List[Dict]], cell_width: int = 5,
+                 fingers: Optional[List[str]] = None):
+        self.name = name
+        self.rows = rows
+        self.cell_width = cell_width
+        self.fingers = fingers
+        self.order = [key for row in rows for segment in row for key in segment['keys'] if key is not None]
+        self.key_count = max(self.order) + 1 if self.order else 0
+        self.template = self._compile()
+
+    @classmethod
+    def from_json(cls, path: str) -> 'KeyboardLayout':
+        """Load a layout description such as ``layouts/corne.json``."""
+        with open(path, 'r') as f:
+            data = json.load(f)
+        return cls(data.get('name', os.path.basename(path)), data['rows'], data.get('cell_width', 5),
+                   data.get('fingers'))
+
+    @classmethod
+    def from_matrix_transform(cls, node: DTNode, expander: Optional[MacroExpander] = None,
+                              cell_width: int = 5) -> Optional['KeyboardLayout']:
+        """Derive a layout from a ``zmk,matrix-transform`` node's ``RC(row, col)`` map."""
+        prop = node.properties.get('map')
+        if prop is None:
+            return None
+        cells = expander.expand(prop.cells) if expander else prop.cells
+        entries = [(int(row), int(col)) for row, col in re.findall(r'RC\(\s*(\d+)\s*,\s*(\d+)\s*\)', cells)]
+        if not entries:
+            return None
+        columns = node.get('columns', expander) or max(col for _, col in entries) + 1
+        half = (columns + 1) // 2
+        step = cell_width + 3
+        # Absolute character column of each key; the right half is shifted by a gap
+        positions = {}
+        for position, (row, col) in enumerate(entries):
+            x = col * step if col < half else half * step + 1 + 4 + (col - half) * step
+            positions.setdefault(row, []).append((x, position))
+        rows = []
+        for row in sorted(positions):
+            segments = []
+            cursor = 0
+            for x, position in sorted(positions[row]):
+                if segments and x == segment_end:
+                    segments[-1]['keys'].append(position)
+                else:
+                    segments.append({'indent': x - cursor, 'keys': [position]})
+                segment_end = x + step
+                cursor = segment_end + 1
+            rows.append(segments)
+        return cls(node.name, rows, cell_width)
+
+    def _segment_width(self, segment: Dict) -> int:
+        return len(segment['keys']) * (self.cell_width + 3) + 1
+
+    def _line(self, row: List[Dict], draw) -> str:
+        return ''.join(' ' * segment.get('indent', 0) + draw(segment) for segment in row).rstrip()
+
+    def _compile(self) -> str:
+        """Build the format string for the whole table."""
+        width = self.cell_width
+        lines = []
+        if self.rows and any('title' in segment for segment in self.rows[0]):
+            lines.append(self._line(self.rows[0], lambda seg: '+' + '-' * (self._segment_width(seg) - 2) + '+'))
+            lines.append(self._line(self.rows[0], lambda seg: '|' + seg.get('title', '').center(
+                self._segment_width(seg) - 2).replace('{', '{{').replace('}', '}}') + '|'))
+
+        def border(segment):
+            return '+' + '+'.join('-' * (width + 2) for _ in segment['keys']) + '+'
+
+        def cells(segment):
+            return '|' + '|'.join(' ' * (width + 2) if key is None else " {} "
+                                  for key in segment['keys']) + '|'
+
+        for index, row in enumerate(self.rows):
+            if index == 0:
+                lines.append(self._line(row, border))
+            lines.append(self._line(row, cells))
+            lines.append(self._line(row, border))
+        return '\n'.join(lines)
+
+    def render(self, labels: List[str], fill: str = '✗') -> str:
+        """Render labels (indexed by key position) through the compiled template, centered by display width."""
+        if len(labels) < self.key_count:
+            labels = list(labels) + [fill] * (self.key_count - len(labels))
+        return self.template.format(*[center_cells(labels[key], self.cell_width) for key in self.order])
+
+    def key_grid(self) -> Dict[int, Tuple[int, int]]:
+        """Character column and row index of each key's cell in the ASCII table."""
+        grid = {}
+        for row_index, row in enumerate(self.rows):
+            cursor = 0
+            for segment in row:
+                cursor += segment.get('indent', 0)
+                for index, key in enumerate(segment['keys']):
+                    if key is not None:
+                        grid[key] = (cursor + index * (self.cell_width + 3), row_index)
+                cursor += self._segment_width(segment)
+        return grid
+
+    def fingerprint(self) -> str:
+        """Stable identity of the layout for cache keys."""
+        return json.dumps([self.rows, self.cell_width], sort_keys=True)
+
+
+@functools.lru_cache(maxsize=4096)
+def display_width(text: str) -> int:
+    """Terminal cells text occupies: wide and fullwidth characters take two, combining marks none."""
+    if text.isascii():
+        return len(text)
+    width = 0
+    for char in text:
+        if unicodedata.combining(char) or unicodedata.category(char) in ('Mn', 'Me', 'Cf'):
+            continue
+        width += 2 if unicodedata.east_asian_width(char) in ('W', 'F') else 1
+    return width
+
+
+def center_cells(text: str, width: int) -> str:
+    """Pad text to width display cells, centered like ``format(text, '^width')``."""
+    pad = width - display_width(text)
+    if pad <= 0:
+        return text
+    return ' ' * (pad // 2) + text + ' ' * (pad - pad // 2)
+
+
+class LabelEngine:
+    """Abbreviate key labels to fit layer-table cells.
+
+    Widths are display cells (display_width), not characters, so symbols
+    such as ``⌫`` and wide emoji keep the table aligned. A label that does
+    not fit is abbreviated by the first rule whose pattern matches it: a
+    rule is a regex and templates filled from its named groups, tried in
+    order until one fits, the last being cut to width. Labels matching no
+    rule are cut. Results are memoized by ``(label, width)`` in an LRU
+    cache shared by every layer and output of a parser, so each distinct
+    label is abbreviated once.
+    """
+
+    DEFAULT_RULES = [
+        # Layer tap: LT(NAV,⏎) -> N:⏎
+        (r'LT\((?P<layer>\w+),(?P<key>.+?)\)', ('{layer:.1}:{key}',)),
+        # Momentary layer: MO(FIRMWARE) -> MO(FI) or M:F
+        (r'MO\((?P<layer>\w+)\)', ('MO({layer:.2})', 'M:{layer:.1}')),
+        # Hold-tap modifier: CT+C_BRI_DN -> CT+C_B, keeping the modifier whole
+        (r'(?P<mod>[^+]*(?:CT|AT|GM))\+(?P<key>.+)', ('{mod}+{key}',)),
+    ]
+
+    def __init__(self, rules: Optional[List[Tuple[str, Tuple[str, ...]]]] = None, cache_size: int = 4096):
+        self.rules = [(re.compile(pattern), tuple(templates))
+                      for pattern, templates in (self.DEFAULT_RULES if rules is None else rules)]
+        self.fit = functools.lru_cache(maxsize=cache_size)(self._fit)
+
+    def add_rule(self, pattern: str, *templates: str):
+        """Abbreviate labels matching pattern (e.g. a user-defined behavior's) before the other rules."""
+        self.rules.insert(0, (re.compile(pattern), templates))
+        self.fit.cache_clear()
+
+    def fingerprint(self) -> str:
+        """Stable identity of the abbreviation rules for cache keys."""
+        return repr([(pattern.pattern, templates) for pattern, templates in self.rules])
+
+    @staticmethod
+    def truncate(text: str, width: int) -> str:
+        """Cut text to at most width display cells, keeping combining marks with their base."""
+        if display_width(text) <= width:
+            return text
+        used = 0
+        for index, char in enumerate(text):
+            used += display_width(char)
+            if used > width:
+                return text[:index]
+        return text
+
+    def _fit(self, label: str, width: int) -> str:
+        if display_width(label) <= width:
+            return label
+        for pattern, templates in self.rules:
+            match = pattern.match(label)
+            if match is None:
+                continue
+            fields = match.groupdict()
+            for template in templates:
+                text = template.format(**fields)
+                if display_width(text) <= width:
+                    return text
+            return self.truncate(text, width)
+        return self.truncate(label, width)
+
+
+class KconfigTable:
+    """Kconfig symbols merged from ``.conf`` fragments and build ``.config`` files.
+
+    Each fragment is scanned once with a single line pattern. Values are
+    typed from their syntax: ``y``/``n`` are booleans, ``m`` a tristate,
+    ``"..."`` a string, ``0x..`` hex and other numbers ints, and ``#
+    CONFIG_X is not set`` is False. Later fragments override earlier ones,
+    in the order Kconfig merges board defaults, the shield ``.conf`` and a
+    build's ``.config``. Names are stored without the ``CONFIG_`` prefix
+    and looked up by exact name.
+    """
+
+    LINE = re.compile(r'^[ \t]*(?:CONFIG_(\w+)[ \t]*=(.*)|#[ \t]*CONFIG_(\w+) is not set)[ \t\r]*$', re.M)
+    HEX = re.compile(r'[-+]?0[xX][0-9a-fA-F]+')
+    INT = re.compile(r'[-+]?[0-9]+')
+
+    def __init__(self):
+        self.values = {}
+        self.types = {}
+        self.sources = {}
+
+    @classmethod
+    def from_files(cls, paths: Iterable[str]) -> 'KconfigTable':
+        table = cls()
+        for path in paths:
+            with open(path, 'r') as f:
+                table.update(f.read(), path)
+        return table
+
+    @classmethod
+    def parse_value(cls, raw: str) -> Tuple[object, str]:
+        """``(value, type)`` for the right-hand side of an assignment."""
+        raw = raw.strip()
+        if raw.startswith('"'):
+            end = raw.rfind('"')
+            body = raw[1:end] if end > 0 else raw[1:]
+            return re.sub(r'\\(.)', r'\1', body), 'string'
+        # Unquoted values end at a trailing comment
+        raw = raw.split('#', 1)[0].strip()
+        if raw in ('y', 'n'):
+            return raw == 'y', 'bool'
+        if raw == 'm':
+            return 'm', 'tristate'
+        if cls.HEX.fullmatch(raw):
+            return int(raw, 16), 'hex'
+        if cls.INT.fullmatch(raw):
+            return int(raw), 'int'
+        return raw, 'string'
+
+    def update(self, text: str, source: str = ''):
+        """Merge one fragment; its assignments override earlier ones."""
+        values, types, sources = self.values, self.types, self.sources
+        for name, raw, unset in self.LINE.findall(text):
+            if unset:
+                name, value, kind = unset, False, 'bool'
+            else:
+                value, kind = self.parse_value(raw)
+            values[name] = value
+            types[name] = kind
+            sources[name] = source
+
+    @staticmethod
+    def _name(name: str) -> str:
+        return name[7:] if name.startswith('CONFIG_') else name
+
+    def __contains__(self, name: str) -> bool:
+        return self._name(name) in self.values
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def get(self, name: str, default=None):
+        """A symbol's typed value; ``CONFIG_`` is optional in the name."""
+        return self.values.get(self._name(name), default)
+
+    def type(self, name: str) -> Optional[str]:
+        return self.types.get(self._name(name))
+
+    def enabled(self, name: str) -> bool:
+        """Whether a bool or tristate symbol is set to ``y`` or ``m``."""
+        return self.get(name) in (True, 'm')
+
+
+class ConfigFeature:
+    """A line of the README's Configuration Features section.
+
+    ``check`` gets the merged KconfigTable and returns whether the feature
+    is enabled, or None to leave it out of the README.
+    """
+
+    def __init__(self, description: str, check):
+        self.description = description
+        self.check = check
+
+
+# Features listed in the README, in order; extend with register_feature()
+CONFIG_FEATURES: List[ConfigFeature] = []
+
+
+def register_feature(description: str, symbol: Optional[str] = None, check=None) -> ConfigFeature:
+    """Add a README feature shown when symbol is set, or decided by a custom check."""
+    if check is None:
+        if symbol is None:
+            raise ValueError("register_feature() needs a symbol or a check")
+        check = lambda table: table.enabled(symbol) if symbol in table else None
+    feature = ConfigFeature(description, check)
+    CONFIG_FEATURES.append(feature)
+    return feature
+
+
+register_feature('Display support', 'CONFIG_ZMK_DISPLAY')
+register_feature('WPM status widget', 'CONFIG_ZMK_WIDGET_WPM_STATUS')
+register_feature('Battery percentage display', 'CONFIG_ZMK_WIDGET_BATTERY_STATUS_SHOW_PERCENTAGE')
+register_feature('BLE passkey entry', 'CONFIG_ZMK_BLE_PASSKEY_ENTRY')
+
+
+def config_features(table: KconfigTable, features: Optional[List[ConfigFeature]] = None) -> Dict[str, bool]:
+    """Evaluate the registered features against a symbol table."""
+    result = {}
+    for feature in CONFIG_FEATURES if features is None else features:
+        enabled = feature.check(table)
+        if enabled is not None:
+            result[feature.description] = bool(enabled)
+    return result
+
+
+class SymbolTable:
+    """Interns behavior and keycode names as small integers shared by all layers."""
+
+    __slots__ = ('ids', 'names')
+
+    def __init__(self):
+        self.ids = {}
+        self.names = []
+
+    def intern(self, name: str) -> int:
+        """Return the id for name, assigning the next free one if it is new."""
+        symbol = self.ids.get(name)
+        if symbol is None:
+            symbol = self.ids[name] = len(self.names)
+            self.names.append(name)
+        return symbol
+
+    def __getitem__(self, symbol: int) -> str:
+        return self.names[symbol]
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+
+class Binding:
+    """One parsed binding, e.g. ``Binding('hm', ('LCTRL', 'A'))`` for ``&hm LCTRL A``."""
+
+    __slots__ = ('behavior', 'params')
+
+    def __init__(self, behavior: str, params: Tuple[str, ...] = ()):
+        self.behavior = behavior
+        self.params = params
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Binding) and self.behavior == other.behavior and self.params == other.params
+
+    def __hash__(self) -> int:
+        return hash((self.behavior, self.params))
+
+    def __str__(self) -> str:
+        return ' '.join(('&' + self.behavior,) + self.params)
+
+    def __repr__(self) -> str:
+        return f"Binding({self.behavior!r}, {self.params!r})"
+
+
+class Layer:
+    """A layer's bindings stored as interned, array-backed columns.
+
+    ``behaviors[i]`` is the symbol id of key i's behavior and its params are
+    ``params[offsets[i]:offsets[i + 1]]``. Binding objects and display
+    labels are only created when a key is accessed.
+    """
+
+    __slots__ = ('name', 'label', 'symbols', 'behaviors', 'offsets', 'params')
+
+    def __init__(self, name: str, label: str, symbols: SymbolTable):
+        self.name = name
+        self.label = label
+        self.symbols = symbols
+        self.behaviors = array('I')
+        self.offsets = array('I', [0])
+        self.params = array('I')
+
+    @classmethod
+    def from_bindings(cls, name: str, label: str, bindings, symbols: SymbolTable) -> 'Layer':
+        """Build a layer from ``(behavior, params)`` tuples."""
+        layer = cls(name, label, symbols)
+        intern = symbols.intern
+        for behavior, params in bindings:
+            layer.behaviors.append(intern(behavior))
+            layer.params.extend(intern(param) for param in params)
+            layer.offsets.append(len(layer.params))
+        return layer
+
+    def __len__(self) -> int:
+        return len(self.behaviors)
+
+    def __getitem__(self, position: int) -> Binding:
+        names = self.symbols.names
+        params = self.params[self.offsets[position]:self.offsets[position + 1]]
+        return Binding(names[self.behaviors[position]], tuple(names[param] for param in params))
+
+    def __iter__(self):
+        for position in range(len(self.behaviors)):
+            yield self[position]
+
+    def tokens(self) -> List[Tuple[str, Tuple[str, ...]]]:
+        """Return every binding as a plain ``(behavior, params)`` tuple."""
+        return [(binding.behavior, binding.params) for binding in self]
+
+    def column_bytes(self) -> bytes:
+        """The interned columns for cache keys; only comparable under the same SymbolTable."""
+        return len(self).to_bytes(4, 'little') + self.behaviors.tobytes() + self.offsets.tobytes() + self.params.tobytes()
+
+
+class ComboIndex:
+    """Index of combos by layer and key position, stored as bitmasks.
+
+    Bit i of ``masks[layer][position]`` is set when combo i uses that
+    position and is active on that layer, so the combos touching a key
+    are one dict lookup away and overlapping combos are found by OR-ing
+    the masks of a combo's positions instead of comparing every pair.
+    """
+
+    # ZMK's default when a combo has no timeout-ms property
+    DEFAULT_TIMEOUT_MS = 50
+
+    def __init__(self, combos: List[Dict], layer_count: int):
+        self.combos = combos
+        self.layer_count = layer_count
+        self.masks = [{} for _ in range(layer_count)]
+        for bit, combo in enumerate(combos):
+            for layer in self.active_layers(combo):
+                masks = self.masks[layer]
+                for position in combo['positions']:
+                    masks[position] = masks.get(position, 0) | (1 << bit)
+
+    def active_layers(self, combo: Dict) -> List[int]:
+        """Layers a combo is active on; no ``layers`` property means all of them."""
+        return [layer for layer in combo['layers'] if 0 <= layer < self.layer_count] or list(range(self.layer_count))
+
+    def _combos_in(self, mask: int) -> List[Dict]:
+        combos = []
+        while mask:
+            low = mask & -mask
+            combos.append(self.combos[low.bit_length() - 1])
+            mask ^= low
+        return combos
+
+    def combos_at(self, layer: int, position: int) -> List[Dict]:
+        """Combos that include a key position on a layer."""
+        return self._combos_in(self.masks[layer].get(position, 0) if layer < self.layer_count else 0)
+
+    def conflicts(self) -> List[Tuple[str, Dict, Dict, List[int]]]:
+        """Find combos sharing positions on a common layer.
+
+        Returns ``(kind, combo, other, layers)`` where kind is 'duplicate'
+        (same positions), 'shadows' (combo's positions are a subset of
+        other's) or 'timeout' (overlapping combos with different timeouts).
+        """
+        found = []
+        for bit, combo in enumerate(self.combos):
+            positions = set(combo['positions'])
+            shared = {}
+            for layer in self.active_layers(combo):
+                candidates = 0
+                for position in positions:
+                    candidates |= self.masks[layer].get(position, 0)
+                # Only report each pair once, from the lower-numbered combo
+                candidates &= ~((1 << (bit + 1)) - 1)
+                for other in self._combos_in(candidates):
+                    shared.setdefault(id(other), (other, []))[1].append(layer)
+            for other, layers in shared.values():
+                other_positions = set(other['positions'])
+                if positions == other_positions:
+                    found.append(('duplicate', combo, other, layers))
+                elif positions < other_positions:
+                    found.append(('shadows', combo, other, layers))
+                elif other_positions < positions:
+                    found.append(('shadows', other, combo, layers))
+                timeout = combo['timeout_ms'] or self.DEFAULT_TIMEOUT_MS
+                other_timeout = other['timeout_ms'] or self.DEFAULT_TIMEOUT_MS
+                if timeout != other_timeout:
+                    found.append(('timeout', combo, other, layers))
+        return found
+
+
+class LayerResolver:
+    """Effective binding of every key for each reachable set of active layers.
+
+    A state is the bitmask of explicitly activated layers (bit 0, the
+    default layer, is always set), with the key positions held on every
+    way of getting there. Starting from the default layer, every key that
+    changes layers (``&mo``, layer-taps, ``&to``, ``&tog``) is followed to
+    a new state, and conditional layers are applied on top. The effective
+    keymap is memoized per active-layer bitmask. If more than max_states
+    masks are reachable the search stops with a RuntimeWarning.
+    """
+
+    # Bound on explored states so very large configs stay tractable
+    MAX_STATES = 16384
+    NONE = Binding('none')
+
+    def __init__(self, layers: List[Layer], layer_action, conditional_layers: List[Tuple[int, int]] = (),
+                 max_states: int = MAX_STATES):
+        self.layers = layers
+        self.layer_action = layer_action
+        self.conditional_layers = list(conditional_layers)
+        self.max_states = max_states
+        self.size = max((len(layer) for layer in layers), default=0)
+        # Non-transparent bindings of each layer, and the layer change each one makes
+        self._opaque = [[(position, layer[position]) for position in range(len(layer))
+                         if layer.symbols[layer.behaviors[position]] != 'trans'] for layer in layers]
+        self._actions = [{position: layer_action(binding) for position, binding in opaque}
+                         for opaque in self._opaque]
+        self.effective = functools.lru_cache(maxsize=None)(self._effective)
+        self.truncated = False
+        self.states = self._explore() if layers else []
+
+    def active_mask(self, explicit: int) -> int:
+        """Add the then-layer of every conditional whose if-layers are all active."""
+        mask = explicit
+        for if_mask, then_layer in self.conditional_layers:
+            if mask & if_mask == if_mask:
+                mask |= 1 << then_layer
+        return mask
+
+    def _effective(self, mask: int) -> Tuple[Tuple[int, Binding], ...]:
+        """``(source layer, binding)`` per position; transparent keys fall through to lower layers.
+
+        Built from the memoized result for the mask without its top layer,
+        so each new mask costs one pass over the top layer's opaque keys.
+        """
+        top = mask.bit_length() - 1
+        if top < 0:
+            return ((-1, self.NONE),) * self.size
+        result = list(self.effective(mask & ~(1 << top)))
+        for position, binding in self._opaque[top]:
+            result[position] = (top, binding)
+        return tuple(result)
+
+    def _explore(self) -> List[Tuple[int, FrozenSet[int]]]:
+        """Breadth-first search of the explicit-layer masks reachable from the default layer.
+
+        States are keyed on the mask alone. Each mask keeps the positions
+        held on every path found to it; that set only shrinks, so a mask is
+        revisited only when it does.
+        """
+        held_by_mask = {1: frozenset()}
+        queue = [1]
+        for explicit in queue:
+            held = held_by_mask[explicit]
+            for position, (source, _) in enumerate(self.effective(self.active_mask(explicit))):
+                action = self._actions[source][position] if source >= 0 and position not in held else None
+                if action is None or not 0 < action[1] < len(self.layers):
+                    continue
+                kind, target = action
+                if kind == 'mo':
+                    state, state_held = explicit | 1 << target, held | {position}
+                elif kind == 'to':
+                    state, state_held = 1 | 1 << target, frozenset()
+                else:
+                    state, state_held = explicit ^ 1 << target, held
+                known = held_by_mask.get(state)
+                if known is None:
+                    if len(held_by_mask) >= self.max_states:
+                        self.truncated = True
+                        continue
+                    held_by_mask[state] = state_held
+                elif known <= state_held:
+                    continue
+                else:
+                    held_by_mask[state] = known & state_held
+                queue.append(state)
+        if self.truncated:
+            warnings.warn(f"layer reachability not checked: more than {self.max_states} combinations "
+                          f"of active layers", RuntimeWarning, stacklevel=3)
+        return [(self.active_mask(explicit), held) for explicit, held in held_by_mask.items()]
+
+    def reachable_layers(self) -> List[int]:
+        mask = 0
+        for state, _ in self.states:
+            mask |= state
+        return [index for index in range(len(self.layers)) if mask >> index & 1]
+
+    def unreachable_layers(self) -> List[int]:
+        """Layers no reachable state activates; empty if the search was truncated."""
+        if self.truncated:
+            return []
+        reachable = set(self.reachable_layers())
+        return [index for index in range(len(self.layers)) if index not in reachable]
+
+    def top_state(self, layer: int) -> Optional[int]:
+        """The first reachable mask with layer as its highest active layer."""
+        for mask, _ in self.states:
+            if mask.bit_length() - 1 == layer:
+                return mask
+        return None
+
+    def resolve(self, layer: int, position: int) -> Tuple[int, Binding]:
+        """What a key does when layer is the top active layer, following ``&trans`` down."""
+        mask = self.top_state(layer)
+        if mask is None:
+            mask = 1 | 1 << layer
+        return self.effective(mask)[position] if position < self.size else (-1, self.NONE)
+
+    def dead_keys(self) -> List[Tuple[int, int]]:
+        """``(layer, position)`` of reachable bindings that can never take effect.
+
+        A binding is dead when, in every reachable state, its position is
+        either covered by a higher active layer or held down to reach it.
+        Nothing is reported if the search was truncated, as the unexplored
+        states might use it.
+        """
+        if self.truncated:
+            return []
+        live = set()
+        for mask, held in self.states:
+            for position, (source, _) in enumerate(self.effective(mask)):
+                if position not in held:
+                    live.add((source, position))
+        dead = []
+        for index in self.reachable_layers():
+            layer = self.layers[index]
+            for position in range(len(layer)):
+                if layer.symbols[layer.behaviors[position]] in ('trans', 'none'):
+                    continue
+                if (index, position) not in live:
+                    dead.append((index, position))
+        return dead
+
+
+class BindingDecoder:
+    """Turn ZMK bindings into short display labels.
+
+    Bindings are tokenized once into ``(behavior, params)`` tuples and
+    dispatched through ``registry``, a dict from behavior name (``kp``,
+    ``lt``, ``hm``...) to a decoder taking the params tuple. Hold-tap
+    behaviors declared in the keymap's ``behaviors`` block are registered
+    automatically. Decoded labels are memoized in an LRU cache because the
+    same bindings (``&trans``, ``&kp TAB``) repeat across layers and combos.
+    """
+
+    def __init__(self, parser: 'ZMKKeymapParser', cache_size: int = 4096):
+        self.parser = parser
+        self.registry = {
+            'kp': self._decode_key_press,
+            'mt': self._decode_mod_tap,
+            'lt': self._decode_layer_tap,
+            'mo': self._decode_momentary,
+            'bt': self._decode_bluetooth,
+            'trans': lambda params: '▽',
+            'none': lambda params: '✗',
+            'bootloader': lambda params: 'BOOT',
+            'BOOTLDR': lambda params: 'BOOT',
+            'sys_reset': lambda params: 'RST',
+            'SYSRSET': lambda params: 'RST',
+        }
+        self.decode = functools.lru_cache(maxsize=cache_size)(self._decode)
+
+    @staticmethod
+    def tokenize(binding: str) -> Tuple[str, Tuple[str, ...]]:
+        """Split ``&hm LCTRL A`` into ``('hm', ('LCTRL', 'A'))``."""
+        items = DTProperty.split_cells(binding.strip())
+        if not items:
+            return '', ()
+        return items[0].lstrip('&'), tuple(items[1:])
+
+    @staticmethod
+    def tokenize_bindings(text: str) -> List[Tuple[str, Tuple[str, ...]]]:
+        """Split a whole ``bindings = <...>`` list into (behavior, params) tuples."""
+        bindings = []
+        behavior = None
+        params = []
+        for item in DTProperty.split_cells(text):
+            if item.startswith('&') or behavior is None:
+                if behavior is not None:
+                    bindings.append((behavior, tuple(params)))
+                behavior = item.lstrip('&')
+                params = []
+            else:
+                params.append(item)
+        if behavior is not None:
+            bindings.append((behavior, tuple(params)))
+        return bindings
+
+    def register(self, name: str, decoder):
+        """Register (or replace) the decoder used for a behavior name."""
+        self.registry[name] = decoder
+        self.decode.cache_clear()
+
+    def register_behaviors(self, behaviors: Dict[str, Dict]):
+        """Register decoders for the custom behaviors parsed from the keymap."""
+        for name, behavior in behaviors.items():
+            if behavior.get('compatible') != 'zmk,behavior-hold-tap':
+                continue
+            hold = behavior.get('bindings', ['&kp', '&kp'])
+            hold = hold[0] if isinstance(hold, list) else hold
+            if hold.strip() in ('&mo', '&to', '&tog'):
+                self.register(name, self._decode_layer_tap)
+            else:
+                self.register(name, self._decode_mod_tap)
+
+    def decode_string(self, binding: str) -> str:
+        """Decode a single binding given as text."""
+        binding = binding.strip()
+        if 'BT_CLR' in binding and not binding.lstrip('&').startswith('bt '):
+            return 'BTCLR'
+        return self.decode(*self.tokenize(binding))
+
+    def legend(self, behavior: str, params: Tuple[str, ...]) -> Tuple[str, str, str]:
+        """Split a binding into ``(kind, tap, hold)`` labels for key diagrams.
+
+        kind is 'mod' or 'layer' for hold-taps and momentary layers, and the
+        behavior name otherwise, in which case hold is empty.
+        """
+        decoder = self.registry.get(behavior)
+        if decoder == self._decode_mod_tap and len(params) >= 2:
+            return 'mod', self._symbol(params[1]), params[0]
+        if decoder == self._decode_layer_tap and len(params) >= 2:
+            return 'layer', self._symbol(params[1]), self.parser._get_layer_name_by_number(params[0])
+        if behavior == 'mo':
+            return 'layer', '', self.parser._get_layer_name(' '.join(params))
+        return behavior, self.decode(behavior, params), ''
+
+    @property
+    def hits(self) -> int:
+        return self.decode.cache_info().hits
+
+    @property
+    def misses(self) -> int:
+        return self.decode.cache_info().misses
+
+    def _decode(self, behavior: str, params: Tuple[str, ...]) -> str:
+        decoder = self.registry.get(behavior)
+        if decoder is not None:
+            return decoder(params)
+        binding = ' '.join((behavior,) + params)
+        return self.parser.key_symbols.get(binding, binding)
+
+    def _symbol(self, key: str) -> str:
+        return self.parser.key_symbols.get(key, key)
+
+    def _decode_key_press(self, params: Tuple[str, ...]) -> str:
+        key = ' '.join(params)
+        return self._symbol(key)
+
+    def _decode_mod_tap(self, params: Tuple[str, ...]) -> str:
+        # Homerow mod: hm LCTRL A -> CT+A
+        if len(params) < 2:
+            return ' '.join(params)
+        mod = params[0].replace('L', '').replace('R', '').replace('CTRL', 'CT').replace('ALT', 'AT').replace('GUI', 'GM')
+        return f"{mod}+{self._symbol(params[1])}"
+
+    def _decode_layer_tap(self, params: Tuple[str, ...]) -> str:
+        # Layer tap: lt 1 RET -> LT(NAV,⏎)
+        if len(params) < 2:
+            return ' '.join(params)
+        layer_name = self.parser._get_layer_name_by_number(params[0])
+        return f"LT({layer_name},{self._symbol(params[1])})"
+
+    def _decode_momentary(self, params: Tuple[str, ...]) -> str:
+        # Momentary layer: mo QX_A -> MO(ADJ)
+        return f"MO({self.parser._get_layer_name(' '.join(params))})"
+
+    def _decode_bluetooth(self, params: Tuple[str, ...]) -> str:
+        # Bluetooth: bt BT_SEL 0 -> BT0, bt BT_CLR -> BTCLR
+        if params and params[0] == 'BT_SEL' and len(params) > 1:
+            return f"BT{params[-1]}"
+        if params == ('BT_CLR',):
+            return 'BTCLR'
+        return ' '.join(params)
+
 
 class ZMKKeymapParser:
-    def __init__(self, keymap_file: str, conf_file: str):
+    # Parsed state stored in the cache for an unchanged keymap file
+    CACHED_FIELDS = ('symbols', 'layers', 'combos', 'behaviors', 'macros', 'matrix_layout', 'conditional_layers')
+
+    def __init__(self, keymap_file: str, conf_file: str, cache: Optional[ReadmeCache] = None,
+                 layout: Optional[KeyboardLayout] = None, profiler: Optional[Profiler] = None,
+                 kconfig_files: Iterable[str] = (), firmware_files: Iterable[str] = ()):
         self.keymap_file = keymap_file
         self.conf_file = conf_file
+        self.kconfig_files = list(kconfig_files)
+        self.firmware_files = list(firmware_files)
+        self.firmware_reports = []
+        self.cache = cache or ReadmeCache('', enabled=False)
+        self.profiler = profiler or Profiler(enabled=False)
+        self.layout = layout
+        self.matrix_layout = None
         self.layers = {}
         self.combos = []
+        self.behaviors = {}
         self.config_features = {}
+        self.kconfig = KconfigTable()
+        self.combo_index = ComboIndex([], 0)
+        self.conditional_layers = []
+        self._resolver = None
+        self.symbols = SymbolTable()
+        self.decoder = BindingDecoder(self)
+        self.labels = LabelEngine()
         
         # Key mappings for better readability
         self.key_symbols = {
@@ -67,6 +1875,7 @@ class ZMKKeymapParser:
             'LA(LC(U))': 'RGT1',
             'LA(LC(LS(U)))': 'RGT2',
             'FSCREEN': 'FSCR',
+            'LA(LC(LS(LG(G))))': 'FSCR',
             'LOCK_X': 'LOCK',
             'LC(LG(Q))': 'LOCK',
             'TRANS': '▽',
@@ -107,177 +1916,263 @@ class ZMKKeymapParser:
             'firmware_layer': ('Firmware', 'Bluetooth'),
         }
     
-    def parse_keymap(self):
-        """Parse the ZMK keymap file and extract layer definitions."""
-        with open(self.keymap_file, 'r') as f:
-            content = f.read()
+    def parse_keymap(self, content: Optional[str] = None):
+        """Parse the ZMK keymap file (or the given source text) and extract layer definitions."""
+        profiler = self.profiler
+        if content is None:
+            with profiler.phase('read keymap'):
+                with open(self.keymap_file, 'rb') as f:
+                    data = f.read()
+                content = data.decode('utf-8')
+        else:
+            data = content.encode('utf-8')
         
-        # Parse #define macros for key bindings
-        self.macros = {}
-        macro_pattern = r'#define\s+(\w+)\s+(.+?)(?://.*)?(?:\n|$)'
-        for match in re.finditer(macro_pattern, content):
-            macro_name, macro_value = match.groups()
-            # Remove inline comments and extra whitespace
-            macro_value = re.sub(r'//.*$', '', macro_value).strip()
-            self.macros[macro_name] = macro_value
+        with profiler.phase('cache lookup', kind='keymap'):
+            cache_key = self.cache.key(data)
+            cached = self.cache.get('keymap', cache_key)
+        if cached is not None:
+            self.tree = None
+            for field in self.CACHED_FIELDS:
+                setattr(self, field, cached[field])
+            self.decoder.register_behaviors(self.behaviors)
+            self.combo_index = ComboIndex(self.combos, len(self.layers))
+            self._resolve_layout()
+            return
         
-        # Parse layer definitions
-        layer_pattern = r'(\w+_layer)\s*\{[^}]*?label\s*=\s*"([^"]*)"[^}]*?bindings\s*=\s*<([^>]*)>'
-        for match in re.finditer(layer_pattern, content, re.DOTALL):
-            layer_name, label, bindings = match.groups()
-            # Expand macros in bindings
-            for macro_name, macro_value in self.macros.items():
-                bindings = re.sub(r'\b' + macro_name + r'\b', macro_value, bindings)
-            keys = self._parse_bindings(bindings)
-            self.layers[layer_name] = {
-                'label': label.strip(),
-                'keys': keys
-            }
+        with profiler.phase('parse devicetree', bytes=len(data)):
+            self.tree = DeviceTree.parse(content, self.keymap_file)
+        self._build_from_tree()
         
-        # Parse combos
-        combo_pattern = r'combo_(\w+)\s*\{[^}]*?key-positions\s*=\s*<([^>]*)>[^}]*?bindings\s*=\s*<([^>]*)>'
-        for match in re.finditer(combo_pattern, content, re.DOTALL):
-            combo_name, positions, binding = match.groups()
-            positions_list = [int(x.strip()) for x in positions.split()]
-            output = self._parse_binding(binding.strip())
-            self.combos.append({
-                'name': combo_name,
-                'positions': positions_list,
-                'binding': binding.strip(),
-                'keys': self._get_combo_keys(positions_list),
-                'output': output
-            })
+        with profiler.phase('cache store', kind='keymap'):
+            self.cache.put('keymap', cache_key, {field: getattr(self, field) for field in self.CACHED_FIELDS})
+        self._resolve_layout()
     
-    def parse_config(self):
-        """Parse the configuration file for features."""
-        with open(self.conf_file, 'r') as f:
-            lines = f.readlines()
+    def update_keymap(self, content: str) -> str:
+        """Re-parse edited keymap source, rebuilding only what the edit touched.
+
+        The previously parsed tree is patched in place by DeviceTree.reparse;
+        then only the affected layer, the combos or the behaviors are rebuilt.
+        Returns the name of the rebuilt node, 'full' or 'unchanged'.
+        """
+        if self.tree is None:
+            self.parse_keymap(content)
+            return 'full'
+        if content == self.tree.source:
+            return 'unchanged'
+        changed = self.tree.reparse(content)
+        node = changed
+        while node is not None:
+            parent = node.parent
+            if parent is not None and parent.get('compatible') == 'zmk,keymap' and node.name in self.layers:
+                self.layers[node.name] = self._parse_layer(node)
+                self._build_combos()
+                return node.name
+            if node.get('compatible') == 'zmk,combos':
+                self._build_combos()
+                return node.name
+            if node.name == 'behaviors' or (node.parent is None and node.name.startswith('&')):
+                self._build_behaviors()
+                # Combo labels are decoded through the behaviors
+                self._build_combos()
+                return node.name
+            node = parent
+        self._build_from_tree()
+        return 'full'
+    
+    def _build_from_tree(self):
+        """Populate macros, behaviors, layers and combos from self.tree."""
+        profiler = self.profiler
+        # Parse #define macros once and build the expansion engine
+        with profiler.phase('collect macros'):
+            self.expander = MacroExpander.from_directives(self.tree.directives)
+            self.macros = self.expander.macros
         
-        features = {
-            'CONFIG_ZMK_DISPLAY': ('Display support', False),
-            'CONFIG_ZMK_WIDGET_WPM_STATUS': ('WPM status widget', False),
-            'CONFIG_ZMK_WIDGET_BATTERY_STATUS_SHOW_PERCENTAGE': ('Battery percentage display', False),
-            'CONFIG_ZMK_BLE_PASSKEY_ENTRY': ('BLE passkey entry', False),
-        }
+        with profiler.phase('behaviors'):
+            self._build_behaviors()
+        
+        # A matrix transform in the keymap itself describes the physical layout
+        self.matrix_layout = None
+        for node in self.tree.find_compatible('zmk,matrix-transform'):
+            self.matrix_layout = KeyboardLayout.from_matrix_transform(node, self.expander)
+            if self.matrix_layout is not None:
+                break
+        
+        # Layers are the children of the keymap node
+        self.layers = {}
+        for keymap in self.tree.find_compatible('zmk,keymap'):
+            for node in keymap.children:
+                if 'bindings' in node.properties:
+                    with profiler.phase('parse layer', layer=node.name):
+                        self.layers[node.name] = self._parse_layer(node)
         
-        for line in lines:
-            line = line.strip()
-            if line.startswith('#') or not line:
+        with profiler.phase('combos'):
+            self._build_combos()
+        
+        # ``then-layer`` turns on whenever all of ``if-layers`` are active
+        self.conditional_layers = []
+        for conditional in self.tree.find_compatible('zmk,conditional-layers'):
+            for node in conditional.children:
+                if_layers = node.get('if-layers', self.expander, default=[])
+                then_layer = node.get('then-layer', self.expander)
+                if isinstance(then_layer, int):
+                    if_layers = if_layers if isinstance(if_layers, list) else [if_layers]
+                    if_mask = sum(1 << layer for layer in set(if_layers) if isinstance(layer, int))
+                    self.conditional_layers.append((if_mask, then_layer))
+    
+    def layer_action(self, binding: Binding) -> Optional[Tuple[str, int]]:
+        """``('mo' | 'to' | 'tog', layer)`` if holding or pressing the binding changes layers."""
+        behavior = binding.behavior
+        if behavior not in ('mo', 'to', 'tog'):
+            if self.decoder.registry.get(behavior) != self.decoder._decode_layer_tap:
+                return None
+            # Layer-taps hold &mo unless a custom hold-tap says otherwise
+            hold = self.behaviors.get(behavior, {}).get('bindings', ['&mo'])
+            hold = (hold[0] if isinstance(hold, list) else hold).strip().lstrip('&')
+            behavior = hold if hold in ('to', 'tog') else 'mo'
+        try:
+            return behavior, int(binding.params[0], 0)
+        except (IndexError, ValueError):
+            return None
+    
+    def layer_resolver(self) -> LayerResolver:
+        """Resolve transparent keys and layer reachability over the parsed layers.
+
+        The resolver is reused until a layer, the conditional layers or the
+        set of layer-tap behaviors change; it holds the layers, so their ids
+        in the key stay unique.
+        """
+        layer_taps = sorted(name for name, decoder in self.decoder.registry.items()
+                            if decoder == self.decoder._decode_layer_tap)
+        key = (tuple(map(id, self.layers.values())), tuple(self.conditional_layers), tuple(layer_taps))
+        if self._resolver is None or self._resolver[0] != key:
+            resolver = LayerResolver(list(self.layers.values()), self.layer_action, self.conditional_layers)
+            self._resolver = (key, resolver)
+        return self._resolver[1]
+    
+    def _build_behaviors(self):
+        """Collect behaviors, including the hold-tap timing properties."""
+        self.behaviors = {}
+        for node in self.tree.walk():
+            compatible = node.get('compatible', default='')
+            if isinstance(compatible, str) and compatible.startswith('zmk,behavior-'):
+                self.behaviors[node.label or node.name] = self._parse_behavior(node)
+        
+        # Overrides such as ``&hm { tapping-term-ms = <200>; };``
+        for root in self.tree.roots:
+            if not root.name.startswith('&'):
                 continue
-            
-            for config_key, (description, default) in features.items():
-                if line.startswith(config_key):
-                    value = line.split('=')[1] if '=' in line else 'y'
-                    enabled = value.strip().lower() == 'y'
-                    self.config_features[description] = enabled
+            name = root.name[1:]
+            if name not in self.behaviors and name in ('mt', 'lt'):
+                # Built-in hold-taps defined by ZMK's behaviors.dtsi
+                self.behaviors[name] = {'node': name, 'compatible': 'zmk,behavior-hold-tap'}
+            if name in self.behaviors:
+                self.behaviors[name].update(self._parse_behavior(root, overrides_only=True))
+        
+        self.decoder.register_behaviors(self.behaviors)
+    
+    def _parse_layer(self, node: DTNode) -> Layer:
+        """Build the compact Layer for one child of the keymap node."""
+        label = node.get('display-name') or node.get('label') or node.name
+        bindings = self.expander.expand(node.properties['bindings'].cells)
+        tokens = BindingDecoder.tokenize_bindings(bindings)
+        return Layer.from_bindings(node.name, label.strip(), tokens, self.symbols)
+    
+    def _build_combos(self):
+        """Parse every combo node and index them by layer and position."""
+        self.combos = []
+        for combos in self.tree.find_compatible('zmk,combos'):
+            for node in combos.children:
+                if 'key-positions' not in node.properties or 'bindings' not in node.properties:
+                    continue
+                positions_list = self._cell_integers(node, 'key-positions')
+                layers_list = self._cell_integers(node, 'layers')
+                binding = self.expander.expand(node.properties['bindings'].cells)
+                self.combos.append({
+                    'name': node.name[len('combo_'):] if node.name.startswith('combo_') else node.name,
+                    'positions': positions_list,
+                    'layers': layers_list,
+                    'timeout_ms': node.get('timeout-ms', self.expander),
+                    'binding': binding,
+                    'keys': self._get_combo_keys(positions_list, layers_list[0] if layers_list else 0),
+                    'output': self._parse_binding(binding)
+                })
+        self.combo_index = ComboIndex(self.combos, len(self.layers))
+    
+    def _cell_integers(self, node: DTNode, name: str) -> List[int]:
+        """A property's cells as non-negative integers, e.g. ``key-positions = <0 1>``."""
+        value = node.get(name, self.expander, default=[])
+        values = value if isinstance(value, list) else [value]
+        if not all(type(item) is int and item >= 0 for item in values):
+            prop = node.properties[name]
+            raise DTSyntaxError(f"{name} of {node.name!r} must be non-negative integers, got <{prop.cells}>",
+                                self.tree.source, prop.start, self.keymap_file)
+        return values
+    
+    def _resolve_layout(self):
+        """Pick the layout: explicit, layouts/<keymap>.json, the keymap's matrix transform, then the default."""
+        if self.layout is not None:
+            return
+        path = find_layout_file(self.keymap_file)
+        if path:
+            self.layout = KeyboardLayout.from_json(path)
+            return
+        self.layout = self.matrix_layout or KeyboardLayout.from_json(DEFAULT_LAYOUT)
+    
+    def _parse_behavior(self, node: DTNode, overrides_only: bool = False) -> Dict:
+        """Collect a behavior node's properties with macros expanded."""
+        behavior = {} if overrides_only else {
+            'node': node.name,
+            'compatible': node.get('compatible'),
+        }
+        for name in node.properties:
+            if name != 'compatible':
+                behavior[name] = node.get(name, self.expander)
+        return behavior
+    
+    def parse_config(self):
+        """Parse the conf file, merged with any extra Kconfig files, and evaluate the features."""
+        paths = [self.conf_file] + self.kconfig_files
+        with self.profiler.phase('read config'):
+            sources = []
+            for path in paths:
+                with open(path, 'rb') as f:
+                    sources.append(f.read())
+        
+        # Paths are part of the key because the table records where each symbol was set
+        cache_key = self.cache.key(paths, *sources)
+        table = self.cache.get('config', cache_key)
+        if table is None:
+            table = KconfigTable()
+            for path, data in zip(paths, sources):
+                table.update(data.decode('utf-8'), path)
+            self.cache.put('config', cache_key, table)
+        self.kconfig = table
+        self.config_features = config_features(table)
+    
+    def parse_firmware(self):
+        """Inspect the firmware images shown in the README (see firmware_inspect.py)."""
+        self.firmware_reports = []
+        if self.firmware_files:
+            from firmware_inspect import inspect_all
+            with self.profiler.phase('inspect firmware'):
+                self.firmware_reports = inspect_all(self.firmware_files, self)
+    
+    def input_files(self) -> List[str]:
+        """Inputs besides the keymap, conf and layout: extra Kconfig files and firmware images."""
+        files = list(self.kconfig_files)
+        if self.firmware_files:
+            from firmware_inspect import find_images
+            files += find_images(self.firmware_files)
+        return files
     
     def _parse_bindings(self, bindings_str: str) -> List[str]:
         """Parse binding string into individual key bindings."""
-        # Remove whitespace and split by & (binding separator)
-        bindings = re.sub(r'\s+', ' ', bindings_str.strip())
-        keys = []
-        
-        # Split by & but handle complex bindings
-        for binding in re.split(r'&(?![^<]*>)', bindings):
-            binding = binding.strip()
-            if binding:
-                keys.append(self._parse_binding(binding))
-        
-        return keys
+        decode = self.decoder.decode
+        return [decode(behavior, params) for behavior, params in BindingDecoder.tokenize_bindings(bindings_str)]
     
     def _parse_binding(self, binding: str) -> str:
         """Parse a single key binding into readable format."""
-        binding = binding.strip()
-        
-        # Handle different binding types
-        if binding.startswith('kp '):
-            key = binding[3:].strip()
-            return self.key_symbols.get(key, key)
-        elif binding.startswith('hm '):
-            # Homerow mod: hm LCTRL A -> CT+A
-            parts = binding[3:].split()
-            if len(parts) >= 2:
-                mod = parts[0].replace('L', '').replace('R', '').replace('CTRL', 'CT').replace('ALT', 'AT').replace('GUI', 'GM')
-                key = parts[1]
-                key_symbol = self.key_symbols.get(key, key)
-                return f"{mod}+{key_symbol}"
-            return binding
-        elif binding.startswith('lt '):
-            # Layer tap: lt 1 RET -> LT(N,⏎)
-            parts = binding[3:].split()
-            if len(parts) >= 2:
-                layer_num = parts[0]
-                key = parts[1]
-                layer_name = self._get_layer_name_by_number(layer_num)
-                key_symbol = self.key_symbols.get(key, key)
-                return f"LT({layer_name},{key_symbol})"
-            return binding
-        elif binding.startswith('mo '):
-            # Momentary layer: mo QX_A -> MO(A)
-            layer = binding[3:].strip()
-            layer_name = self._get_layer_name(layer)
-            return f"MO({layer_name})"
-        elif binding.startswith('bt '):
-            # Bluetooth: bt BT_SEL 0 -> BT0, bt BT_CLR -> BTCLR
-            bt_cmd = binding[3:].strip()
-            if bt_cmd.startswith('BT_SEL '):
-                num = bt_cmd.split()[-1]
-                return f"BT{num}"
-            elif bt_cmd == 'BT_CLR':
-                return 'BTCLR'
-            return bt_cmd
-        elif binding.startswith('&kp '):
-            key = binding[4:].strip()
-            return self.key_symbols.get(key, key)
-        elif binding.startswith('&hm '):
-            # Homerow mod: &hm LCTRL A -> CT+A
-            parts = binding[4:].split()
-            if len(parts) >= 2:
-                mod = parts[0].replace('L', '').replace('R', '').replace('CTRL', 'CT').replace('ALT', 'AT').replace('GUI', 'GM')
-                key = parts[1]
-                key_symbol = self.key_symbols.get(key, key)
-                return f"{mod}+{key_symbol}"
-            return binding
-        elif binding.startswith('&lt '):
-            # Layer tap: &lt 1 RET -> LT(N,⏎)
-            parts = binding[4:].split()
-            if len(parts) >= 2:
-                layer_num = parts[0]
-                key = parts[1]
-                layer_name = self._get_layer_name_by_number(layer_num)
-                key_symbol = self.key_symbols.get(key, key)
-                return f"LT({layer_name},{key_symbol})"
-            return binding
-        elif binding.startswith('&mo '):
-            # Momentary layer: &mo QX_A -> MO(A)
-            layer = binding[4:].strip()
-            layer_name = self._get_layer_name(layer)
-            return f"MO({layer_name})"
-        elif binding.startswith('&bt '):
-            # Bluetooth: &bt BT_SEL 0 -> BT0, &bt BT_CLR -> BTCLR
-            bt_cmd = binding[4:].strip()
-            if bt_cmd.startswith('BT_SEL '):
-                num = bt_cmd.split()[-1]
-                return f"BT{num}"
-            elif bt_cmd == 'BT_CLR':
-                return 'BTCLR'
-            return bt_cmd
-        elif binding == 'trans' or binding == '&trans':
-            return '▽'
-        elif binding == 'none' or binding == '&none':
-            return '✗'
-        elif binding in ['BOOTLDR', '&bootloader', 'bootloader']:
-            return 'BOOT'
-        elif binding in ['SYSRSET', '&sys_reset', 'sys_reset']:
-            return 'RST'
-        elif binding == '&bt BT_CLR' or 'BT_CLR' in binding:
-            return 'BTCLR'
-        elif binding.startswith('&'):
-            # Remove & prefix and try again
-            return self._parse_binding(binding[1:])
-        else:
-            # Handle other cases
-            return self.key_symbols.get(binding, binding)
+        return self.decoder.decode_string(binding)
     
     def _get_layer_name(self, layer_code: str) -> str:
         """Convert layer code to readable name."""
@@ -294,17 +2189,18 @@ class ZMKKeymapParser:
         """Get layer name by number."""
         return self._get_layer_name(num)
     
-    def _get_combo_keys(self, positions: List[int]) -> str:
-        """Get key names for combo positions based on the default layer."""
-        if 'default_osx_layer' not in self.layers:
+    def _get_combo_keys(self, positions: List[int], layer: int = 0) -> str:
+        """Get key names for combo positions on the layer the combo is declared for."""
+        layer_names = list(self.layers)
+        if not 0 <= layer < len(layer_names):
             return " + ".join([f"pos{p}" for p in positions])
         
-        default_keys = self.layers['default_osx_layer']['keys']
+        layer_keys = self.layer_keys(self.layers[layer_names[layer]])
         key_names = []
         
         for pos in positions:
-            if pos < len(default_keys):
-                key = default_keys[pos]
+            if pos < len(layer_keys):
+                key = layer_keys[pos]
                 # Clean up the key name for display
                 if '+' in key:
                     # For homerow mods, just show the base key
@@ -315,238 +2211,1335 @@ class ZMKKeymapParser:
         
         return " + ".join(key_names)
     
-    def generate_layer_table(self, layer_name: str, layer_data: Dict) -> str:
+    def layer_keys(self, layer: Layer) -> List[str]:
+        """Display labels for every key of a layer, decoded on demand."""
+        decode = self.decoder.decode
+        return [decode(binding.behavior, binding.params) for binding in layer]
+    
+    def generate_layer_table(self, layer_name: str, layer_data: Layer) -> str:
         """Generate markdown table for a layer with improved visual layout."""
-        keys = layer_data['keys']
-        if len(keys) < 44:
-            keys.extend(['✗'] * (44 - len(keys)))
-        
-        # The keymap has 12 keys per row (6 left + 6 right) for 3 rows (36 keys)
-        # Plus 8 thumb keys (4 left + 4 right)
-        # Layout: row1(12) + row2(12) + row3(12) + thumbs(8) = 44 keys total
-        
-        # Extract rows: each row has 12 keys (6 left + 6 right)
-        row1 = keys[0:12]   # TAB Q W E R T | Y U I O P BSLH
-        row2 = keys[12:24]  # ESC A S D F G | H J K L ; SQT
-        row3 = keys[24:36]  # SHFT Z X C V B | N M , . / SHFT
-        thumbs = keys[36:44] if len(keys) >= 44 else keys[36:] + ['✗'] * (8 - (len(keys) - 36))
-        
-        # Split each row into left and right halves
-        left_row1, right_row1 = row1[:6], row1[6:]
-        left_row2, right_row2 = row2[:6], row2[6:]
-        left_row3, right_row3 = row3[:6], row3[6:]
-        left_thumbs, right_thumbs = thumbs[:4], thumbs[4:]
-        
-        # Generate the table with better visual representation using ASCII characters
+        if self.layout is None:
+            self._resolve_layout()
+        labels = self.table_labels(layer_name, layer_data)
+        return "```\n" + self.layout.render(labels, fill=self.labels.fit('✗', self.layout.cell_width)) + "\n```"
+    
+    def table_labels(self, layer_name: str, layer_data: Layer) -> List[str]:
+        """Layer-table cells; a transparent key shows ▽ and the label it falls through to."""
+        fit = self.labels.fit
+        width = self.layout.cell_width
+        keys = self.layer_keys(layer_data)
+        if layer_name not in self.layers:
+            return [fit(key, width) for key in keys]
+        resolver = self.layer_resolver()
+        index = list(self.layers).index(layer_name)
+        decode = self.decoder.decode
+        labels = []
+        for position, (key, binding) in enumerate(zip(keys, layer_data)):
+            if binding.behavior == 'trans':
+                source, effective = resolver.resolve(index, position)
+                if source >= 0:
+                    key = '▽' + fit(decode(effective.behavior, effective.params), width - 1)
+            labels.append(fit(key, width))
+        return labels
+    
+    def _layer_title(self, index: int) -> str:
+        """Human readable name for a layer index, e.g. 'Main'."""
+        layer_names = list(self.layers)
+        if not 0 <= index < len(layer_names):
+            return str(index)
+        name = layer_names[index]
+        if name in self.layer_names:
+            return self.layer_names[name][0]
+        return self.layers[name].label
+    
+    def _describe_combo_conflict(self, kind: str, combo: Dict, other: Dict, layers: List[int]) -> str:
+        """One-line explanation of a combo conflict for the README."""
+        names = ", ".join(self._layer_title(layer) for layer in layers)
+        first = combo['name'].replace('_', ' ').title()
+        second = other['name'].replace('_', ' ').title()
+        if kind == 'duplicate':
+            return f"{first} and {second} use the same keys on {names}"
+        if kind == 'shadows':
+            return f"{first} is a subset of {second} on {names}"
+        return (f"{first} ({combo['timeout_ms'] or ComboIndex.DEFAULT_TIMEOUT_MS} ms) and "
+                f"{second} ({other['timeout_ms'] or ComboIndex.DEFAULT_TIMEOUT_MS} ms) overlap on {names} "
+                f"with different timeouts")
+    
+    def _describe_dead_key(self, layer: int, position: int) -> str:
+        """One-line explanation of a key that can never take effect, for the README."""
+        binding = list(self.layers.values())[layer][position]
+        label = self.decoder.decode(binding.behavior, binding.params) or str(binding)
+        return f"{self._layer_title(layer)} key {position} (`{label}`) is always covered by a higher layer or held"
+    
+    def generate_combo_table(self) -> str:
+        """Generate the markdown table listing all combos."""
         table = []
-        table.append("```")
-        table.append("+-----------------------------------------------+    +-----------------------------------------------+")
-        table.append("|                   LEFT HALF                   |    |                   RIGHT HALF                  |")
-        table.append("+-------+-------+-------+-------+-------+-------+    +-------+-------+-------+-------+-------+-------+")
+        table.append("| Combo | Layers | Keys | Output |")
+        table.append("|-------|--------|------|--------|")
         
-        # Format keys with proper width for readability (max 5 chars for centering)
-        def format_key(key):
-            key_str = str(key)
-            target_len = 5  # Target length for consistent cell width
-            
-            if len(key_str) <= target_len:
-                return key_str
-            
-            # Truncate long keys intelligently
-            if 'LT(' in key_str:
-                # Handle layer taps: LT(NAV,RET) -> N:⏎ or similar
-                # Extract layer and key from LT(layer,key)
-                match = re.match(r'LT\((\w+),(.+?)\)', key_str)
-                if match:
-                    layer = match.group(1)
-                    key_part = match.group(2)
-                    # Use single letter for layer
-                    layer_abbr = layer[0] if layer else 'L'
-                    # Format as L:key (3 chars minimum)
-                    result = f"{layer_abbr}:{key_part}"
-                    if len(result) <= target_len:
-                        return result
-                    # If still too long, truncate
-                    return result[:target_len]
-                # Fallback truncation
-                return key_str[:target_len]
-            
-            elif 'MO(' in key_str:
-                # Handle momentary: MO(FIRMWARE) -> MO(FW) or MO(F)
-                match = re.match(r'MO\((\w+)\)', key_str)
-                if match:
-                    layer = match.group(1)
-                    # Use short abbreviation
-                    result = f"MO({layer[:2]})"
-                    if len(result) <= target_len:
-                        return result
-                    return f"M:{layer[0]}"  # Even shorter: M:F
-                return key_str[:target_len]
-            
-            elif '+' in key_str and ('CT+' in key_str or 'AT+' in key_str or 'GM+' in key_str):
-                # Handle homerow mods: CT+C_BRI_DN -> CT+BR
-                mod, key_part = key_str.split('+', 1)
-                # Abbreviate the key part to fit
-                remaining = target_len - len(mod) - 1  # -1 for the '+'
-                if len(key_part) > remaining:
-                    key_part = key_part[:remaining]
-                return f"{mod}+{key_part}"
-            
-            # Default truncation
-            return key_str[:target_len]
-        
-        # Row 1
-        left_formatted = '|'.join([f" {format_key(key):^5} " for key in left_row1])
-        right_formatted = '|'.join([f" {format_key(key):^5} " for key in right_row1])
-        table.append(f"|{left_formatted}|    |{right_formatted}|")
-        
-        table.append("+-------+-------+-------+-------+-------+-------+    +-------+-------+-------+-------+-------+-------+")
-        
-        # Row 2
-        left_formatted = '|'.join([f" {format_key(key):^5} " for key in left_row2])
-        right_formatted = '|'.join([f" {format_key(key):^5} " for key in right_row2])
-        table.append(f"|{left_formatted}|    |{right_formatted}|")
-        
-        table.append("+-------+-------+-------+-------+-------+-------+    +-------+-------+-------+-------+-------+-------+")
-        
-        # Row 3
-        left_formatted = '|'.join([f" {format_key(key):^5} " for key in left_row3])
-        right_formatted = '|'.join([f" {format_key(key):^5} " for key in right_row3])
-        table.append(f"|{left_formatted}|    |{right_formatted}|")
-        
-        table.append("+-------+-------+-------+-------+-------+-------+    +-------+-------+-------+-------+-------+-------+")
-        table.append("                        | {:^5} | {:^5} |                        | {:^5} | {:^5} |".format(
-            format_key(left_thumbs[0]), format_key(left_thumbs[1]), 
-            format_key(right_thumbs[2]), format_key(right_thumbs[3])
-        ))
-        table.append("                        +-------+-------+                        +-------+-------+")
-        table.append("                        | {:^5} | {:^5} |                        | {:^5} | {:^5} |".format(
-            format_key(left_thumbs[2]), format_key(left_thumbs[3]), 
-            format_key(right_thumbs[0]), format_key(right_thumbs[1])
-        ))
-        table.append("                        +-------+-------+                        +-------+-------+")
-        table.append("```")
+        for combo in self.combos:
+            combo_name = combo['name'].replace('_', ' ').title()
+            layers = ", ".join(self._layer_title(layer) for layer in self.combo_index.active_layers(combo))
+            table.append(f"| {combo_name} | {layers} | {combo['keys']} | {combo['output']} |")
         
         return "\n".join(table)
     
+    def generate_firmware_table(self) -> str:
+        """Generate the markdown table of firmware image sizes, free flash and keymap location."""
+        from firmware_inspect import markdown_table
+        return markdown_table(self.firmware_reports, os.path.dirname(os.path.abspath(self.keymap_file)))
+    
+    def _table_inputs(self) -> Tuple[str, str]:
+        """Cache-key digests shared by every layer table of one render.
+
+        The first covers what turns a binding into a fitted cell: the
+        symbol table, behaviors and their decoders, key symbols, label
+        rules and the layout. The second covers what fall-through
+        resolution reads: every layer and the conditional layers.
+        """
+        if self.layout is None:
+            self._resolve_layout()
+        decoders = sorted((name, getattr(decoder, '__name__', '')) for name, decoder in self.decoder.registry.items())
+        decoding = self.cache.key(self.symbols.names, self.behaviors, decoders, self.key_symbols,
+                                  self.labels.fingerprint(), self.layout.fingerprint())
+        layers = self.cache.key(list(self.layers), self.conditional_layers,
+                                *(layer.column_bytes() for layer in self.layers.values()))
+        return decoding, layers
+    
+    def _cached_layer_table(self, layer_name: str, layer_data: Layer, inputs: Tuple[str, str]) -> str:
+        """Render a layer table, reusing the cached copy if nothing it shows has changed."""
+        with self.profiler.phase('render layer', layer=layer_name):
+            decoding, layers = inputs
+            # Only &trans cells read the other layers
+            trans = self.symbols.ids.get('trans')
+            falls_through = trans is not None and trans in layer_data.behaviors
+            key = self.cache.key(layer_name, layer_data.column_bytes(), decoding, layers if falls_through else None)
+            return self.cache.cached('layer', key, lambda: self.generate_layer_table(layer_name, layer_data))
+    
     def generate_readme(self) -> str:
         """Generate the complete README content."""
         self.parse_keymap()
-        self.parse_config()
-        
-        readme = []
-        readme.append("# Clickety Split Ltd. | Pepito-Macro")
-        readme.append("")
-        readme.append("## Keyboard Layout")
-        readme.append("")
-        readme.append("This document shows the key mappings for each layer of the Pepito-Macro split keyboard.")
-        readme.append("")
-        readme.append("**Legend:**")
-        readme.append("- `▽` = Transparent (uses lower layer)")
-        readme.append("- `✗` = None (no action)")
-        readme.append("- `MO(X)` = Momentary layer activation")
-        readme.append("- `LT(X,key)` = Layer tap (hold for layer, tap for key)")
-        readme.append("- `CTRL+key` = Homerow mod (hold for modifier, tap for key)")
-        readme.append("")
+        with self.profiler.phase('parse config'):
+            self.parse_config()
+        self.parse_firmware()
+        with self.profiler.phase('render readme'):
+            content = self.render_readme()
+        self.record_counters()
+        return content
+    
+    def record_counters(self):
+        """Copy the expander, decoder and cache statistics into the profiler."""
+        profiler = self.profiler
+        expander = getattr(self, 'expander', None)
+        profiler.set_counter('macro_substitutions', expander.substitutions if expander else 0)
+        profiler.set_counter('bindings_decoded', self.decoder.misses)
+        profiler.set_counter('decoder_cache_hits', self.decoder.hits)
+        profiler.set_counter('disk_cache_hits', self.cache.hits)
+        profiler.set_counter('disk_cache_misses', self.cache.misses)
+        profiler.set_counter('layers', len(self.layers))
+        profiler.set_counter('keys', sum(len(layer) for layer in self.layers.values()))
+        profiler.set_counter('combos', len(self.combos))
+    
+    def render_readme(self) -> str:
+        """Render the README from the already parsed keymap and config."""
+        return "\n".join(self.iter_readme())
+    
+    def iter_readme(self):
+        """Yield the README line by line from the already parsed keymap and config."""
+        yield "# Clickety Split Ltd. | Pepito-Macro"
+        yield ""
+        yield "## Keyboard Layout"
+        yield ""
+        yield "This document shows the key mappings for each layer of the Pepito-Macro split keyboard."
+        yield ""
+        yield "**Legend:**"
+        yield "- `▽X` = Transparent, falls through to X on a lower layer (`▽` alone: nothing below)"
+        yield "- `✗` = None (no action)"
+        yield "- `MO(X)` = Momentary layer activation"
+        yield "- `LT(X,key)` = Layer tap (hold for layer, tap for key)"
+        yield "- `CTRL+key` = Homerow mod (hold for modifier, tap for key)"
+        yield ""
         
         # Add Colemak information
-        readme.append("### OS Keyboard Layout Support")
-        readme.append("")
-        readme.append("This keyboard layout is designed to work with both QWERTY and Colemak layouts at the OS level:")
-        readme.append("")
-        readme.append("- **QWERTY**: Use the standard QWERTY layout in your OS settings")
-        readme.append("- **Colemak**: Switch your OS to Colemak layout - the physical key bindings remain the same, but your OS will interpret them as Colemak characters")
-        readme.append("")
-        readme.append("The layers shown below display the physical key positions. When using Colemak at the OS level, the home row will effectively become: **A R S T D** (left) and **H N E I O** (right).")
-        readme.append("")
+        yield "### OS Keyboard Layout Support"
+        yield ""
+        yield "This keyboard layout is designed to work with both QWERTY and Colemak layouts at the OS level:"
+        yield ""
+        yield "- **QWERTY**: Use the standard QWERTY layout in your OS settings"
+        yield "- **Colemak**: Switch your OS to Colemak layout - the physical key bindings remain the same, but your OS will interpret them as Colemak characters"
+        yield ""
+        yield "The layers shown below display the physical key positions. When using Colemak at the OS level, the home row will effectively become: **A R S T D** (left) and **H N E I O** (right)."
+        yield ""
         
         # Generate layer tables with main layer collapsible
+        table_inputs = self._table_inputs()
         for layer_name, layer_data in self.layers.items():
             if layer_name in self.layer_names:
                 title, subtitle = self.layer_names[layer_name]
                 
                 if layer_name == 'default_osx_layer':
                     # Make QWERTY layer collapsible
-                    readme.append(f"### {title} Layer ({subtitle})")
-                    readme.append("")
-                    readme.append("<details>")
-                    readme.append("<summary>Click to expand QWERTY layout</summary>")
-                    readme.append("")
-                    readme.append(self.generate_layer_table(layer_name, layer_data))
-                    readme.append("")
-                    readme.append("</details>")
+                    yield f"### {title} Layer ({subtitle})"
+                    yield ""
+                    yield "<details>"
+                    yield "<summary>Click to expand QWERTY layout</summary>"
+                    yield ""
+                    yield self._cached_layer_table(layer_name, layer_data, table_inputs)
+                    yield ""
+                    yield "</details>"
                 else:
-                    readme.append(f"### {title} Layer ({subtitle})")
-                    readme.append("")
-                    readme.append(self.generate_layer_table(layer_name, layer_data))
-                readme.append("")
+                    yield f"### {title} Layer ({subtitle})"
+                    yield ""
+                    yield self._cached_layer_table(layer_name, layer_data, table_inputs)
+                yield ""
         
         # Add combos section
         if self.combos:
-            readme.append("## Combos")
-            readme.append("")
-            readme.append("Key combinations available on the main layer:")
-            readme.append("")
-            readme.append("| Combo | Keys | Output |")
-            readme.append("|-------|------|--------|")
+            yield "## Combos"
+            yield ""
+            yield "Key combinations and the layers they are active on:"
+            yield ""
+            titles = [self._layer_title(index) for index in range(len(self.layers))]
+            yield self.cache.cached('combos', self.cache.key(self.combos, titles), self.generate_combo_table)
+            yield ""
+            
+            conflicts = self.combo_index.conflicts()
+            if conflicts:
+                yield "**Combo conflicts:**"
+                for kind, combo, other, layers in conflicts:
+                    yield f"- {self._describe_combo_conflict(kind, combo, other, layers)}"
+                yield ""
+        
+        # Only mention reachability when something is wrong, like combo conflicts
+        resolver = self.layer_resolver()
+        unreachable = resolver.unreachable_layers()
+        dead = resolver.dead_keys()
+        if unreachable or dead or resolver.truncated:
+            yield "## Layer Reachability"
+            yield ""
+            for layer in unreachable:
+                yield f"- {self._layer_title(layer)} cannot be reached from the base layer"
+            for layer, position in dead:
+                yield f"- {self._describe_dead_key(layer, position)}"
+            if resolver.truncated:
+                yield f"- Not checked: more than {resolver.max_states} combinations of active layers"
+            yield ""
+        
+        # Add hold-tap behaviors with their timing
+        hold_taps = {name: b for name, b in self.behaviors.items()
+                     if b['compatible'] == 'zmk,behavior-hold-tap'}
+        if hold_taps:
+            yield "## Behaviors"
+            yield ""
+            yield "| Behavior | Flavor | Tapping Term | Quick Tap |"
+            yield "|----------|--------|--------------|-----------|"
             
-            for combo in self.combos:
-                combo_name = combo['name'].replace('_', ' ').title()
-                readme.append(f"| {combo_name} | {combo['keys']} | {combo['output']} |")
+            for name, behavior in hold_taps.items():
+                flavor = behavior.get('flavor', 'hold-preferred')
+                tapping_term = behavior.get('tapping-term-ms')
+                quick_tap = behavior.get('quick-tap-ms')
+                tapping_term = f"{tapping_term} ms" if tapping_term is not None else "default"
+                quick_tap = f"{quick_tap} ms" if quick_tap is not None else "default"
+                yield f"| `&{name}` ({behavior['node']}) | {flavor} | {tapping_term} | {quick_tap} |"
             
-            readme.append("")
+            yield ""
         
         # Add configuration features
         if self.config_features:
-            readme.append("## Configuration Features")
-            readme.append("")
+            yield "## Configuration Features"
+            yield ""
             for feature, enabled in self.config_features.items():
                 status = "✅" if enabled else "⚙️"
                 state = "enabled" if enabled else "disabled"
-                readme.append(f"- {status} {feature} {state}")
-            readme.append("")
+                yield f"- {status} {feature} {state}"
+            yield ""
         
-        # Add build instructions
-        readme.append("## Build Instructions")
-        readme.append("")
-        readme.append("Build with default keymap:")
-        readme.append("")
-        readme.append("```bash")
-        readme.append("west build -d build/pepito/left -p -b seeeduino_xiao_ble -- -DSHIELD=clickety_split_pepito_left")
-        readme.append("west build -d build/pepito/right -p -b seeeduino_xiao_ble -- -DSHIELD=clickety_split_pepito_right")
-        readme.append("```")
-        readme.append("")
-        readme.append("Build with custom keymap:")
-        readme.append("")
-        readme.append("```bash")
-        readme.append("west build -d build/pepito/left -p -b seeeduino_xiao_ble -- -DSHIELD=clickety_split_pepito_left  -DZMK_CONFIG=\"/workspaces/zmk-config/joey/pepito_v1.13/config\"")
-        readme.append("west build -d build/pepito/right -p -b seeeduino_xiao_ble -- -DSHIELD=clickety_split_pepito_right  -DZMK_CONFIG=\"/workspaces/zmk-config/joey/pepito_v1.13/config\"")
-        readme.append("```")
+        if self.firmware_reports:
+            yield "## Firmware"
+            yield ""
+            yield self.generate_firmware_table()
+            yield ""
         
-        return "\n".join(readme)
+        # Add build instructions
+        yield "## Build Instructions"
+        yield ""
+        yield "Build with default keymap:"
+        yield ""
+        yield "```bash"
+        yield "west build -d build/pepito/left -p -b seeeduino_xiao_ble -- -DSHIELD=clickety_split_pepito_left"
+        yield "west build -d build/pepito/right -p -b seeeduino_xiao_ble -- -DSHIELD=clickety_split_pepito_right"
+        yield "```"
+        yield ""
+        yield "Build with custom keymap:"
+        yield ""
+        yield "```bash"
+        yield "west build -d build/pepito/left -p -b seeeduino_xiao_ble -- -DSHIELD=clickety_split_pepito_left  -DZMK_CONFIG=\"/workspaces/zmk-config/joey/pepito_v1.13/config\""
+        yield "west build -d build/pepito/right -p -b seeeduino_xiao_ble -- -DSHIELD=clickety_split_pepito_right  -DZMK_CONFIG=\"/workspaces/zmk-config/joey/pepito_v1.13/config\""
+        yield "```"
+
+class Renderer:
+    """An output format rendered from an already parsed keymap.
+
+    Renderers only read the parser's state, so several can run over one
+    parse, concurrently if need be. ``chunks`` yields the output piece by
+    piece so it can be streamed straight to its file.
+    """
+
+    extension = ''
+
+    def __init__(self, parser: 'ZMKKeymapParser', fingerprint: Optional[str] = None):
+        self.parser = parser
+        self.fingerprint = fingerprint
+
+    def chunks(self) -> Iterator[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        return ''.join(self.chunks())
+
+    def write(self, path: str) -> bool:
+        """Stream the output to path; returns False if the file was already identical."""
+        return write_stream(path, self.chunks())
+
+    def layer_heading(self, layer_name: str) -> str:
+        """'Main Layer (QWERTY)' for known layers, else the layer's own label."""
+        if layer_name in self.parser.layer_names:
+            title, subtitle = self.parser.layer_names[layer_name]
+            return f"{title} Layer ({subtitle})"
+        return self.parser.layers[layer_name].label
+
+    def hold_taps(self) -> Dict[str, Dict]:
+        return {name: behavior for name, behavior in self.parser.behaviors.items()
+                if behavior['compatible'] == 'zmk,behavior-hold-tap'}
+
+
+class MarkdownRenderer(Renderer):
+    """The README with ASCII layer tables, followed by the input fingerprint."""
+
+    extension = '.md'
+
+    def chunks(self) -> Iterator[str]:
+        separator = ''
+        # Hash the body as it streams past; trailing newlines are not part of it (see body_digest)
+        digest = hashlib.sha256()
+        newlines = ''
+        for line in self.parser.iter_readme():
+            chunk = separator + line
+            yield chunk
+            separator = '\n'
+            pending = newlines + chunk
+            text = pending.rstrip('\n')
+            digest.update(text.encode('utf-8'))
+            newlines = pending[len(text):]
+        if self.fingerprint:
+            yield fingerprint_comment(self.fingerprint, digest.hexdigest())
+
+
+class SVGRenderer(Renderer):
+    """Key diagrams in the style of the Screenshots: one block per layer.
+
+    Keys are placed from the layout's ASCII grid. Hold-taps show the tap
+    legend with the hold below it, and keys that take part in a combo on
+    the layer are highlighted.
+    """
+
+    extension = '.svg'
+    PITCH = 60
+    KEY = 54
+    TITLE = 32
+    GAP = 24
+    FILLS = {'mod': '#c6dafc', 'layer': '#c6dafc', 'trans': '#f1f3f5', 'none': '#ffffff', 'combo': '#f3be85'}
+
+    def __init__(self, parser: 'ZMKKeymapParser', fingerprint: Optional[str] = None):
+        super().__init__(parser, fingerprint)
+        self.resolver = parser.layer_resolver()
+        layout = parser.layout
+        scale = self.PITCH / (layout.cell_width + 3)
+        self.positions = {key: (column * scale, row * self.PITCH) for key, (column, row) in layout.key_grid().items()}
+        self.width = int(max((x for x, _ in self.positions.values()), default=0) + self.PITCH)
+        self.height = len(layout.rows) * self.PITCH
+        self.block = self.TITLE + self.height + self.GAP
+
+    def _key(self, position: int, binding: Binding, combo: bool, effective: Optional[Binding] = None) -> str:
+        x, y = self.positions[position]
+        kind, tap, hold = self.parser.decoder.legend(binding.behavior, binding.params)
+        fill = self.FILLS['combo'] if combo else self.FILLS.get(kind, '#ffffff')
+        color = '#9aa0a6' if kind in ('trans', 'none') else '#1f2328'
+        if kind == 'trans' and effective is not None and effective.behavior != 'none':
+            # Show what the transparent key falls through to, greyed out
+            _, tap, hold = self.parser.decoder.legend(effective.behavior, effective.params)
+        size = 14 if display_width(tap) <= 4 else 10
+        middle = self.KEY / 2
+        parts = [f'<g transform="translate({x:.1f},{y:.1f})"><title>{escape(str(binding))}</title>',
+                 f'<rect width="{self.KEY}" height="{self.KEY}" rx="6" fill="{fill}" stroke="#d0d7de"/>']
+        if tap:
+            text_y = middle - 2 if hold else middle + size / 3
+            parts.append(f'<text x="{middle}" y="{text_y:.1f}" font-size="{size}" fill="{color}" '
+                         f'text-anchor="middle">{escape(tap)}</text>')
+        if hold:
+            parts.append(f'<text x="{middle}" y="{self.KEY - 8 if tap else middle + 4}" font-size="9" '
+                         f'fill="{color}" text-anchor="middle">{escape(hold)}</text>')
+        parts.append('</g>')
+        return ''.join(parts)
+
+    def layer_group(self, index: int, layer_name: str, y: float = 0) -> str:
+        """One layer's title and keys as an SVG group offset by y."""
+        layer = self.parser.layers[layer_name]
+        combos = self.parser.combo_index.masks[index] if index < len(self.parser.combo_index.masks) else {}
+        keys = [self._key(position, layer[position], position in combos, self.resolver.resolve(index, position)[1])
+                for position in range(len(layer)) if position in self.positions]
+        return (f'<g transform="translate(0,{y})"><text x="0" y="20" font-size="16" font-weight="600">'
+                f'{escape(self.layer_heading(layer_name))}</text>'
+                f'<g transform="translate(0,{self.TITLE})">' + ''.join(keys) + '</g></g>\n')
+
+    def _open(self, height: int) -> str:
+        return (f'<svg xmlns="http://www.w3.org/2000/svg" width="{self.width}" height="{height}" '
+                f'viewBox="0 0 {self.width} {height}" font-family="ui-monospace, Menlo, monospace">\n')
+
+    def layer_svg(self, index: int, layer_name: str) -> str:
+        """A standalone SVG element for a single layer, as embedded in the HTML page."""
+        return self._open(self.TITLE + self.height) + self.layer_group(index, layer_name) + '</svg>\n'
+
+    def chunks(self) -> Iterator[str]:
+        yield '<?xml version="1.0" encoding="UTF-8"?>\n'
+        yield self._open(self.block * len(self.parser.layers))
+        yield '<rect width="100%" height="100%" fill="#f8f9fb"/>\n'
+        for index, layer_name in enumerate(self.parser.layers):
+            yield self.layer_group(index, layer_name, index * self.block)
+        yield '</svg>\n'
+
+
+class HTMLRenderer(Renderer):
+    """A standalone page with an SVG diagram per layer and the combo and behavior tables."""
+
+    extension = '.html'
+    STYLE = ('body{font-family:system-ui,sans-serif;margin:2em;background:#f8f9fb;color:#1f2328}'
+             'table{border-collapse:collapse;margin:1em 0}td,th{border:1px solid #d0d7de;padding:4px 10px}'
+             'th{background:#eef1f4;text-align:left}svg{display:block;margin:1em 0}')
+
+    def _table(self, headers: List[str], rows: Iterable[List[str]]) -> str:
+        head = ''.join(f'<th>{escape(header)}</th>' for header in headers)
+        body = ''.join('<tr>' + ''.join(f'<td>{escape(str(cell))}</td>' for cell in row) + '</tr>\n' for row in rows)
+        return f'<table>\n<tr>{head}</tr>\n{body}</table>\n'
+
+    def chunks(self) -> Iterator[str]:
+        parser = self.parser
+        title = escape(parser.layout.name)
+        yield (f'<!DOCTYPE html>\n<html lang="en">\n<head>\n<meta charset="utf-8">\n<title>{title}</title>\n'
+               f'<style>{self.STYLE}</style>\n</head>\n<body>\n<h1>{title}</h1>\n')
+        svg = SVGRenderer(parser)
+        for index, layer_name in enumerate(parser.layers):
+            yield f'<h2>{escape(self.layer_heading(layer_name))}</h2>\n'
+            yield svg.layer_svg(index, layer_name)
+        if parser.combos:
+            yield '<h2>Combos</h2>\n'
+            yield self._table(['Combo', 'Layers', 'Keys', 'Output'], (
+                [combo['name'].replace('_', ' ').title(),
+                 ', '.join(parser._layer_title(layer) for layer in parser.combo_index.active_layers(combo)),
+                 combo['keys'], combo['output']] for combo in parser.combos))
+            conflicts = parser.combo_index.conflicts()
+            if conflicts:
+                yield '<ul>\n' + ''.join(f'<li>{escape(parser._describe_combo_conflict(*conflict))}</li>\n'
+                                         for conflict in conflicts) + '</ul>\n'
+        resolver = svg.resolver
+        problems = ([f'{parser._layer_title(layer)} cannot be reached from the base layer'
+                     for layer in resolver.unreachable_layers()] +
+                    [parser._describe_dead_key(layer, position) for layer, position in resolver.dead_keys()])
+        if problems:
+            yield '<h2>Layer Reachability</h2>\n<ul>\n'
+            yield ''.join(f'<li>{escape(problem)}</li>\n' for problem in problems) + '</ul>\n'
+        hold_taps = self.hold_taps()
+        if hold_taps:
+            yield '<h2>Behaviors</h2>\n'
+            yield self._table(['Behavior', 'Flavor', 'Tapping Term', 'Quick Tap'], (
+                [f"&{name} ({behavior['node']})", behavior.get('flavor', 'hold-preferred'),
+                 behavior.get('tapping-term-ms', 'default'), behavior.get('quick-tap-ms', 'default')]
+                for name, behavior in hold_taps.items()))
+        if parser.config_features:
+            yield '<h2>Configuration Features</h2>\n<ul>\n'
+            for feature, enabled in parser.config_features.items():
+                yield f"<li>{escape(feature)} {'enabled' if enabled else 'disabled'}</li>\n"
+            yield '</ul>\n'
+        yield '</body>\n</html>\n'
+
+
+class JSONRenderer(Renderer):
+    """The parsed keymap as machine-readable JSON."""
+
+    extension = '.json'
+
+    def model(self) -> Dict:
+        """Plain dicts and lists describing layers, combos, behaviors and config."""
+        parser = self.parser
+        legend = parser.decoder.legend
+        resolver = parser.layer_resolver()
+        layer_names = list(parser.layers)
+        layers = []
+        for index, (layer_name, layer) in enumerate(parser.layers.items()):
+            keys = []
+            for position, binding in enumerate(layer):
+                kind, tap, hold = legend(binding.behavior, binding.params)
+                source, effective = resolver.resolve(index, position)
+                keys.append({'position': position, 'binding': str(binding),
+                             'label': parser.decoder.decode(binding.behavior, binding.params),
+                             'kind': kind, 'tap': tap, 'hold': hold,
+                             'effective': {'layer': layer_names[source] if source >= 0 else None,
+                                           'binding': str(effective)}})
+            layers.append({'name': layer_name, 'label': layer.label,
+                           'heading': self.layer_heading(layer_name), 'keys': keys})
+        combos = [dict(combo, active_layers=parser.combo_index.active_layers(combo)) for combo in parser.combos]
+        conflicts = [{'kind': kind, 'combo': combo['name'], 'other': other['name'], 'layers': active}
+                     for kind, combo, other, active in parser.combo_index.conflicts()]
+        return {
+            'generator_version': GENERATOR_VERSION,
+            'layout': {'name': parser.layout.name, 'cell_width': parser.layout.cell_width, 'rows': parser.layout.rows},
+            'layers': layers,
+            'combos': combos,
+            'combo_conflicts': conflicts,
+            'reachability': {
+                'states': len(resolver.states),
+                'truncated': resolver.truncated,
+                'unreachable_layers': [layer_names[layer] for layer in resolver.unreachable_layers()],
+                'dead_keys': [{'layer': layer_names[layer], 'position': position}
+                              for layer, position in resolver.dead_keys()],
+            },
+            'behaviors': parser.behaviors,
+            'config_features': parser.config_features,
+            'kconfig': parser.kconfig.values,
+            'firmware': parser.firmware_reports,
+        }
+
+    def chunks(self) -> Iterator[str]:
+        yield from json.JSONEncoder(indent=2, ensure_ascii=False, default=str).iterencode(self.model())
+        yield '\n'
+
+
+RENDERERS = {
+    'md': MarkdownRenderer,
+    'svg': SVGRenderer,
+    'html': HTMLRenderer,
+    'json': JSONRenderer,
+}
 
-def main():
+
+def _file_digest(path: str) -> Optional[bytes]:
+    """sha256 of a file's contents, or None if it does not exist."""
+    digest = hashlib.sha256()
+    try:
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+    except FileNotFoundError:
+        return None
+    return digest.digest()
+
+
+def write_stream(path: str, chunks: Iterable[str], skip_unchanged: bool = True) -> bool:
+    """Stream chunks into a temporary sibling, then move it over path.
+
+    Readers never see partial output. With skip_unchanged the temporary
+    file is dropped when it matches the existing file byte for byte, so
+    the file and its mtime are left alone. Returns True if path was written.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.' + os.path.basename(path) + '.', suffix='.tmp')
+    digest = hashlib.sha256()
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            for chunk in chunks:
+                data = chunk.encode('utf-8')
+                f.write(data)
+                digest.update(data)
+        if skip_unchanged and _file_digest(path) == digest.digest():
+            os.remove(tmp_path)
+            return False
+        # mkstemp creates 0600 files; keep the mode a plain open() would give
+        try:
+            mode = os.stat(path).st_mode & 0o777
+        except FileNotFoundError:
+            umask = os.umask(0)
+            os.umask(umask)
+            mode = 0o666 & ~umask
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, path)
+        return True
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def write_atomic(path: str, content: str):
+    """Write a file via a temporary sibling so readers never see partial output."""
+    write_stream(path, [content], skip_unchanged=False)
+
+
+def write_if_changed(path: str, content: str) -> bool:
+    """Atomically write content unless the file already holds exactly that; returns True if written."""
+    return write_stream(path, [content])
+
+
+def find_layout_file(keymap_file: str) -> Optional[str]:
+    """Return layouts/<keymap name>.json next to the keymap or in LAYOUTS_DIR, if either exists."""
+    stem = os.path.splitext(os.path.basename(keymap_file))[0]
+    candidates = [
+        os.path.join(os.path.dirname(os.path.abspath(keymap_file)), 'layouts', stem + '.json'),
+        os.path.join(LAYOUTS_DIR, stem + '.json'),
+    ]
+    for path in candidates:
+        if os.path.exists(path):
+            return path
+    return None
+
+
+FINGERPRINT_PATTERN = re.compile(r'\n*<!-- generate_readme\.py v(\S+) inputs sha256:([0-9a-f]{64}) '
+                                 r'output sha256:([0-9a-f]{64}) -->\n?\Z')
+
+
+def input_fingerprint(keymap_file: str, conf_file: str, layout_file: Optional[str] = None,
+                      extra_files: Iterable[str] = ()) -> str:
+    """Hash the generator version and every file the README is rendered from.
+
+    Without an explicit layout the default layout file is hashed too, since
+    the README falls back to it when the keymap has no matrix transform.
+    """
+    layout_file = layout_file or find_layout_file(keymap_file) or DEFAULT_LAYOUT
+    digest = hashlib.sha256(GENERATOR_VERSION.encode())
+    for path in [keymap_file, conf_file, layout_file] + list(extra_files):
+        with open(path, 'rb') as f:
+            data = f.read()
+        digest.update(len(data).to_bytes(8, 'little'))
+        digest.update(data)
+    return digest.hexdigest()
+
+
+def body_digest(body: str) -> str:
+    """Hash of a README body without its trailing newlines, as recorded in the trailer."""
+    return hashlib.sha256(body.rstrip('\n').encode('utf-8')).hexdigest()
+
+
+def fingerprint_comment(fingerprint: str, output: str) -> str:
+    """The trailer embedding the input fingerprint and body_digest() as an HTML comment (invisible when rendered)."""
+    return f"\n\n<!-- generate_readme.py v{GENERATOR_VERSION} inputs sha256:{fingerprint} output sha256:{output} -->\n"
+
+
+def stamp_readme(content: str, fingerprint: str) -> str:
+    """Append the input fingerprint trailer to README content."""
+    return content + fingerprint_comment(fingerprint, body_digest(content))
+
+
+def read_fingerprint(content: str) -> Tuple[str, Optional[str]]:
+    """Split a README into its body and embedded input fingerprint.
+
+    The fingerprint is None if the trailer is absent, from another
+    version, or the body was edited after it was generated.
+    """
+    match = FINGERPRINT_PATTERN.search(content)
+    if not match:
+        return content, None
+    body = content[:match.start()]
+    if match.group(1) != GENERATOR_VERSION or body_digest(body) != match.group(3):
+        return body, None
+    return body, match.group(2)
+
+
+def output_paths(readme_file: str, keymap_file: str, formats: Iterable[str],
+                 output_dir: Optional[str] = None) -> Dict[str, str]:
+    """Where each format goes: the README for Markdown, ``<keymap name>.<ext>`` beside it otherwise."""
+    directory = output_dir or os.path.dirname(os.path.abspath(readme_file))
+    stem = os.path.splitext(os.path.basename(keymap_file))[0]
+    paths = {}
+    for output_format in formats:
+        if output_format == 'md':
+            paths['md'] = os.path.join(directory, os.path.basename(readme_file)) if output_dir else readme_file
+        else:
+            paths[output_format] = os.path.join(directory, stem + RENDERERS[output_format].extension)
+    return paths
+
+
+def render_outputs(parser: 'ZMKKeymapParser', paths: Dict[str, str],
+                   fingerprint: Optional[str] = None) -> Dict[str, bool]:
+    """Stream every requested format of one parsed keymap to its file.
+
+    The renderers share the parsed state read-only and run in a thread
+    pool; they run one after another when profiling, since the profiler's
+    phase stack is not thread-safe. Returns whether each path was written.
+    """
+    profiler = parser.profiler
+
+    def run(item: Tuple[str, str]) -> Tuple[str, bool]:
+        output_format, path = item
+        renderer = RENDERERS[output_format](parser, fingerprint if output_format == 'md' else None)
+        with profiler.phase('render', format=output_format):
+            return path, renderer.write(path)
+
+    if profiler.enabled or len(paths) <= 1:
+        return dict(map(run, paths.items()))
+    with ThreadPoolExecutor(max_workers=len(paths)) as pool:
+        return dict(pool.map(run, paths.items()))
+
+
+def generate_file(keymap_file: str, conf_file: str, readme_file: str,
+                  cache: Optional[ReadmeCache] = None, layout_file: Optional[str] = None,
+                  profiler: Optional[Profiler] = None, formats: Iterable[str] = ('md',),
+                  output_dir: Optional[str] = None, kconfig_files: Iterable[str] = (),
+                  firmware_files: Iterable[str] = ()) -> Dict[str, bool]:
+    """Parse one keymap/conf pair once and write each requested format.
+
+    Returns a dict from output path to whether it was written; files that
+    were already up to date, and their mtimes, are left alone.
+    """
+    profiler = profiler or Profiler(enabled=False)
+    with profiler.phase('generate', keymap=keymap_file):
+        layout = KeyboardLayout.from_json(layout_file) if layout_file else None
+        parser = ZMKKeymapParser(keymap_file, conf_file, cache=cache, layout=layout, profiler=profiler,
+                                 kconfig_files=kconfig_files, firmware_files=firmware_files)
+        parser.parse_keymap()
+        with profiler.phase('parse config'):
+            parser.parse_config()
+        parser.parse_firmware()
+        fingerprint = input_fingerprint(keymap_file, conf_file, layout_file, parser.input_files())
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        written = render_outputs(parser, output_paths(readme_file, keymap_file, formats, output_dir), fingerprint)
+    parser.record_counters()
+    return written
+
+
+def check_file(keymap_file: str, conf_file: str, readme_file: str,
+               cache: Optional[ReadmeCache] = None, layout_file: Optional[str] = None,
+               kconfig_files: Iterable[str] = (), firmware_files: Iterable[str] = ()) -> Tuple[bool, str]:
+    """Report whether a README is up to date without writing it.
+
+    A matching embedded fingerprint answers without parsing anything. When
+    it is missing or differs the README is rendered and compared, so edits
+    that do not change the output (comments, whitespace) still pass.
+    """
+    try:
+        with open(readme_file, 'r') as f:
+            current = f.read()
+    except FileNotFoundError:
+        return False, "missing"
+    layout = KeyboardLayout.from_json(layout_file) if layout_file else None
+    parser = ZMKKeymapParser(keymap_file, conf_file, cache=cache, layout=layout, kconfig_files=kconfig_files,
+                             firmware_files=firmware_files)
+    fingerprint = input_fingerprint(keymap_file, conf_file, layout_file, parser.input_files())
+    body, embedded = read_fingerprint(current)
+    if embedded == fingerprint:
+        return True, "fingerprint matches"
+    
+    if body.rstrip('\n') != parser.generate_readme().rstrip('\n'):
+        return False, "content differs"
+    state = 'outdated' if FINGERPRINT_PATTERN.search(current) else 'missing'
+    return True, f"content matches, fingerprint {state}"
+
+
+def read_build_matrix(build_yaml: str) -> List[Dict[str, str]]:
+    """Read the board/shield combinations from a zmk-config build.yaml.
+
+    Only the subset of YAML used by build.yaml is understood: top-level
+    ``board``/``shield`` flow lists and an ``include`` list of mappings.
+    """
+    with open(build_yaml, 'r') as f:
+        lines = f.read().splitlines()
+    
+    top_level = {}
+    include = []
+    section = None
+    for line in lines:
+        line = line.split('#', 1)[0].rstrip()
+        if not line.strip() or line.strip() == '---':
+            continue
+        if not line[0].isspace() and not line.startswith('-'):
+            key, _, value = line.partition(':')
+            section = key.strip()
+            value = value.strip()
+            if value.startswith('['):
+                top_level[section] = [item.strip().strip('"\'') for item in value[1:-1].split(',') if item.strip()]
+            continue
+        if section != 'include':
+            continue
+        item = line.strip()
+        if item.startswith('-'):
+            include.append({})
+            item = item[1:].strip()
+        if item and include:
+            key, _, value = item.partition(':')
+            include[-1][key.strip()] = value.strip().strip('"\'')
+    
+    matrix = [{'board': board, 'shield': shield}
+              for board in top_level.get('board', [])
+              for shield in top_level.get('shield', [''])]
+    return matrix + include
+
+
+def find_keymap_for_shield(config_dir: str, shield: str, extension: str = '.keymap') -> Optional[str]:
+    """Locate the keymap (or conf) ZMK would use for a shield, e.g. ``corne_left`` -> ``corne.keymap``."""
+    candidates = [shield]
+    for suffix in ('_left', '_right'):
+        if shield.endswith(suffix):
+            candidates.append(shield[:-len(suffix)])
+    for name in candidates:
+        path = os.path.join(config_dir, name + extension)
+        if os.path.exists(path):
+            return path
+    return None
+
+
+COMMENT_PATTERN = re.compile(r'//[^\n]*|/\*.*?\*/', re.DOTALL)
+
+
+def canonical_devicetree(content: str, filename: str = '<keymap>') -> str:
+    """A keymap as the firmware build sees it: comments dropped, macros expanded, whitespace collapsed.
+
+    Edits that cannot change the compiled firmware (comments, formatting,
+    renaming a macro while keeping its value) give the same text.
+    """
+    tree = DeviceTree.parse(content, filename)
+    expander = MacroExpander.from_directives(tree.directives)
+    lines = [f"#include {include}" for include in tree.includes]
+    
+    def dump(node: DTNode, depth: int):
+        labels = ''.join(f"{label}: " for label in node.labels)
+        lines.append(f"{'  ' * depth}{labels}{node.name} {{")
+        for name, prop in node.properties.items():
+            values = []
+            for kind, text in prop.values:
+                if kind == 'cells':
+                    text = '<' + ' '.join(expander.expand(COMMENT_PATTERN.sub(' ', text[1:-1])).split()) + '>'
+                values.append(text)
+            lines.append(f"{'  ' * (depth + 1)}{name}" + (f" = {', '.join(values)}" if values else '') + ';')
+        for child in node.children:
+            dump(child, depth + 1)
+        lines.append(f"{'  ' * depth}}};")
+    
+    for root in tree.roots:
+        dump(root, 0)
+    return '\n'.join(lines)
+
+
+def _strip_yaml_comments(content: str) -> str:
+    lines = (line.split(' #', 1)[0].rstrip() for line in content.splitlines() if not line.lstrip().startswith('#'))
+    return '\n'.join(line for line in lines if line.strip())
+
+
+def entry_key(entry: Dict[str, str]) -> str:
+    """Stable name of a build.yaml matrix entry, e.g. ``board=nice_nano_v2 shield=corne_left``."""
+    return ' '.join(f"{key}={value}" for key, value in sorted(entry.items()))
+
+
+# Files and directories under config/ that never reach the firmware build
+BUILD_IGNORED_DIRS = ('layouts', 'tests', 'build')
+BUILD_IGNORED_SUFFIXES = ('.md', '.py', '.pyc')
+# Module directories at the repository root that ZMK also builds from
+MODULE_DIRS = ('boards', 'zephyr')
+INCLUDE_PATTERN = re.compile(r'^[ \t]*#[ \t]*include[ \t]*[<"]([^>"]+)[>"]', re.MULTILINE)
+
+
+def _build_inputs(config_dir: str) -> List[str]:
+    """Every file that can affect a firmware build of this zmk-config.
+
+    That is everything under config/ and the module directories next to
+    it, except hidden files, documentation, layouts, tests and these
+    scripts, plus any local file #included from them. README outputs
+    rendered next to a keymap (``<keymap>.svg``/``.html``/``.json``) are
+    documentation too.
+    """
+    config_dir = os.path.abspath(config_dir)
+    root = os.path.dirname(config_dir)
+    files = []
+    for top in [config_dir] + [os.path.join(root, name) for name in MODULE_DIRS]:
+        for directory, dirnames, filenames in os.walk(top):
+            dirnames[:] = sorted(d for d in dirnames if not d.startswith('.') and d != '__pycache__' and
+                                 not (directory == config_dir and d in BUILD_IGNORED_DIRS))
+            keymaps = {name[:-len('.keymap')] for name in filenames if name.endswith('.keymap')}
+            for name in sorted(filenames):
+                stem, extension = os.path.splitext(name)
+                if name.startswith('.') or extension in BUILD_IGNORED_SUFFIXES:
+                    continue
+                if stem in keymaps and extension in ('.svg', '.html', '.json'):
+                    continue
+                files.append(os.path.join(directory, name))
+    
+    # Local headers and .dtsi files pulled in from outside those directories
+    seen = set(files)
+    pending = list(files)
+    while pending:
+        path = pending.pop()
+        if not path.endswith(('.keymap', '.dtsi', '.overlay', '.h')):
+            continue
+        with open(path, 'r', errors='replace') as f:
+            includes = INCLUDE_PATTERN.findall(f.read())
+        for include in includes:
+            for base in (os.path.dirname(path), config_dir):
+                candidate = os.path.normpath(os.path.join(base, include))
+                if os.path.isfile(candidate):
+                    if candidate not in seen:
+                        seen.add(candidate)
+                        files.append(candidate)
+                        pending.append(candidate)
+                    break
+    return files
+
+
+def config_fingerprint(config_dir: str) -> str:
+    """Hash the normalized contents of every build input of a zmk-config.
+
+    Keymaps are hashed as canonical_devicetree(), .conf files as their
+    Kconfig symbol table and YAML without comments, so edits that cannot
+    change the firmware (comments, formatting) keep the fingerprint.
+    Every other file is hashed byte for byte.
+    """
+    root = os.path.dirname(os.path.abspath(config_dir))
+    digest = hashlib.sha256(b'build-inputs-2')
+    for path in sorted(_build_inputs(config_dir)):
+        if path.endswith('.keymap'):
+            with open(path, 'r') as f:
+                data = canonical_devicetree(f.read(), path).encode()
+        elif path.endswith('.conf'):
+            table = KconfigTable.from_files([path])
+            data = '\n'.join(f"{name}={table.values[name]!r}" for name in sorted(table.values)).encode()
+        elif path.endswith(('.yml', '.yaml')):
+            with open(path, 'r') as f:
+                data = _strip_yaml_comments(f.read()).encode()
+        else:
+            with open(path, 'rb') as f:
+                data = f.read()
+        for part in (os.path.relpath(path, root).replace(os.sep, '/').encode(), data):
+            digest.update(len(part).to_bytes(8, 'little'))
+            digest.update(part)
+    return digest.hexdigest()
+
+
+def build_fingerprint(entry: Dict[str, str], config_dir: str, inputs: Optional[str] = None) -> str:
+    """Fingerprint of one matrix entry's firmware: the entry plus config_fingerprint().
+
+    ZMK merges several files per shield (``corne.conf`` and
+    ``corne_left.conf``, overlays, board files, local includes), so every
+    build input is covered rather than guessing which ones a shield uses.
+    Pass inputs to reuse a config_fingerprint() across entries.
+    """
+    if inputs is None:
+        inputs = config_fingerprint(config_dir)
+    return hashlib.sha256(f"{entry_key(entry)}\n{inputs}".encode()).hexdigest()
+
+
+def build_manifest(build_yaml: str) -> Dict[str, Optional[str]]:
+    """Fingerprint of every build.yaml matrix entry, keyed by entry_key().
+
+    When the inputs cannot be read or parsed every entry gets None,
+    which changed_matrix() always counts as changed.
+    """
+    config_dir = os.path.join(os.path.dirname(os.path.abspath(build_yaml)), 'config')
+    try:
+        inputs = config_fingerprint(config_dir)
+    except (OSError, UnicodeDecodeError, ValueError):
+        inputs = None
+    return {entry_key(entry): None if inputs is None else build_fingerprint(entry, config_dir, inputs)
+            for entry in read_build_matrix(build_yaml)}
+
+
+def changed_matrix(build_yaml: str, manifest_file: str) -> List[Dict[str, str]]:
+    """Matrix entries whose fingerprint differs from a stored manifest (all of them if it is missing)."""
+    try:
+        with open(manifest_file, 'r') as f:
+            previous = json.load(f).get('entries', {})
+    except (OSError, ValueError, AttributeError):
+        previous = {}
+    manifest = build_manifest(build_yaml)
+    changed = []
+    for entry in read_build_matrix(build_yaml):
+        current = manifest[entry_key(entry)]
+        if current is None or previous.get(entry_key(entry)) != current:
+            changed.append(entry)
+    return changed
+
+
+def write_manifest(build_yaml: str, manifest_file: str) -> bool:
+    """Store the current fingerprints for a later changed_matrix(); returns whether the file changed."""
+    content = json.dumps({'entries': build_manifest(build_yaml)}, indent=2, sort_keys=True) + '\n'
+    return write_if_changed(manifest_file, content)
+
+
+def discover_pairs(root: str) -> Tuple[List[Tuple[str, str, str]], List[Tuple[str, str]]]:
+    """Find every keymap with a matching .conf below root.
+
+    Returns ``(keymap, conf, readme)`` jobs and ``(path, reason)`` skips. A
+    directory holding a single keymap gets ``readme.md``; otherwise each
+    keymap gets ``<name>.md`` next to it.
+    """
+    jobs = []
+    skipped = []
+    for directory, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if not d.startswith('.') and d not in ('build', '__pycache__'))
+        keymaps = sorted(name for name in filenames if name.endswith('.keymap'))
+        for name in keymaps:
+            stem = name[:-len('.keymap')]
+            keymap_file = os.path.join(directory, name)
+            conf_file = os.path.join(directory, stem + '.conf')
+            if not os.path.exists(conf_file):
+                skipped.append((keymap_file, f"no {stem}.conf"))
+                continue
+            readme_name = 'readme.md' if len(keymaps) == 1 else stem + '.md'
+            jobs.append((keymap_file, conf_file, os.path.join(directory, readme_name)))
+    return jobs, skipped
+
+
+def pairs_from_build_matrix(build_yaml: str) -> Tuple[List[Tuple[str, str, str]], List[Tuple[str, str]]]:
+    """Map each build.yaml matrix entry to its keymap/conf pair in config/."""
+    config_dir = os.path.join(os.path.dirname(os.path.abspath(build_yaml)), 'config')
+    jobs = []
+    skipped = []
+    for entry in read_build_matrix(build_yaml):
+        shield = entry.get('shield') or entry.get('board', '')
+        keymap_file = find_keymap_for_shield(config_dir, shield)
+        if keymap_file is None:
+            skipped.append((shield, "no keymap in config/"))
+            continue
+        conf_file = keymap_file[:-len('.keymap')] + '.conf'
+        if not os.path.exists(conf_file):
+            skipped.append((shield, f"no {os.path.basename(conf_file)}"))
+            continue
+        job = (keymap_file, conf_file, os.path.join(config_dir, 'readme.md'))
+        # Left and right halves share one keymap and therefore one README
+        if job not in jobs:
+            jobs.append(job)
+    if len(jobs) > 1:
+        jobs = [(k, c, k[:-len('.keymap')] + '.md') for k, c, _ in jobs]
+    return jobs, skipped
+
+
+def describe_error(error: Exception) -> str:
+    """One-line message for a failed keymap; unexpected exception types keep their name."""
+    if isinstance(error, (OSError, ValueError)):
+        return str(error)
+    return f"{type(error).__name__}: {error}"
+
+
+def _batch_worker(job: Tuple[str, str, str, Optional[str], int]) -> Tuple[str, str, float, Optional[str]]:
+    """Process-pool entry point: generate one README and time it."""
+    keymap_file, conf_file, readme_file, cache_dir, cache_size = job
+    cache = ReadmeCache(cache_dir, max_bytes=cache_size) if cache_dir else None
+    start = time.perf_counter()
+    try:
+        generate_file(keymap_file, conf_file, readme_file, cache)
+    except Exception as e:
+        # One broken keymap must not take down the rest of the batch
+        return keymap_file, readme_file, time.perf_counter() - start, describe_error(e)
+    return keymap_file, readme_file, time.perf_counter() - start, None
+
+
+def run_batch(jobs: List[Tuple[str, str, str]], skipped: List[Tuple[str, str]],
+              cache: ReadmeCache, workers: Optional[int] = None) -> int:
+    """Generate READMEs for many keymaps in a process pool and print a summary."""
+    cache_dir = cache.directory if cache.enabled else None
+    work = [(keymap, conf, readme, cache_dir, cache.max_bytes) for keymap, conf, readme in jobs]
+    start = time.perf_counter()
+    if workers == 1 or len(work) <= 1:
+        results = [_batch_worker(job) for job in work]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_batch_worker, work))
+    elapsed = time.perf_counter() - start
+    
+    failures = 0
+    for keymap_file, readme_file, seconds, error in results:
+        if error is None:
+            print(f"  ok    {seconds * 1000:8.1f} ms  {keymap_file} -> {readme_file}")
+        else:
+            failures += 1
+            print(f"  FAIL  {seconds * 1000:8.1f} ms  {keymap_file}: {error}")
+    for path, reason in skipped:
+        print(f"  skip               {path}: {reason}")
+    print(f"{len(results) - failures} generated, {failures} failed, {len(skipped)} skipped in {elapsed:.2f}s")
+    return 1 if failures else 0
+
+
+class FileWatcher:
+    """Wait for changes to a set of files using inotify, or polling elsewhere.
+
+    inotify watches the parent directories (editors often save by renaming
+    a temporary file over the original). Either way, a change is confirmed
+    by comparing each file's (mtime, size, inode) with the last seen value.
+    """
+
+    IN_MODIFY = 0x002
+    IN_CLOSE_WRITE = 0x008
+    IN_MOVED_TO = 0x080
+    IN_CREATE = 0x100
+    IN_DELETE = 0x200
+
+    def __init__(self, paths: List[str], poll_interval: float = 0.25, use_inotify: bool = True):
+        self.paths = [os.path.abspath(path) for path in paths]
+        self.poll_interval = poll_interval
+        self.signatures = {path: self._signature(path) for path in self.paths}
+        self.fd = self._init_inotify() if use_inotify and sys.platform.startswith('linux') else None
+
+    @property
+    def backend(self) -> str:
+        return 'inotify' if self.fd is not None else 'polling'
+
+    def _init_inotify(self) -> Optional[int]:
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+            fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        except (OSError, AttributeError):
+            return None
+        if fd < 0:
+            return None
+        mask = self.IN_MODIFY | self.IN_CLOSE_WRITE | self.IN_MOVED_TO | self.IN_CREATE | self.IN_DELETE
+        for directory in sorted({os.path.dirname(path) for path in self.paths}):
+            if libc.inotify_add_watch(fd, directory.encode(), mask) < 0:
+                os.close(fd)
+                return None
+        return fd
+
+    @staticmethod
+    def _signature(path: str) -> Optional[Tuple[int, int, int]]:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+    def _drain(self, timeout: Optional[float]) -> bool:
+        """Wait up to timeout for inotify events; return True if any arrived."""
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return False
+        while True:
+            try:
+                data = os.read(self.fd, 65536)
+            except BlockingIOError:
+                return True
+            if not data:
+                return True
+            # Events are struct inotify_event {int wd; u32 mask, cookie, len; char name[len]}
+            offset = 0
+            while offset < len(data):
+                _, _, _, length = struct.unpack_from('iIII', data, offset)
+                offset += 16 + length
+
+    def _changed(self) -> List[str]:
+        changed = []
+        for path in self.paths:
+            signature = self._signature(path)
+            if signature != self.signatures[path]:
+                self.signatures[path] = signature
+                changed.append(path)
+        return changed
+
+    def wait(self, debounce: float = 0.1) -> List[str]:
+        """Block until a watched file changes and writes have been quiet for debounce seconds."""
+        while True:
+            if self.fd is not None:
+                self._drain(None)
+                while self._drain(debounce):
+                    pass
+            else:
+                time.sleep(self.poll_interval)
+                changed = self._changed()
+                if not changed:
+                    continue
+                # Keep polling until the files stop changing
+                while True:
+                    time.sleep(debounce)
+                    more = self._changed()
+                    if not more:
+                        return changed
+                    changed += [path for path in more if path not in changed]
+            changed = self._changed()
+            if changed:
+                return changed
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+def watch(parser: 'ZMKKeymapParser', readme_file: str, debounce: float = 0.1,
+          use_inotify: bool = True, layout_file: Optional[str] = None) -> int:
+    """Keep the parsed keymap in memory and rewrite the README after each save."""
+    def render() -> str:
+        fingerprint = input_fingerprint(parser.keymap_file, parser.conf_file, layout_file, parser.input_files())
+        return stamp_readme(parser.render_readme(), fingerprint)
+    
+    parser.parse_keymap()
+    parser.parse_config()
+    parser.parse_firmware()
+    current = None
+    if os.path.exists(readme_file):
+        with open(readme_file, 'r') as f:
+            current = f.read()
+    content = render()
+    if content != current:
+        write_atomic(readme_file, content)
+        current = content
+    
+    watcher = FileWatcher([parser.keymap_file, parser.conf_file] + parser.kconfig_files, use_inotify=use_inotify)
+    print(f"Watching {parser.keymap_file} and {parser.conf_file} ({watcher.backend}); Ctrl-C to stop")
+    keymap_path = os.path.abspath(parser.keymap_file)
+    try:
+        while True:
+            changed = watcher.wait(debounce)
+            saved_at = max((os.stat(path).st_mtime for path in changed if os.path.exists(path)), default=time.time())
+            start = time.perf_counter()
+            try:
+                rebuilt = []
+                if keymap_path in changed:
+                    with open(parser.keymap_file, 'r') as f:
+                        rebuilt.append(parser.update_keymap(f.read()))
+                if any(path != keymap_path for path in changed):
+                    parser.parse_config()
+                    rebuilt.append('config')
+                content = render()
+            except (DTSyntaxError, OSError, UnicodeDecodeError) as e:
+                print(f"[{time.strftime('%H:%M:%S')}] Error: {e}")
+                continue
+            status = 'unchanged'
+            if content != current:
+                write_atomic(readme_file, content)
+                current = content
+                status = 'updated'
+            render_ms = (time.perf_counter() - start) * 1000
+            latency_ms = (time.time() - saved_at) * 1000
+            print(f"[{time.strftime('%H:%M:%S')}] {', '.join(rebuilt)}: {os.path.basename(readme_file)} {status} "
+                  f"(render {render_ms:.1f} ms, {latency_ms:.0f} ms after save)")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
     """Main function to generate the README."""
     script_dir = os.path.dirname(os.path.abspath(__file__))
+    
+    arg_parser = argparse.ArgumentParser(description="Generate readme.md from the ZMK keymap and config.")
+    arg_parser.add_argument('--no-cache', action='store_true',
+                            help="bypass the parse/render cache for this run")
+    arg_parser.add_argument('--clear-cache', action='store_true',
+                            help="delete all cached entries before generating")
+    arg_parser.add_argument('--cache-dir', default=os.path.join(script_dir, '.readme-cache'),
+                            help="cache directory (default: %(default)s)")
+    arg_parser.add_argument('--cache-size', type=int, default=8 * 1024 * 1024,
+                            help="maximum cache size in bytes (default: %(default)s)")
+    batch = arg_parser.add_mutually_exclusive_group()
+    batch.add_argument('--batch', metavar='ROOT',
+                       help="generate a README for every keymap/conf pair found below ROOT")
+    batch.add_argument('--build-yaml', metavar='PATH',
+                       help="generate READMEs for the shields listed in a build.yaml matrix")
+    arg_parser.add_argument('--layout', metavar='JSON',
+                            help="physical layout file (default: layouts/<keymap name>.json)")
+    arg_parser.add_argument('--kconfig', action='append', default=[], metavar='PATH',
+                            help="Kconfig file merged over the conf, e.g. a build's zephyr/.config; may be repeated")
+    arg_parser.add_argument('--firmware', action='append', default=[], metavar='PATH',
+                            help="firmware image (.uf2/.bin) or directory of them to summarize in the README; "
+                                 "may be repeated")
+    arg_parser.add_argument('--watch', action='store_true',
+                            help="regenerate whenever the keymap or conf is saved")
+    arg_parser.add_argument('--poll', action='store_true',
+                            help="with --watch, poll for changes instead of using inotify")
+    arg_parser.add_argument('--debounce', type=float, default=100,
+                            help="with --watch, milliseconds of quiet before regenerating (default: %(default)s)")
+    arg_parser.add_argument('--format', default='md', metavar='FORMATS',
+                            help="comma-separated outputs to render from one parse: "
+                                 f"{', '.join(RENDERERS)} (default: %(default)s)")
+    arg_parser.add_argument('--output-dir', metavar='DIR',
+                            help="directory for the outputs (default: next to readme.md)")
+    arg_parser.add_argument('--changed-matrix', metavar='MANIFEST',
+                            help="print the build.yaml entries whose firmware inputs differ from MANIFEST "
+                                 "as a GitHub Actions matrix and exit")
+    arg_parser.add_argument('--write-manifest', metavar='MANIFEST',
+                            help="store the firmware input fingerprints of every build.yaml entry and exit")
+    arg_parser.add_argument('--check', action='store_true',
+                            help="exit with status 1 if readme.md is stale instead of rewriting it")
+    arg_parser.add_argument('--profile', metavar='PATH',
+                            help="record per-phase timings, allocations and counters to PATH")
+    arg_parser.add_argument('--profile-format', choices=('json', 'chrome'), default='json',
+                            help="profile output format; 'chrome' loads in chrome://tracing or Perfetto")
+    arg_parser.add_argument('-j', '--jobs', type=int, default=None,
+                            help="worker processes for batch mode (default: CPU count)")
+    args = arg_parser.parse_args(argv)
+    if args.check and (args.batch or args.build_yaml or args.watch):
+        arg_parser.error("--check cannot be combined with --batch, --build-yaml or --watch")
+    formats = [output_format.strip() for output_format in args.format.split(',') if output_format.strip()]
+    unknown = [output_format for output_format in formats if output_format not in RENDERERS]
+    if unknown or not formats:
+        arg_parser.error(f"unknown --format {', '.join(unknown) or args.format!r}; choose from {', '.join(RENDERERS)}")
+    
+    if args.changed_matrix or args.write_manifest:
+        build_yaml = args.build_yaml or os.path.join(os.path.dirname(script_dir), 'build.yaml')
+        try:
+            if args.write_manifest:
+                write_manifest(build_yaml, args.write_manifest)
+            if args.changed_matrix:
+                print(json.dumps({'include': changed_matrix(build_yaml, args.changed_matrix)}))
+        except (DTSyntaxError, OSError, ValueError) as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return 1
+        return 0
+    
+    cache = ReadmeCache(args.cache_dir, max_bytes=args.cache_size, enabled=not args.no_cache)
+    if args.clear_cache:
+        cache.clear()
+    
+    if args.batch or args.build_yaml:
+        if args.batch:
+            jobs, skipped = discover_pairs(args.batch)
+        else:
+            jobs, skipped = pairs_from_build_matrix(args.build_yaml)
+        return run_batch(jobs, skipped, cache, args.jobs)
+    
     keymap_file = os.path.join(script_dir, 'clickety_split_pepito.keymap')
     conf_file = os.path.join(script_dir, 'clickety_split_pepito.conf')
     readme_file = os.path.join(script_dir, 'readme.md')
     
     if not os.path.exists(keymap_file):
         print(f"Error: {keymap_file} not found")
-        return
+        return 1
     
     if not os.path.exists(conf_file):
         print(f"Error: {conf_file} not found")
-        return
+        return 1
+    
+    if args.watch:
+        # The parsed state lives in memory between saves; the disk cache is not needed
+        layout = KeyboardLayout.from_json(args.layout) if args.layout else None
+        parser = ZMKKeymapParser(keymap_file, conf_file, layout=layout, kconfig_files=args.kconfig,
+                                 firmware_files=args.firmware)
+        return watch(parser, readme_file, args.debounce / 1000, use_inotify=not args.poll,
+                     layout_file=args.layout)
     
-    parser = ZMKKeymapParser(keymap_file, conf_file)
-    readme_content = parser.generate_readme()
+    if args.check:
+        try:
+            fresh, reason = check_file(keymap_file, conf_file, readme_file, cache, args.layout, args.kconfig,
+                                       args.firmware)
+        except Exception as e:
+            print(f"Error: {describe_error(e)}")
+            return 1
+        if not fresh:
+            print(f"{readme_file} is stale ({reason}); run generate_readme.py to update it")
+            return 1
+        print(f"{readme_file} is up to date ({reason})")
+        return 0
     
-    with open(readme_file, 'w') as f:
-        f.write(readme_content)
+    profiler = Profiler() if args.profile else None
+    try:
+        written = generate_file(keymap_file, conf_file, readme_file, cache, args.layout, profiler,
+                                formats, args.output_dir, args.kconfig, args.firmware)
+    except Exception as e:
+        print(f"Error: {describe_error(e)}")
+        return 1
     
-    print(f"Generated {readme_file}")
+    for path, changed in written.items():
+        print(f"{'Generated' if changed else 'Unchanged'} {path}")
+    if profiler is not None:
+        profiler.write(args.profile, args.profile_format)
+        print(f"Profile written to {args.profile}")
+    return 0
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
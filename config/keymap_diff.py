@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Structural diff of two ZMK keymaps.
+
+Both keymaps are parsed into the generator's layer/combo/behavior
+representation and compared directly: per layer and key position, per
+combo and per behavior property. Nothing is rendered, so the cost is one
+parse per side plus a linear pass over the bindings.
+
+A keymap is given as a file path, as ``REV:PATH`` (read with ``git show``)
+or as a bare git revision, meaning the default keymap at that revision.
+
+Usage:
+    python3 keymap_diff.py HEAD                        # HEAD vs working tree
+    python3 keymap_diff.py origin/main HEAD --format json
+    python3 keymap_diff.py old.keymap new.keymap --exit-code
+"""
+
+import os
+import sys
+import json
+import argparse
+import subprocess
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+from generate_readme import ZMKKeymapParser, ReadmeCache, Layer
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_KEYMAP = os.path.join(SCRIPT_DIR, 'clickety_split_pepito.keymap')
+COMBO_FIELDS = ('positions', 'layers', 'timeout_ms', 'binding')
+
+
+def read_keymap(spec: str, default_keymap: str = DEFAULT_KEYMAP) -> Tuple[str, str]:
+    """Return ``(path, source)`` for a file path, ``REV:PATH`` or a bare revision."""
+    if os.path.exists(spec):
+        with open(spec, 'r') as f:
+            return spec, f.read()
+    if ':' in spec:
+        revision, path = spec.split(':', 1)
+        cwd = None
+    else:
+        # A bare revision refers to the default keymap, relative to its own directory
+        revision, path = spec, './' + os.path.basename(default_keymap)
+        cwd = os.path.dirname(default_keymap)
+    result = subprocess.run(['git', 'show', f'{revision}:{path}'], cwd=cwd,
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        raise ValueError(f"cannot read {spec}: {result.stderr.strip()}")
+    return path, result.stdout
+
+
+def parse(spec: str, cache: Optional[ReadmeCache] = None,
+          default_keymap: str = DEFAULT_KEYMAP) -> ZMKKeymapParser:
+    """Parse one side of the diff; the conf file is not needed."""
+    path, source = read_keymap(spec, default_keymap)
+    parser = ZMKKeymapParser(path, '', cache=cache)
+    parser.parse_keymap(source)
+    return parser
+
+
+def _symbol_map(old: ZMKKeymapParser, new: ZMKKeymapParser) -> array:
+    """Map the new parser's symbol ids onto the old parser's id space.
+
+    Names missing from the old table get fresh ids past its end, so two
+    bindings are equal exactly when their mapped ids are.
+    """
+    ids = dict(old.symbols.ids)
+    mapping = array('I')
+    for name in new.symbols.names:
+        symbol = ids.get(name)
+        if symbol is None:
+            symbol = ids[name] = len(ids)
+        mapping.append(symbol)
+    return mapping
+
+
+def _key(parser: ZMKKeymapParser, layer: Layer, position: int) -> Optional[Dict]:
+    if position >= len(layer):
+        return None
+    binding = layer[position]
+    return {'binding': str(binding), 'label': parser._parse_binding(str(binding))}
+
+
+def diff_layer(old: ZMKKeymapParser, new: ZMKKeymapParser, old_layer: Layer, new_layer: Layer,
+               mapping: array) -> List[Dict]:
+    """Positions whose binding differs, including keys present on one side only."""
+    behaviors = array('I', (mapping[symbol] for symbol in new_layer.behaviors))
+    params = array('I', (mapping[symbol] for symbol in new_layer.params))
+    if behaviors == old_layer.behaviors and params == old_layer.params and new_layer.offsets == old_layer.offsets:
+        return []
+
+    keys = []
+    old_offsets, new_offsets = old_layer.offsets, new_layer.offsets
+    for position in range(max(len(old_layer), len(new_layer))):
+        if position < len(old_layer) and position < len(new_layer):
+            if (behaviors[position] == old_layer.behaviors[position] and
+                    params[new_offsets[position]:new_offsets[position + 1]] ==
+                    old_layer.params[old_offsets[position]:old_offsets[position + 1]]):
+                continue
+        keys.append({
+            'position': position,
+            'old': _key(old, old_layer, position),
+            'new': _key(new, new_layer, position),
+        })
+    return keys
+
+
+def _changes(old: Dict, new: Dict, fields) -> Dict:
+    return {field: [old.get(field), new.get(field)] for field in fields if old.get(field) != new.get(field)}
+
+
+def diff_keymaps(old: ZMKKeymapParser, new: ZMKKeymapParser) -> Dict:
+    """Compare two parsed keymaps layer by layer, then their combos and behaviors."""
+    mapping = _symbol_map(old, new)
+    old_index = {name: index for index, name in enumerate(old.layers)}
+
+    layers = []
+    for name in old.layers:
+        if name not in new.layers:
+            layers.append({'layer': name, 'status': 'removed', 'label': old.layers[name].label})
+    for index, name in enumerate(new.layers):
+        new_layer = new.layers[name]
+        if name not in old.layers:
+            layers.append({'layer': name, 'status': 'added', 'label': new_layer.label})
+            continue
+        old_layer = old.layers[name]
+        entry = {'layer': name, 'status': 'changed', 'label': new_layer.label}
+        if old_layer.label != new_layer.label:
+            entry['label_change'] = [old_layer.label, new_layer.label]
+        if old_index[name] != index:
+            # Layer numbers are what &mo/&lt refer to, so a move matters
+            entry['index_change'] = [old_index[name], index]
+        keys = diff_layer(old, new, old_layer, new_layer, mapping)
+        if keys:
+            entry['keys'] = keys
+        if keys or 'label_change' in entry or 'index_change' in entry:
+            layers.append(entry)
+
+    combos = []
+    old_combos = {combo['name']: combo for combo in old.combos}
+    new_combos = {combo['name']: combo for combo in new.combos}
+    for name, combo in old_combos.items():
+        if name not in new_combos:
+            combos.append({'combo': name, 'status': 'removed', 'binding': combo['binding']})
+    for name, combo in new_combos.items():
+        if name not in old_combos:
+            combos.append({'combo': name, 'status': 'added', 'binding': combo['binding']})
+            continue
+        changes = _changes(old_combos[name], combo, COMBO_FIELDS)
+        if changes:
+            combos.append({'combo': name, 'status': 'changed', 'changes': changes})
+
+    behaviors = []
+    for name, behavior in old.behaviors.items():
+        if name not in new.behaviors:
+            behaviors.append({'behavior': name, 'status': 'removed', 'compatible': behavior.get('compatible')})
+    for name, behavior in new.behaviors.items():
+        if name not in old.behaviors:
+            behaviors.append({'behavior': name, 'status': 'added', 'compatible': behavior.get('compatible')})
+            continue
+        old_behavior = old.behaviors[name]
+        fields = list(old_behavior) + [field for field in behavior if field not in old_behavior]
+        changes = _changes(old_behavior, behavior, fields)
+        if changes:
+            behaviors.append({'behavior': name, 'status': 'changed', 'changes': changes})
+
+    return {'layers': layers, 'combos': combos, 'behaviors': behaviors}
+
+
+def _describe_key(key: Optional[Dict]) -> str:
+    if key is None:
+        return '(none)'
+    return f"{key['binding']} [{key['label']}]" if key['label'] else key['binding']
+
+
+def format_text(diff: Dict) -> str:
+    """Render a diff as indented plain text, one change per line."""
+    lines = []
+    for layer in diff['layers']:
+        if layer['status'] != 'changed':
+            lines.append(f"{layer['status']} layer {layer['layer']} ({layer['label']})")
+            continue
+        lines.append(f"layer {layer['layer']} ({layer['label']}):")
+        if 'label_change' in layer:
+            lines.append(f"  label: {layer['label_change'][0]!r} -> {layer['label_change'][1]!r}")
+        if 'index_change' in layer:
+            lines.append(f"  index: {layer['index_change'][0]} -> {layer['index_change'][1]}")
+        for key in layer.get('keys', []):
+            lines.append(f"  {key['position']:>3}: {_describe_key(key['old'])} -> {_describe_key(key['new'])}")
+    for kind, items in (('combo', diff['combos']), ('behavior', diff['behaviors'])):
+        for item in items:
+            if item['status'] != 'changed':
+                detail = item.get('binding') or item.get('compatible')
+                lines.append(f"{item['status']} {kind} {item[kind]}: {detail}")
+                continue
+            lines.append(f"{kind} {item[kind]}:")
+            for field, (before, after) in item['changes'].items():
+                lines.append(f"  {field}: {before} -> {after}")
+    return '\n'.join(lines) if lines else 'no changes'
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point."""
+    arg_parser = argparse.ArgumentParser(description="Compare two ZMK keymaps structurally.")
+    arg_parser.add_argument('old', help="keymap file, REV:PATH or git revision")
+    arg_parser.add_argument('new', nargs='?', default=DEFAULT_KEYMAP,
+                            help="keymap file, REV:PATH or git revision (default: the working tree keymap)")
+    arg_parser.add_argument('--format', choices=('text', 'json'), default='text')
+    arg_parser.add_argument('--no-cache', action='store_true', help="do not use the generator's parse cache")
+    arg_parser.add_argument('--exit-code', action='store_true',
+                            help="exit with status 1 when the keymaps differ")
+    args = arg_parser.parse_args(argv)
+
+    cache = ReadmeCache(os.path.join(SCRIPT_DIR, '.readme-cache'), enabled=not args.no_cache)
+    try:
+        old = parse(args.old, cache)
+        new = parse(args.new, cache)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+
+    diff = diff_keymaps(old, new)
+    if args.format == 'json':
+        print(json.dumps(dict(diff, old=args.old, new=args.new), indent=2, default=str))
+    else:
+        print(format_text(diff))
+    changed = any(diff.values())
+    return 1 if args.exit_code and changed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
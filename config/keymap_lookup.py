@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Reverse lookup for a ZMK keymap: how do I type this?
+
+Builds an index from every keycode, character, display label and binding
+in the keymap to all the ways of producing it: the layer and the keys
+held to reach it, the key position (or combo keys), any Shift needed and
+the modifiers a hold-tap or modifier function adds. Lookups are single
+dict accesses; the index is saved as JSON keyed by a hash of the keymap
+and rebuilt only when the keymap changes.
+
+Usage:
+    python3 keymap_lookup.py '{' F5 bootloader
+    python3 keymap_lookup.py LCTRL --json
+"""
+
+import os
+import sys
+import json
+import hashlib
+import argparse
+from typing import Dict, List, Optional, Tuple
+
+from generate_readme import ZMKKeymapParser, Binding, BindingDecoder, GENERATOR_VERSION, write_atomic
+from typing_corpus import CharMap, US_SHIFT, finger_map
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_KEYMAP = os.path.join(SCRIPT_DIR, 'clickety_split_pepito.keymap')
+DEFAULT_INDEX = os.path.join(SCRIPT_DIR, '.readme-cache', 'reverse-index.json')
+# Bump when the saved index format changes, like GENERATOR_VERSION for the parser
+INDEX_VERSION = '1'
+
+# Modifier functions such as LC(X) and the modifier each one holds
+MODIFIER_FUNCTIONS = {
+    'LC': 'LCTRL', 'LS': 'LSHFT', 'LA': 'LALT', 'LG': 'LGUI',
+    'RC': 'RCTRL', 'RS': 'RSHFT', 'RA': 'RALT', 'RG': 'RGUI',
+}
+
+
+def split_modifiers(keycode: str) -> Tuple[List[str], str]:
+    """Split ``LA(LC(H))`` into ``(['LALT', 'LCTRL'], 'H')``."""
+    modifiers = []
+    while keycode[:2] in MODIFIER_FUNCTIONS and keycode[2:3] == '(' and keycode.endswith(')'):
+        modifiers.append(MODIFIER_FUNCTIONS[keycode[:2]])
+        keycode = keycode[3:-1]
+    return modifiers, keycode
+
+
+class ReverseIndex:
+    """Maps lookup keys to every way of producing them.
+
+    ``ways`` is a list of plain dicts (one per layer/position or combo that
+    produces something) and ``index`` maps each key to the ids of its ways,
+    so the whole structure round-trips through JSON unchanged.
+    """
+
+    def __init__(self, ways: List[Dict], index: Dict[str, List[int]], source: str = ''):
+        self.ways = ways
+        self.index = index
+        self.source = source
+
+    @classmethod
+    def build(cls, parser: ZMKKeymapParser, source: str = '') -> 'ReverseIndex':
+        """Index every binding of every layer and every combo of a parsed keymap."""
+        charmap = CharMap(parser, finger_map(parser.layout))
+        builder = cls([], {}, source)
+        layer_names = list(parser.layers)
+        # Each held key of a layer path, with the binding it has on the layer it is pressed on
+        path_layers = {tuple(held): layer for layer, held in charmap.paths.items()}
+        paths = {layer: [{'position': position,
+                          'binding': str(parser.layers[layer_names[path_layers[tuple(held[:hop])]]][position])}
+                         for hop, position in enumerate(held)]
+                 for layer, held in charmap.paths.items()}
+        for layer, name in enumerate(layer_names):
+            for position, binding in enumerate(parser.layers[name]):
+                builder._add_binding(parser, charmap, paths, binding, layer, [position], None)
+        for combo in parser.combos:
+            binding = Binding(*BindingDecoder.tokenize(combo['binding']))
+            for layer in combo['layers'] or range(len(layer_names)):
+                if 0 <= layer < len(layer_names) and combo['positions']:
+                    builder._add_binding(parser, charmap, paths, binding, layer, combo['positions'], combo['name'])
+        return builder
+
+    def _add(self, keys, way: Dict):
+        way_id = len(self.ways)
+        self.ways.append(way)
+        for key in dict.fromkeys(key for key in keys if key):
+            self.index.setdefault(key, []).append(way_id)
+
+    def _add_binding(self, parser: ZMKKeymapParser, charmap: CharMap, paths: Dict[int, List[Dict]],
+                     binding: Binding, layer: int, positions: List[int], combo: Optional[str]):
+        if binding.behavior in ('trans', 'none', ''):
+            return
+        base = {
+            'layer': list(parser.layers)[layer],
+            'layer_index': layer,
+            'layer_name': parser._get_layer_name(str(layer)),
+            'path': paths.get(layer),
+            'positions': list(positions),
+            'combo': combo,
+            'binding': str(binding),
+        }
+
+        kind, hold, tap = charmap.split(binding)
+        label = parser.decoder.decode(binding.behavior, binding.params)
+        keys = [str(binding), label]
+        if tap is not None:
+            modifiers, _ = split_modifiers(tap)
+            char, implicit_shift = charmap.keycode_char(tap)
+            tap_label = parser.decoder.decode('kp', (tap,))
+            role = 'tap' if kind else 'press'
+            self._add(keys + [tap, char, tap_label], dict(base, role=role, keycode=tap, modifiers=modifiers,
+                                                          shift=None, label=tap_label))
+            shifted = None
+            if char and not implicit_shift:
+                shifted = char.upper() if char.isalpha() else US_SHIFT.get(char)
+            shift = charmap._shift_for(positions[0]) if shifted else None
+            if shift is not None:
+                self._add([shifted], dict(base, role=role, keycode=tap, modifiers=modifiers + ['LSHFT'],
+                                          shift=shift, label=shifted))
+        elif kind != 'layer':
+            self._add(keys, dict(base, role='press', label=label))
+        if kind == 'mod' and hold:
+            self._add([hold], dict(base, role='hold', keycode=hold, modifiers=[hold], shift=None, label=hold))
+        elif kind == 'layer' and hold:
+            try:
+                target = parser._get_layer_name(str(int(hold, 0)))
+            except ValueError:
+                target = hold
+            layer_keys = [f'layer:{target}'] + (keys if tap is None else [])
+            self._add(layer_keys, dict(base, role='hold', label=f'layer {target}'))
+
+    def lookup(self, query: str) -> List[Dict]:
+        """All ways of producing query; keycodes are also tried upper-case and bindings with ``&``."""
+        for key in (query, query.upper(), '&' + query, 'layer:' + query.upper()):
+            ids = self.index.get(key)
+            if ids:
+                return [self.ways[way_id] for way_id in ids]
+        return []
+
+    def to_json(self) -> Dict:
+        return {'version': [GENERATOR_VERSION, INDEX_VERSION], 'source': self.source,
+                'ways': self.ways, 'index': self.index}
+
+    def save(self, path: str):
+        """Write the index atomically as JSON."""
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        write_atomic(path, json.dumps(self.to_json(), separators=(',', ':')))
+
+    @classmethod
+    def load(cls, path: str, source: str) -> Optional['ReverseIndex']:
+        """Load a saved index, or None if it is missing or was built from other input."""
+        try:
+            with open(path, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get('version') != [GENERATOR_VERSION, INDEX_VERSION] or data.get('source') != source:
+            return None
+        return cls(data['ways'], data['index'], source)
+
+
+def source_digest(keymap_file: str) -> str:
+    """Identity of the keymap an index was built from."""
+    with open(keymap_file, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def open_index(keymap_file: str, index_file: Optional[str] = DEFAULT_INDEX, rebuild: bool = False) -> ReverseIndex:
+    """Load the saved index for keymap_file, building and saving it when stale."""
+    source = source_digest(keymap_file)
+    index = None if rebuild or not index_file else ReverseIndex.load(index_file, source)
+    if index is None:
+        parser = ZMKKeymapParser(keymap_file, '')
+        parser.parse_keymap()
+        index = ReverseIndex.build(parser, source)
+        if index_file:
+            index.save(index_file)
+    return index
+
+
+def describe(way: Dict) -> str:
+    """One line explaining how to produce a lookup result."""
+    if way['path'] is None:
+        steps = [f"layer {way['layer_name']} (not reachable from the base layer)"]
+    elif way['path']:
+        held = ' then '.join(f"pos {step['position']} ({step['binding']})" for step in way['path'])
+        steps = [f"hold {held}"]
+    else:
+        steps = []
+    if way.get('shift') is not None:
+        steps.append(f"hold Shift (pos {way['shift']})")
+    keys = ' + '.join(f"pos {position}" for position in way['positions'])
+    action = {'hold': 'hold', 'tap': 'tap'}.get(way['role'], 'press')
+    target = f"combo {way['combo']}: {action} {keys}" if way['combo'] else f"{action} {keys}"
+    steps.append(f"{target} [{way['binding']}]")
+    if way.get('modifiers') and way['role'] != 'hold':
+        steps.append(f"sends {'+'.join(way['modifiers'])}")
+    return f"{way['layer_name']:>5}: " + ', '.join(steps)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point."""
+    arg_parser = argparse.ArgumentParser(description="Find every way to type a key or character.")
+    arg_parser.add_argument('query', nargs='+', help="character, keycode, label or binding to look up")
+    arg_parser.add_argument('--keymap', default=DEFAULT_KEYMAP)
+    arg_parser.add_argument('--index', default=DEFAULT_INDEX, help="saved index file (default: %(default)s)")
+    arg_parser.add_argument('--rebuild', action='store_true', help="rebuild the index even if it is current")
+    arg_parser.add_argument('--json', action='store_true', help="print the matching ways as JSON")
+    args = arg_parser.parse_args(argv)
+
+    try:
+        index = open_index(args.keymap, args.index, args.rebuild)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+
+    results = {query: index.lookup(query) for query in args.query}
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for query, ways in results.items():
+            print(f"{query}:")
+            for way in ways:
+                print(f"  {describe(way)}")
+            if not ways:
+                print("  not on this keymap")
+    return 0 if all(results.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,6 @@
+import os
+import sys
+
+CONFIG_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if CONFIG_DIR not in sys.path:
+    sys.path.insert(0, CONFIG_DIR)
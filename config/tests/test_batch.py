@@ -0,0 +1,128 @@
+import os
+
+import pytest
+
+import generate_readme
+from generate_readme import (DTSyntaxError, ReadmeCache, ZMKKeymapParser, discover_pairs,
+                             pairs_from_build_matrix, run_batch)
+
+KEYMAP = """\
+#include <behaviors.dtsi>
+#include <dt-bindings/zmk/keys.h>
+
+/ {
+    keymap {
+        compatible = "zmk,keymap";
+        default_layer {
+            bindings = <&kp A &kp B>;
+        };
+    };
+};
+"""
+
+
+def write(path, content=''):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(content)
+    return str(path)
+
+
+def test_discover_pairs_names_readmes_per_directory(tmp_path):
+    write(tmp_path / 'solo' / 'corne.keymap', KEYMAP)
+    write(tmp_path / 'solo' / 'corne.conf')
+    write(tmp_path / 'multi' / 'a.keymap', KEYMAP)
+    write(tmp_path / 'multi' / 'a.conf')
+    write(tmp_path / 'multi' / 'b.keymap', KEYMAP)
+    write(tmp_path / 'multi' / 'b.conf')
+    lonely = write(tmp_path / 'multi' / 'c.keymap', KEYMAP)
+    write(tmp_path / 'build' / 'x.keymap', KEYMAP)
+    write(tmp_path / 'build' / 'x.conf')
+
+    jobs, skipped = discover_pairs(str(tmp_path))
+
+    readmes = [os.path.relpath(readme, tmp_path) for _, _, readme in jobs]
+    assert readmes == [os.path.join('multi', 'a.md'), os.path.join('multi', 'b.md'),
+                       os.path.join('solo', 'readme.md')]
+    assert skipped == [(lonely, "no c.conf")]
+
+
+def test_pairs_from_build_matrix_shares_keymap_between_halves(tmp_path):
+    build_yaml = write(tmp_path / 'build.yaml', """\
+---
+include:
+  - board: nice_nano_v2
+    shield: corne_left
+  - board: nice_nano_v2
+    shield: corne_right
+  - board: nice_nano_v2
+    shield: settings_reset
+""")
+    keymap = write(tmp_path / 'config' / 'corne.keymap', KEYMAP)
+    conf = write(tmp_path / 'config' / 'corne.conf')
+
+    jobs, skipped = pairs_from_build_matrix(build_yaml)
+
+    assert jobs == [(keymap, conf, str(tmp_path / 'config' / 'readme.md'))]
+    assert skipped == [('settings_reset', "no keymap in config/")]
+
+
+def test_run_batch_reports_failures(tmp_path, capsys):
+    good = write(tmp_path / 'good.keymap', KEYMAP)
+    bad = write(tmp_path / 'bad.keymap', KEYMAP.replace('};\n};', '};'))
+    jobs = [(path, write(tmp_path / (os.path.basename(path)[:-7] + '.conf')), path[:-7] + '.md')
+            for path in (good, bad)]
+    cache = ReadmeCache(str(tmp_path / 'cache'))
+
+    assert run_batch(jobs, [('skipped.keymap', 'no skipped.conf')], cache, workers=2) == 1
+
+    output = capsys.readouterr().out
+    assert f"-> {good[:-7]}.md" in output
+    assert "FAIL" in output and bad in output
+    assert "1 generated, 1 failed, 1 skipped" in output
+    assert os.path.exists(good[:-7] + '.md')
+    assert not os.path.exists(bad[:-7] + '.md')
+
+
+def test_non_integer_key_positions_are_a_syntax_error(tmp_path):
+    keymap = tmp_path / 'combo.keymap'
+    keymap.write_text(KEYMAP.replace('    keymap {', """\
+    combos {
+        compatible = "zmk,combos";
+        combo_esc {
+            key-positions = <FOO 1>;
+            bindings = <&kp ESC>;
+        };
+    };
+    keymap {"""))
+    parser = ZMKKeymapParser(str(keymap), '')
+    with pytest.raises(DTSyntaxError, match=r"combo\.keymap:8:.*key-positions of 'combo_esc'.*<FOO 1>"):
+        parser.parse_keymap()
+
+
+def test_unexpected_exception_fails_only_its_job(tmp_path, capsys, monkeypatch):
+    good = write(tmp_path / 'good.keymap', KEYMAP)
+    broken = write(tmp_path / 'broken.keymap', KEYMAP)
+    original = generate_readme.generate_file
+
+    def generate_file(keymap_file, *args, **kwargs):
+        if keymap_file == broken:
+            raise TypeError("'<' not supported between instances of 'str' and 'int'")
+        return original(keymap_file, *args, **kwargs)
+
+    monkeypatch.setattr(generate_readme, 'generate_file', generate_file)
+    jobs = [(path, write(tmp_path / 'shared.conf'), path[:-7] + '.md') for path in (broken, good)]
+
+    assert run_batch(jobs, [], ReadmeCache(str(tmp_path / 'cache'), enabled=False), workers=1) == 1
+
+    output = capsys.readouterr().out
+    assert "FAIL" in output and "TypeError: '<' not supported" in output
+    assert "1 generated, 1 failed, 0 skipped" in output
+
+
+def test_main_reports_unexpected_exceptions(capsys, monkeypatch):
+    def generate_file(*args, **kwargs):
+        raise KeyError('layer')
+
+    monkeypatch.setattr(generate_readme, 'generate_file', generate_file)
+    assert generate_readme.main(['--no-cache']) == 1
+    assert capsys.readouterr().out == "Error: KeyError: 'layer'\n"
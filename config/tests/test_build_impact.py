@@ -0,0 +1,168 @@
+import json
+import shutil
+import subprocess
+
+import pytest
+
+from generate_readme import changed_matrix, write_manifest, canonical_devicetree
+
+pytestmark = pytest.mark.skipif(shutil.which('git') is None, reason="needs git")
+
+BUILD_YAML = """\
+---
+include:
+  - board: nice_nano_v2
+    shield: demo_left
+  - board: nice_nano_v2
+    shield: demo_right
+  - board: nice_nano_v2
+    shield: settings_reset
+"""
+
+KEYMAP = """\
+#include <behaviors.dtsi>
+#define BASE 0
+
+/ {
+    keymap {
+        compatible = "zmk,keymap";
+        default_layer {
+            bindings = <&kp A &kp B>;  // home keys
+        };
+    };
+};
+"""
+
+
+ALL = ['demo_left', 'demo_right', 'settings_reset']
+
+
+def git(repo, *args):
+    return subprocess.run(['git', '-C', str(repo), *args], check=True, capture_output=True, text=True).stdout
+
+
+@pytest.fixture
+def repo(tmp_path):
+    """A committed zmk-config repository with a worktree of that commit next to it as ``base``."""
+    root = tmp_path / 'repo'
+    (root / 'config').mkdir(parents=True)
+    (root / 'build.yaml').write_text(BUILD_YAML)
+    (root / 'config' / 'demo.keymap').write_text(KEYMAP)
+    (root / 'config' / 'demo.conf').write_text('CONFIG_ZMK_SLEEP=y\n')
+    (root / 'config' / 'west.yml').write_text('manifest:\n  projects:\n    - name: zmk  # upstream\n')
+    (root / 'config' / 'readme.md').write_text('# Demo\n')
+    git(root, 'init', '-q')
+    git(root, 'add', '-A')
+    git(root, '-c', 'user.name=test', '-c', 'user.email=test@example.com', 'commit', '-qm', 'config')
+    git(root, 'worktree', 'add', '-q', str(tmp_path / 'base'), 'HEAD')
+    return root
+
+
+def changed(repo):
+    """Shields whose firmware inputs differ between the base worktree and the work tree."""
+    manifest = repo.parent / 'manifest.json'
+    write_manifest(str(repo.parent / 'base' / 'build.yaml'), str(manifest))
+    return [entry['shield'] for entry in changed_matrix(str(repo / 'build.yaml'), str(manifest))]
+
+
+def edit(path, old, new):
+    path.write_text(path.read_text().replace(old, new))
+
+
+def test_nothing_changed(repo):
+    assert changed(repo) == []
+
+
+def test_comment_and_formatting_edits_do_not_rebuild(repo):
+    keymap = repo / 'config' / 'demo.keymap'
+    edit(keymap, '// home keys', '/* the home\n   keys */')
+    edit(keymap, '<&kp A &kp B>', '<  &kp A\n\t&kp B  >')
+    edit(repo / 'config' / 'west.yml', '# upstream', '# pinned upstream')
+    (repo / 'config' / 'readme.md').write_text('# Demo, documented\n')
+    assert changed(repo) == []
+
+
+def test_documentation_and_scripts_do_not_rebuild(repo):
+    config = repo / 'config'
+    (config / 'layouts').mkdir()
+    (config / 'layouts' / 'demo.json').write_text('{"rows": []}')
+    (config / 'generate_readme.py').write_text('print("docs")\n')
+    (config / 'tests').mkdir()
+    (config / 'tests' / 'test_demo.py').write_text('')
+    for extension in ('.svg', '.html', '.json'):
+        (config / ('demo' + extension)).write_text('rendered')
+    assert changed(repo) == []
+
+
+def test_binding_change_rebuilds(repo):
+    edit(repo / 'config' / 'demo.keymap', '&kp B', '&kp C')
+    assert changed(repo) == ALL
+
+
+def test_included_dtsi_change_rebuilds(repo, tmp_path):
+    shared = repo / 'shared'
+    shared.mkdir()
+    (shared / 'combos.dtsi').write_text('/ { combos { compatible = "zmk,combos"; }; };\n')
+    (repo / 'config' / 'macros.h').write_text('#define HOME 0\n')
+    edit(repo / 'config' / 'demo.keymap', '#define BASE 0',
+         '#define BASE 0\n#include "macros.h"\n#include "../shared/combos.dtsi"')
+    git(repo, 'add', '-A')
+    git(repo, '-c', 'user.name=test', '-c', 'user.email=test@example.com', 'commit', '-qm', 'includes')
+    git(tmp_path / 'base', 'checkout', '-q', '--detach', git(repo, 'rev-parse', 'HEAD').strip())
+    assert changed(repo) == []
+    edit(shared / 'combos.dtsi', '"zmk,combos";', '"zmk,combos"; timeout-ms = <40>;')
+    assert changed(repo) == ALL
+    edit(shared / 'combos.dtsi', 'timeout-ms = <40>;', '')
+    edit(repo / 'config' / 'macros.h', 'HOME 0', 'HOME 1')
+    assert changed(repo) == ALL
+
+
+def test_other_half_conf_change_rebuilds(repo):
+    # ZMK merges demo.conf with demo_left.conf or demo_right.conf
+    (repo / 'config' / 'demo_right.conf').write_text('CONFIG_ZMK_SPLIT_BLE_ROLE_CENTRAL=n\n')
+    assert changed(repo) == ALL
+
+
+def test_overlay_and_board_files_rebuild(repo):
+    (repo / 'config' / 'demo.overlay').write_text('&kscan0 { debounce-press-ms = <3>; };\n')
+    assert changed(repo) == ALL
+    (repo / 'config' / 'demo.overlay').unlink()
+    board = repo / 'config' / 'boards' / 'arm' / 'demo_board'
+    board.mkdir(parents=True)
+    (board / 'demo_board.conf').write_text('CONFIG_BT=y\n')
+    assert changed(repo) == ALL
+
+
+def test_macro_value_change_is_seen_through_expansion(repo):
+    keymap = repo / 'config' / 'demo.keymap'
+    edit(keymap, '#define BASE 0', '#define KEY B')
+    edit(keymap, '&kp B', '&kp KEY')
+    assert changed(repo) == []
+    edit(keymap, '#define KEY B', '#define KEY Z')
+    assert changed(repo) == ALL
+
+
+def test_kconfig_change_rebuilds(repo):
+    (repo / 'config' / 'demo.conf').write_text('# sleep\nCONFIG_ZMK_SLEEP=y\n')
+    assert changed(repo) == []
+    (repo / 'config' / 'demo.conf').write_text('CONFIG_ZMK_SLEEP=n\n')
+    assert changed(repo) == ALL
+
+
+def test_unparsable_keymap_counts_as_changed(repo, tmp_path):
+    edit(tmp_path / 'base' / 'config' / 'demo.keymap', '&kp B>', '&kp B')
+    assert changed(repo) == ALL
+    edit(repo / 'config' / 'demo.keymap', '&kp B>', '&kp B')
+    assert changed(repo) == ALL
+
+
+def test_missing_manifest_rebuilds_everything(repo, tmp_path):
+    entries = changed_matrix(str(repo / 'build.yaml'), str(tmp_path / 'missing.json'))
+    assert [entry['shield'] for entry in entries] == ALL
+    (tmp_path / 'bad.json').write_text(json.dumps(['not', 'a', 'manifest']))
+    assert len(changed_matrix(str(repo / 'build.yaml'), str(tmp_path / 'bad.json'))) == 3
+
+
+def test_canonical_devicetree_drops_comments_and_expands_macros():
+    assert canonical_devicetree(KEYMAP) == canonical_devicetree(KEYMAP.replace('// home keys', ''))
+    assert 'BASE' not in canonical_devicetree(KEYMAP.replace('&kp A', '&kp BASE'))
@@ -0,0 +1,132 @@
+import os
+
+from generate_readme import ReadmeCache, ZMKKeymapParser, generate_file
+
+KEYMAP = """
+#include <behaviors.dtsi>
+#include <dt-bindings/zmk/keys.h>
+
+/ {
+    behaviors {
+        hm: homerow_mods {
+            compatible = "zmk,behavior-hold-tap";
+            #binding-cells = <2>;
+            tapping-term-ms = <175>;
+            bindings = <%s>, <&kp>;
+        };
+    };
+    combos {
+        compatible = "zmk,combos";
+        combo_esc {
+            timeout-ms = <50>;
+            key-positions = <0 1>;
+            bindings = <&kp ESC>;
+        };
+    };
+    keymap {
+        compatible = "zmk,keymap";
+        default_osx_layer {
+            bindings = <&hm 1 A &kp B &kp C &mo 1>;
+        };
+        lower_osx_layer {
+            bindings = <&trans &trans &trans &trans>;
+        };
+        extra_layer {
+            label = "%s";
+            bindings = <&trans &trans &trans &trans>;
+        };
+    };
+};
+"""
+
+
+def render(tmp_path, cache_dir, hold='&kp', second_layer='NAV'):
+    keymap = tmp_path / 'test.keymap'
+    conf = tmp_path / 'test.conf'
+    readme = tmp_path / 'readme.md'
+    keymap.write_text(KEYMAP % (hold, second_layer))
+    conf.write_text('CONFIG_ZMK_SLEEP=y\n')
+    cache = ReadmeCache(str(cache_dir), enabled=cache_dir is not None) if cache_dir else None
+    generate_file(str(keymap), str(conf), str(readme), cache=cache)
+    return readme.read_text()
+
+
+def test_layer_table_cache_misses_when_behavior_changes(tmp_path):
+    cache_dir = tmp_path / 'cache'
+    before = render(tmp_path, cache_dir, hold='&kp')
+    after = render(tmp_path, cache_dir, hold='&mo')
+    assert after != before
+    assert after == render(tmp_path, None, hold='&mo')
+
+
+def test_combo_table_cache_misses_when_layer_titles_change(tmp_path):
+    cache_dir = tmp_path / 'cache'
+    render(tmp_path, cache_dir, second_layer='NAV')
+    after = render(tmp_path, cache_dir, second_layer='SYM')
+    assert after == render(tmp_path, None, second_layer='SYM')
+
+
+def test_cache_round_trip_and_version_in_key(tmp_path):
+    cache = ReadmeCache(str(tmp_path))
+    key = cache.key('layer', ['&kp A'])
+    assert cache.cached('layer', key, lambda: 'table') == 'table'
+    assert cache.cached('layer', key, lambda: 'recomputed') == 'table'
+    assert cache.key('layer', ['&kp B']) != key
+
+
+def test_evict_removes_least_recently_used_entries(tmp_path):
+    cache = ReadmeCache(str(tmp_path), max_bytes=10 ** 9)
+    for index, name in enumerate(('old', 'used', 'new')):
+        cache.put('layer', name, 'x' * 1000)
+        os.utime(tmp_path / f'layer-{name}.pickle', (index, index))
+    assert cache.get('layer', 'used') == 'x' * 1000
+    size = (tmp_path / 'layer-new.pickle').stat().st_size
+    cache.max_bytes = 2 * size
+    cache.evict()
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['layer-new.pickle', 'layer-used.pickle']
+
+
+def test_corrupt_entry_is_a_miss(tmp_path):
+    cache = ReadmeCache(str(tmp_path))
+    (tmp_path / 'layer-bad.pickle').write_bytes(b'not a pickle')
+    assert cache.get('layer', 'bad') is None
+    assert cache.cached('layer', 'bad', lambda: 'fresh') == 'fresh'
+    assert cache.get('layer', 'bad') == 'fresh'
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_disabled_cache_writes_nothing(tmp_path):
+    cache = ReadmeCache(str(tmp_path / 'cache'), enabled=False)
+    cache.put('layer', 'key', 'value')
+    assert cache.get('layer', 'key') is None
+    assert not (tmp_path / 'cache').exists()
+
+
+def test_layer_table_hit_skips_label_work_and_miss_computes_once(tmp_path, monkeypatch):
+    calls = []
+    original = ZMKKeymapParser.table_labels
+
+    def table_labels(self, layer_name, layer_data):
+        calls.append(layer_name)
+        return original(self, layer_name, layer_data)
+
+    monkeypatch.setattr(ZMKKeymapParser, 'table_labels', table_labels)
+    cache_dir = tmp_path / 'cache'
+    render(tmp_path, cache_dir)
+    assert sorted(calls) == ['default_osx_layer', 'lower_osx_layer']
+    calls.clear()
+    render(tmp_path, cache_dir)
+    assert calls == []
+
+
+def test_fall_through_cells_miss_when_a_lower_layer_changes(tmp_path):
+    cache_dir = tmp_path / 'cache'
+    render(tmp_path, cache_dir)
+    keymap = tmp_path / 'test.keymap'
+    keymap.write_text(keymap.read_text().replace('&kp B &kp C', '&kp B &kp D'))
+    cache = ReadmeCache(str(cache_dir))
+    generate_file(str(keymap), str(tmp_path / 'test.conf'), str(tmp_path / 'readme.md'), cache=cache)
+    cached = (tmp_path / 'readme.md').read_text()
+    generate_file(str(keymap), str(tmp_path / 'test.conf'), str(tmp_path / 'readme.md'), cache=None)
+    assert cached == (tmp_path / 'readme.md').read_text()
+    assert '▽D' in cached
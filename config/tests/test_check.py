@@ -0,0 +1,84 @@
+import os
+import shutil
+import subprocess
+import sys
+
+import pytest
+
+import generate_readme
+from generate_readme import ZMKKeymapParser, check_file, generate_file
+
+CONFIG_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+KEYMAP = 'clickety_split_pepito.keymap'
+CONF = 'clickety_split_pepito.conf'
+
+
+@pytest.fixture
+def config(tmp_path):
+    """A copy of the generator with its keymap and conf, and a freshly generated README."""
+    for name in ('generate_readme.py', KEYMAP, CONF):
+        shutil.copy(os.path.join(CONFIG_DIR, name), tmp_path / name)
+    shutil.copytree(os.path.join(CONFIG_DIR, 'layouts'), tmp_path / 'layouts')
+    generate_file(*paths(tmp_path))
+    return tmp_path
+
+
+def paths(config):
+    return str(config / KEYMAP), str(config / CONF), str(config / 'readme.md')
+
+
+def run_check(config):
+    return subprocess.run([sys.executable, str(config / 'generate_readme.py'), '--check', '--no-cache'],
+                          capture_output=True, text=True)
+
+
+def test_fresh_readme_is_up_to_date(config):
+    assert check_file(*paths(config)) == (True, "fingerprint matches")
+    result = run_check(config)
+    assert result.returncode == 0, result.stdout
+    assert 'is up to date' in result.stdout
+
+
+def test_hand_edited_readme_is_stale(config):
+    readme = config / 'readme.md'
+    # The trailer is left intact; only the body changes
+    readme.write_text(readme.read_text().replace('## Combos', '## Combos (edited)'))
+    assert check_file(*paths(config)) == (False, "content differs")
+    result = run_check(config)
+    assert result.returncode == 1
+    assert 'is stale (content differs)' in result.stdout
+
+
+def test_matching_fingerprint_does_not_render(config, monkeypatch):
+    def render(self):
+        raise AssertionError("rendered despite a matching fingerprint")
+
+    monkeypatch.setattr(ZMKKeymapParser, 'generate_readme', render)
+    assert check_file(*paths(config))[0]
+
+
+def test_comment_edit_is_fresh_by_content(config):
+    keymap = config / KEYMAP
+    keymap.write_text(keymap.read_text() + '\n// trailing comment\n')
+    assert check_file(*paths(config)) == (True, "content matches, fingerprint outdated")
+    keymap.write_text(keymap.read_text().replace('&kp Q', '&kp Z', 1))
+    assert check_file(*paths(config)) == (False, "content differs")
+
+
+def test_unchanged_output_is_not_rewritten(config):
+    readme = config / 'readme.md'
+    os.utime(readme, ns=(1_000_000_000, 1_000_000_000))
+    inode = readme.stat().st_ino
+    assert generate_file(*paths(config)) == {str(readme): False}
+    assert readme.stat().st_mtime_ns == 1_000_000_000
+    assert readme.stat().st_ino == inode
+    assert not [name for name in os.listdir(config) if name.endswith('.tmp')]
+
+
+def test_stamped_and_streamed_trailers_agree(config):
+    parser = ZMKKeymapParser(*paths(config)[:2])
+    parser.parse_keymap()
+    parser.parse_config()
+    fingerprint = generate_readme.input_fingerprint(*paths(config)[:2], None, parser.input_files())
+    stamped = generate_readme.stamp_readme(parser.render_readme(), fingerprint)
+    assert stamped == (config / 'readme.md').read_text()
@@ -0,0 +1,79 @@
+from generate_readme import ComboIndex, ZMKKeymapParser
+
+LAYERS = ('layer_0 { bindings = <&kp A &kp B &kp C &kp D &mo 1>; }; '
+          'layer_1 { bindings = <&kp N1 &kp N2 &kp N3 &kp N4 &trans>; }; ')
+
+
+def parse(combos):
+    """Parse a two-layer keymap with combo nodes given as ``name: properties`` pairs."""
+    nodes = ' '.join(f'combo_{name} {{ {properties} }};' for name, properties in combos.items())
+    parser = ZMKKeymapParser('test.keymap', '')
+    parser.parse_keymap('/ { combos { compatible = "zmk,combos"; ' + nodes + ' }; '
+                        'keymap { compatible = "zmk,keymap"; ' + LAYERS + '}; };')
+    return parser
+
+
+def conflicts(parser):
+    return [(kind, combo['name'], other['name'], layers)
+            for kind, combo, other, layers in parser.combo_index.conflicts()]
+
+
+def test_masks_index_combos_by_layer_and_position():
+    parser = parse({
+        'esc': 'key-positions = <0 1>; bindings = <&kp ESC>;',
+        'tab': 'key-positions = <1 2>; bindings = <&kp TAB>; layers = <1>;',
+    })
+    index = parser.combo_index
+    assert index.masks[0] == {0: 0b01, 1: 0b01}
+    assert index.masks[1] == {0: 0b01, 1: 0b11, 2: 0b10}
+    assert [combo['name'] for combo in index.combos_at(1, 1)] == ['esc', 'tab']
+    assert index.combos_at(0, 2) == []
+    assert index.combos_at(5, 0) == []
+
+
+def test_overlapping_positions_on_disjoint_layers_are_not_reported():
+    parser = parse({
+        'esc': 'key-positions = <0 1>; bindings = <&kp ESC>; layers = <0>;',
+        'tab': 'key-positions = <0 1>; bindings = <&kp TAB>; layers = <1>; timeout-ms = <30>;',
+        'del': 'key-positions = <1 2 3>; bindings = <&kp DEL>; layers = <0>;',
+    })
+    assert conflicts(parser) == []
+
+
+def test_duplicate_positions_are_reported_on_the_shared_layers():
+    parser = parse({
+        'esc': 'key-positions = <1 0>; bindings = <&kp ESC>;',
+        'tab': 'key-positions = <0 1>; bindings = <&kp TAB>; layers = <1>;',
+    })
+    assert conflicts(parser) == [('duplicate', 'esc', 'tab', [1])]
+
+
+def test_subset_shadows_superset_in_either_order():
+    parser = parse({
+        'wide': 'key-positions = <0 1 2>; bindings = <&kp ENTER>;',
+        'narrow': 'key-positions = <1 2>; bindings = <&kp TAB>;',
+        'other': 'key-positions = <2 3>; bindings = <&kp DEL>; layers = <0>;',
+    })
+    assert conflicts(parser) == [('shadows', 'narrow', 'wide', [0, 1])]
+    report = parser._describe_combo_conflict('shadows', *parser.combo_index.conflicts()[0][1:])
+    assert report == 'Narrow is a subset of Wide on layer_0, layer_1'
+
+
+def test_differing_timeouts_are_reported_for_partial_overlaps():
+    parser = parse({
+        'esc': 'key-positions = <0 1>; bindings = <&kp ESC>; timeout-ms = <30>;',
+        'tab': 'key-positions = <1 2>; bindings = <&kp TAB>;',
+        'del': f'key-positions = <2 3>; bindings = <&kp DEL>; timeout-ms = <{ComboIndex.DEFAULT_TIMEOUT_MS}>;',
+    })
+    # tab has no timeout-ms, so it uses the default and matches del
+    assert conflicts(parser) == [('timeout', 'esc', 'tab', [0, 1])]
+    report = parser._describe_combo_conflict('timeout', *parser.combo_index.conflicts()[0][1:])
+    assert report == 'Esc (30 ms) and Tab (50 ms) overlap on layer_0, layer_1 with different timeouts'
+
+
+def test_subset_with_a_different_timeout_reports_both():
+    parser = parse({
+        'narrow': 'key-positions = <0 1>; bindings = <&kp ESC>; timeout-ms = <20>; layers = <0>;',
+        'wide': 'key-positions = <0 1 2>; bindings = <&kp TAB>;',
+    })
+    assert conflicts(parser) == [('shadows', 'narrow', 'wide', [0]), ('timeout', 'narrow', 'wide', [0])]
@@ -0,0 +1,89 @@
+import pytest
+
+from generate_readme import DeviceTree, DTProperty, DTSyntaxError, MacroExpander, BindingDecoder
+
+KEYMAP = """
+#include <behaviors.dtsi>
+#define NAV 1
+#define MASK (1 << (NAV + (1)))
+
+/ {
+    behaviors {
+        hm: homerow_mods {
+            compatible = "zmk,behavior-hold-tap";
+            tapping-term-ms = <(100 + 75)>;   // comment inside a node
+            bindings = <&kp>, <&kp>;
+        };
+    };
+    keymap {
+        compatible = "zmk,keymap";
+        base {
+            bindings = <
+                &kp LA(LC(LS(H)))   /* three nested modifier functions */
+                &kp LG(LA(LC(LS(X))))
+                &mo NAV
+            >;
+        };
+    };
+};
+"""
+
+
+def test_parse_nodes_properties_and_directives():
+    tree = DeviceTree.parse(KEYMAP)
+    root = tree.roots[0]
+    assert tree.includes == ['behaviors.dtsi']
+    assert [child.name for child in root.children] == ['behaviors', 'keymap']
+    homerow = root.children[0].children[0]
+    assert homerow.labels == ['hm']
+    assert homerow.get('compatible') == 'zmk,behavior-hold-tap'
+    assert homerow.get('tapping-term-ms') == 175
+    assert homerow.properties['bindings'].values == [('cells', '<&kp>'), ('cells', '<&kp>')]
+
+
+def test_deeply_nested_modifier_functions():
+    tree = DeviceTree.parse(KEYMAP)
+    base = tree.roots[0].children[1].children[0]
+    bindings = BindingDecoder.tokenize_bindings(base.properties['bindings'].cells)
+    assert bindings == [('kp', ('LA(LC(LS(H)))',)), ('kp', ('LG(LA(LC(LS(X))))',)), ('mo', ('NAV',))]
+
+
+def test_shift_operators_inside_parentheses():
+    tree = DeviceTree.parse(KEYMAP)
+    expander = MacroExpander.from_directives(tree.directives)
+    node = DeviceTree.parse('/ { n { mask = <MASK>; }; };').roots[0].children[0]
+    assert node.get('mask', expander) == 4
+
+
+@pytest.mark.parametrize('source', [
+    '/ { n { b = <&kp LA(H>; }; };',
+    '/ { n { b = <&kp A; }; };',
+    '/ { n { b = <&kp A)>; }; };',
+])
+def test_malformed_cells_raise_syntax_error(source):
+    with pytest.raises(DTSyntaxError):
+        DeviceTree.parse(source)
+
+
+@pytest.mark.parametrize('expression, value', [
+    ('0x10', 16),
+    ('(100 + 75)', 175),
+    ('(1 << 3 | 0x4)', 12),
+    ('(~0 & 0xff)', 255),
+    ('(-7 / 2)', -3),
+    ('(-7 % 2)', -1),
+])
+def test_integer_expressions(expression, value):
+    assert DTProperty._integer(expression) == value
+
+
+@pytest.mark.parametrize('expression', [
+    '(9**9**9)',
+    '(__import__("os"))',
+    '(1 / 0)',
+    '(1 << 4096)',
+    '((1 << 63) * (1 << 63) * 4)',
+])
+def test_integer_expressions_reject_unsafe_input(expression):
+    with pytest.raises(ValueError):
+        DTProperty._integer(expression)
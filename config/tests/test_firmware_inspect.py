@@ -0,0 +1,118 @@
+import os
+import struct
+
+import pytest
+
+from generate_readme import ZMKKeymapParser
+from firmware_inspect import (FirmwareImage, ZMKKeymapLocator, TARGETS, inspect, locate_qmk_keymap,
+                              UF2_MAGIC_START0, UF2_MAGIC_START1, UF2_MAGIC_END)
+
+CONFIG_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+KEYMAP = os.path.join(CONFIG_DIR, 'clickety_split_pepito.keymap')
+ROWS, COLS = TARGETS['voyager']['matrix']
+
+
+def uf2(payload: bytes, base: int, family: int = 0xADA52840) -> bytes:
+    """Wrap payload in 256-byte UF2 blocks starting at base."""
+    blocks = (len(payload) + 255) // 256
+    out = bytearray()
+    for number in range(blocks):
+        chunk = payload[number * 256:(number + 1) * 256]
+        out += struct.pack('<8I', UF2_MAGIC_START0, UF2_MAGIC_START1, 0x2000, base + number * 256,
+                           len(chunk), number, blocks, family)
+        out += chunk + b'\0' * (476 - len(chunk)) + struct.pack('<I', UF2_MAGIC_END)
+    return bytes(out)
+
+
+def zmk_payload(parser, base, corrupt=None):
+    """Code, the behavior device names, then a 12-byte-per-binding table of every layer."""
+    locator = ZMKKeymapLocator(parser)
+    image = bytearray(1024)
+    strings = {}
+    for layer in locator.layers:
+        for binding in layer:
+            device = locator.expected(binding)[0]
+            if device not in strings:
+                strings[device] = base + len(image)
+                image += device.encode() + b'\0'
+    image += bytes(-len(image) % 4)
+    table = base + len(image)
+    for index, layer in enumerate(locator.layers):
+        for position, binding in enumerate(layer):
+            device, param1, param2 = locator.expected(binding)
+            if (index, position) == corrupt:
+                param1 = 0x70099
+            image += struct.pack('<3I', strings[device], param1 or 0, param2 or 0)
+    return bytes(image + bytes(512)), table
+
+
+def qmk_bin(layers=3, table_offset=0x400):
+    """A raw STM32 image linked past a bootloader with a QMK keymap table."""
+    image = bytearray(b'\xff' * table_offset)
+    image[:8] = struct.pack('<2I', 0x20000400, 0x080022BD)
+    size = ROWS * COLS
+    holes = {0, 7, 42, 49}
+    for layer in range(layers):
+        for position in range(size):
+            keycode = 0 if position in holes else (0x04 + position % 40 if layer == 0 else 0x01)
+            image += struct.pack('<H', keycode)
+    return bytes(image + b'\xff' * 256)
+
+
+@pytest.fixture(scope='module')
+def parser():
+    parser = ZMKKeymapParser(KEYMAP, '')
+    parser.parse_keymap()
+    return parser
+
+
+def test_uf2_ranges_and_family(tmp_path):
+    path = tmp_path / 'left.uf2'
+    path.write_bytes(uf2(bytes(1000), 0x27000))
+    with FirmwareImage(str(path)) as image:
+        assert image.format == 'uf2'
+        assert image.target is TARGETS['nrf52840']
+        assert (image.start, image.size, image.blocks) == (0x27000, 1000, 4)
+        assert image.free() == TARGETS['nrf52840']['flash_end'] - 0x27000 - 1000
+
+
+def test_uf2_unknown_family_has_no_target(tmp_path):
+    path = tmp_path / 'voyager.uf2'
+    path.write_bytes(uf2(bytes(300), 0x1000, family=0x12345678))
+    with FirmwareImage(str(path)) as image:
+        assert image.target is None
+
+
+def test_zmk_locator_finds_table_and_mismatch(tmp_path, parser):
+    payload, table = zmk_payload(parser, 0x27000, corrupt=(1, 3))
+    path = tmp_path / 'firmware.uf2'
+    path.write_bytes(uf2(payload, 0x27000))
+    keymap = inspect(str(path), parser)['keymap']
+    assert keymap['table']['address'] == table
+    assert keymap['table']['record_size'] == 12
+    layers = keymap['table']['layers']
+    total = sum(layer['bindings'] for layer in layers)
+    assert sum(layer['matched'] for layer in layers) == total - 1
+    assert [mismatch['position'] for mismatch in layers[1]['mismatches']] == [3]
+
+
+def test_qmk_image_detected_from_content_not_name(tmp_path):
+    path = tmp_path / 'renamed-firmware.bin'
+    path.write_bytes(qmk_bin())
+    with FirmwareImage(str(path)) as image:
+        assert image.target is TARGETS['voyager']
+        keymap = locate_qmk_keymap(image, ROWS, COLS)
+    table = keymap['table']
+    assert table['address'] == TARGETS['voyager']['load'] + 0x400
+    assert len(table['layers']) == 3
+    assert table['keys'] == ROWS * COLS - 4
+
+
+def test_stm32_image_without_keymap_is_generic(tmp_path):
+    path = tmp_path / 'voyager.bin'
+    image = bytearray(b'\xff' * 2048)
+    image[:8] = struct.pack('<2I', 0x20000400, 0x080001C1)
+    path.write_bytes(bytes(image))
+    with FirmwareImage(str(path)) as firmware:
+        assert firmware.target is TARGETS['stm32f303']
+        assert firmware.start == TARGETS['stm32f303']['load']
@@ -0,0 +1,85 @@
+import os
+
+import pytest
+
+from generate_readme import ZMKKeymapParser
+
+CONFIG_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+KEYMAP = os.path.join(CONFIG_DIR, 'clickety_split_pepito.keymap')
+CONF = os.path.join(CONFIG_DIR, 'clickety_split_pepito.conf')
+
+with open(KEYMAP, 'r') as f:
+    SOURCE = f.read()
+
+# (old text, new text, what update_keymap should rebuild)
+EDITS = {
+    'layer binding': ('&kp TAB    &kp Q', '&kp TAB    &kp Z', 'default_osx_layer'),
+    'combo': ('key-positions = <2 3>;', 'key-positions = <2 3 4>;', 'combos'),
+    'combo added': ('        combo_osx_lpar {',
+                    '        combo_extra {\n            key-positions = <5 6>;\n'
+                    '            bindings = <&kp ESC>;\n        };\n\n        combo_osx_lpar {', 'combos'),
+    'behavior timing': ('tapping-term-ms = <175>;', 'tapping-term-ms = <200>;', 'behaviors'),
+    'behavior becomes a layer-tap': ('bindings = <&kp>, <&kp>;', 'bindings = <&mo>, <&kp>;', 'behaviors'),
+    'comment in a layer': ('&kp TAB    &kp Q', '&kp TAB /* tab */ &kp Q', 'default_osx_layer'),
+    'macro': ('#define LOCK_X  LC(LG(Q))', '#define LOCK_X  LC(LG(W))', 'full'),
+    'combo in a false #if': ('        combo_osx_lpar {',
+                             '#if QX_L > 1\n        combo_disabled {\n            key-positions = <7 8>;\n'
+                             '            bindings = <&kp ESC>;\n        };\n#endif\n\n        combo_osx_lpar {', 'full'),
+}
+
+
+def parse(source, previous=None):
+    parser = previous or ZMKKeymapParser(KEYMAP, CONF)
+    rebuilt = parser.update_keymap(source) if previous else parser.parse_keymap(source)
+    parser.parse_config()
+    return parser, rebuilt
+
+
+def snapshot(parser):
+    """Everything the outputs are rendered from, as plain data."""
+    return {
+        'layers': {name: (layer.label, [str(binding) for binding in layer]) for name, layer in parser.layers.items()},
+        'combos': parser.combos,
+        'behaviors': parser.behaviors,
+        'readme': parser.render_readme(),
+    }
+
+
+@pytest.mark.parametrize('name', EDITS)
+def test_incremental_update_matches_full_parse(name):
+    old, new, expected = EDITS[name]
+    assert SOURCE.count(old) == 1
+    edited = SOURCE.replace(old, new)
+    incremental, _ = parse(SOURCE)
+    incremental.render_readme()   # warm the resolver and label caches
+    _, rebuilt = parse(edited, incremental)
+    full, _ = parse(edited)
+    assert rebuilt == expected
+    assert snapshot(incremental) == snapshot(full)
+
+
+@pytest.mark.parametrize('name', EDITS)
+def test_patched_tree_offsets_match_a_fresh_parse(name):
+    old, new, _ = EDITS[name]
+    edited = SOURCE.replace(old, new)
+    incremental, _ = parse(SOURCE)
+    parse(edited, incremental)
+    full, _ = parse(edited)
+    patched = [(node.name, edited[node.start:node.end]) for node in incremental.tree.walk()]
+    fresh = [(node.name, edited[node.start:node.end]) for node in full.tree.walk()]
+    assert patched == fresh
+
+
+def test_successive_edits_stay_consistent():
+    parser, _ = parse(SOURCE)
+    source = SOURCE
+    for old, new, _ in EDITS.values():
+        source = source.replace(old, new)
+        parse(source, parser)
+    full, _ = parse(source)
+    assert snapshot(parser) == snapshot(full)
+
+
+def test_unchanged_source_is_not_rebuilt():
+    parser, _ = parse(SOURCE)
+    assert parse(SOURCE, parser)[1] == 'unchanged'
@@ -0,0 +1,83 @@
+import pytest
+
+from generate_readme import (KconfigTable, ReadmeCache, ZMKKeymapParser, CONFIG_FEATURES, config_features,
+                             register_feature)
+
+
+def test_typed_values():
+    table = KconfigTable()
+    table.update('\n'.join([
+        'CONFIG_ZMK_SLEEP=y',
+        'CONFIG_ZMK_USB=n',
+        'CONFIG_ZMK_DISPLAY=m',
+        'CONFIG_ZMK_IDLE_TIMEOUT=30000  # 30 s',
+        'CONFIG_HEAP=0x1000',
+        'CONFIG_ZMK_KEYBOARD_NAME="Pepito \\"Macro\\""',
+        '# CONFIG_ZMK_RGB_UNDERGLOW is not set',
+        '# a comment',
+        '   CONFIG_INDENTED=y',
+    ]))
+    assert table.get('ZMK_SLEEP') is True and table.type('ZMK_SLEEP') == 'bool'
+    assert table.get('CONFIG_ZMK_USB') is False
+    assert table.get('ZMK_DISPLAY') == 'm' and table.enabled('ZMK_DISPLAY')
+    assert table.get('ZMK_IDLE_TIMEOUT') == 30000 and table.type('ZMK_IDLE_TIMEOUT') == 'int'
+    assert table.get('HEAP') == 0x1000 and table.type('HEAP') == 'hex'
+    assert table.get('ZMK_KEYBOARD_NAME') == 'Pepito "Macro"'
+    assert table.get('ZMK_RGB_UNDERGLOW') is False and 'ZMK_RGB_UNDERGLOW' in table
+    assert table.enabled('INDENTED')
+    assert 'MISSING' not in table and table.get('MISSING', 'default') == 'default'
+
+
+@pytest.mark.parametrize('fragments, value, source', [
+    (['CONFIG_A=y', 'CONFIG_A=n'], False, 'second'),
+    (['CONFIG_A=y', '# CONFIG_A is not set'], False, 'second'),
+    (['# CONFIG_A is not set', 'CONFIG_A=y'], True, 'second'),
+    (['CONFIG_A=1', 'CONFIG_B=2'], 1, 'first'),
+    (['CONFIG_A=y\nCONFIG_A=n', ''], False, 'first'),
+])
+def test_later_fragments_override_earlier_ones(fragments, value, source):
+    table = KconfigTable()
+    for fragment, name in zip(fragments, ('first', 'second')):
+        table.update(fragment, name)
+    assert table.get('A') == value
+    assert table.sources['A'] == source
+
+
+def test_parse_config_merges_conf_then_kconfig_files(tmp_path):
+    conf = tmp_path / 'shield.conf'
+    conf.write_text('CONFIG_ZMK_SLEEP=y\nCONFIG_ZMK_USB=y\n')
+    board = tmp_path / 'build.config'
+    board.write_text('# CONFIG_ZMK_SLEEP is not set\nCONFIG_BT_CTLR_TX_PWR_PLUS_8=y\n')
+    cache = ReadmeCache(str(tmp_path / 'cache'))
+    for _ in range(2):   # the second pass is served from the cache
+        parser = ZMKKeymapParser(str(tmp_path / 'shield.keymap'), str(conf), cache=cache, kconfig_files=[str(board)])
+        parser.parse_config()
+        assert parser.kconfig.get('ZMK_SLEEP') is False
+        assert parser.kconfig.sources['ZMK_SLEEP'] == str(board)
+        assert parser.kconfig.get('ZMK_USB') is True
+
+
+def test_cached_table_keeps_its_own_sources(tmp_path):
+    cache = ReadmeCache(str(tmp_path / 'cache'))
+    for name in ('left.conf', 'right.conf'):
+        conf = tmp_path / name
+        conf.write_text('CONFIG_ZMK_SLEEP=y\n')
+        parser = ZMKKeymapParser(str(tmp_path / 'x.keymap'), str(conf), cache=cache)
+        parser.parse_config()
+        assert parser.kconfig.sources['ZMK_SLEEP'] == str(conf)
+
+
+def test_registered_features_report_only_symbols_that_are_set():
+    table = KconfigTable()
+    table.update('CONFIG_ZMK_SLEEP=y\n# CONFIG_ZMK_USB is not set\n')
+    added = [register_feature('Test sleep', 'ZMK_SLEEP'), register_feature('Test USB', 'CONFIG_ZMK_USB'),
+             register_feature('Test display', 'ZMK_DISPLAY'),
+             register_feature('Test custom', check=lambda table: table.get('ZMK_SLEEP') and 'ZMK_USB' in table)]
+    try:
+        assert config_features(table, added) == {'Test sleep': True, 'Test USB': False, 'Test custom': True}
+        assert all(feature in CONFIG_FEATURES for feature in added)
+    finally:
+        for feature in added:
+            CONFIG_FEATURES.remove(feature)
+    with pytest.raises(ValueError):
+        register_feature('Nothing to check')
@@ -0,0 +1,90 @@
+from keymap_diff import diff_keymaps, format_text, main, parse
+
+KEYMAP = """\
+#include <behaviors.dtsi>
+#include <dt-bindings/zmk/keys.h>
+
+/ {
+    behaviors {
+        hm: homerow_mods {
+            compatible = "zmk,behavior-hold-tap";
+            #binding-cells = <2>;
+            tapping-term-ms = <%(term)d>;
+            bindings = <&kp>, <&kp>;
+        };
+    };
+    combos {
+        compatible = "zmk,combos";
+        combo_esc {
+            timeout-ms = <50>;
+            key-positions = <0 1>;
+            bindings = <&kp ESC>;
+        };
+    };
+    keymap {
+        compatible = "zmk,keymap";
+%(layers)s
+    };
+};
+"""
+
+BASE = """\
+        default_layer {
+            bindings = <%s>;
+        };
+"""
+NAV = """\
+        nav_layer {
+            label = "NAV";
+            bindings = <&trans &trans &kp LEFT &kp RIGHT>;
+        };
+"""
+
+
+def keymap(tmp_path, name, base='&hm LSHIFT A &kp B &kp C &mo 1', layers=None, term=175):
+    path = tmp_path / name
+    path.write_text(KEYMAP % {'term': term, 'layers': layers if layers is not None else BASE % base + NAV})
+    return parse(str(path))
+
+
+def test_identical_keymaps_have_no_changes(tmp_path):
+    diff = diff_keymaps(keymap(tmp_path, 'old.keymap'), keymap(tmp_path, 'new.keymap'))
+    assert diff == {'layers': [], 'combos': [], 'behaviors': []}
+    assert format_text(diff) == 'no changes'
+
+
+def test_changed_key_is_reported_despite_shifted_symbol_ids(tmp_path):
+    # TAB is new on the right-hand side and gets a symbol id the old table never had
+    old = keymap(tmp_path, 'old.keymap')
+    new = keymap(tmp_path, 'new.keymap', base='&hm LSHIFT A &kp TAB &kp C &mo 1')
+    diff = diff_keymaps(old, new)
+    assert [layer['layer'] for layer in diff['layers']] == ['default_layer']
+    keys = diff['layers'][0]['keys']
+    assert [key['position'] for key in keys] == [1]
+    assert (keys[0]['old']['binding'], keys[0]['new']['binding']) == ('&kp B', '&kp TAB')
+
+
+def test_parameter_count_change_is_a_difference(tmp_path):
+    old = keymap(tmp_path, 'old.keymap')
+    new = keymap(tmp_path, 'new.keymap', base='&hm LSHIFT A &kp B &kp C &trans')
+    keys = diff_keymaps(old, new)['layers'][0]['keys']
+    assert [key['position'] for key in keys] == [3]
+
+
+def test_layer_moves_and_behavior_changes(tmp_path):
+    old = keymap(tmp_path, 'old.keymap')
+    new = keymap(tmp_path, 'new.keymap', layers=NAV + BASE % '&hm LSHIFT A &kp B &kp C &mo 1', term=200)
+    diff = diff_keymaps(old, new)
+    moves = {layer['layer']: layer.get('index_change') for layer in diff['layers']}
+    assert moves == {'nav_layer': [1, 0], 'default_layer': [0, 1]}
+    assert diff['behaviors'] == [{'behavior': 'hm', 'status': 'changed',
+                                  'changes': {'tapping-term-ms': [175, 200]}}]
+
+
+def test_exit_code(tmp_path, capsys):
+    keymap(tmp_path, 'old.keymap')
+    keymap(tmp_path, 'new.keymap', base='&hm LSHIFT A &kp TAB &kp C &mo 1')
+    old, new = str(tmp_path / 'old.keymap'), str(tmp_path / 'new.keymap')
+    assert main([old, old, '--no-cache', '--exit-code']) == 0
+    assert main([old, new, '--no-cache', '--exit-code']) == 1
+    assert '&kp B' in capsys.readouterr().out
@@ -0,0 +1,73 @@
+from keymap_lookup import ReverseIndex, describe, open_index, source_digest, split_modifiers
+
+KEYMAP = """\
+#include <behaviors.dtsi>
+#include <dt-bindings/zmk/keys.h>
+
+/ {
+    combos {
+        compatible = "zmk,combos";
+        combo_esc {
+            timeout-ms = <50>;
+            key-positions = <0 1>;
+            bindings = <&kp ESC>;
+        };
+    };
+    keymap {
+        compatible = "zmk,keymap";
+        base_layer {
+            bindings = <&kp A &mt LCTRL B &kp LSHFT &lt 1 SPACE>;
+        };
+        num_layer {
+            label = "NUM";
+            bindings = <&trans &kp N1 &kp LA(LC(H)) &trans>;
+        };
+    };
+};
+"""
+
+
+def build(tmp_path, source=KEYMAP):
+    keymap = tmp_path / 'test.keymap'
+    keymap.write_text(source)
+    return str(keymap)
+
+
+def test_split_modifiers():
+    assert split_modifiers('LA(LC(H))') == (['LALT', 'LCTRL'], 'H')
+    assert split_modifiers('LCTRL') == ([], 'LCTRL')
+
+
+def test_lookup_finds_keys_layers_shift_and_combos(tmp_path):
+    index = open_index(build(tmp_path), None)
+
+    # "A" is both the keycode and the shifted character
+    ways = [(way['positions'], way['shift'], way['modifiers']) for way in index.lookup('A')]
+    assert ways == [([0], None, []), ([0], 2, ['LSHFT'])]
+    [one] = index.lookup('1')
+    assert (one['layer'], one['positions']) == ('num_layer', [1])
+    assert [step['position'] for step in one['path']] == [3]
+    assert 'hold pos 3 (&lt 1 SPACE)' in describe(one)
+
+    [hold] = index.lookup('LCTRL')
+    assert (hold['role'], hold['positions']) == ('hold', [1])
+    [chord] = index.lookup('la(lc(h))')
+    assert 'sends LALT+LCTRL' in describe(chord)
+    # A combo without a layers property is active on every layer
+    combos = [(way['combo'], way['layer'], way['positions']) for way in index.lookup('esc')]
+    assert combos == [('esc', 'base_layer', [0, 1]), ('esc', 'num_layer', [0, 1])]
+    assert [way['role'] for way in index.lookup('nav')] == ['hold']
+    assert index.lookup('F13') == []
+
+
+def test_saved_index_is_reused_until_the_keymap_changes(tmp_path):
+    keymap = build(tmp_path)
+    index_file = str(tmp_path / 'cache' / 'index.json')
+    built = open_index(keymap, index_file)
+    loaded = ReverseIndex.load(index_file, source_digest(keymap))
+    assert (loaded.ways, loaded.index) == (built.ways, built.index)
+
+    build(tmp_path, KEYMAP.replace('&kp N1', '&kp N2'))
+    assert ReverseIndex.load(index_file, source_digest(keymap)) is None
+    rebuilt = open_index(keymap, index_file)
+    assert rebuilt.lookup('2') and not rebuilt.lookup('1')
@@ -0,0 +1,56 @@
+import pytest
+
+from generate_readme import LabelEngine, KeyboardLayout, center_cells, display_width
+
+
+@pytest.mark.parametrize('text, width', [
+    ('TAB', 3),
+    ('⇥⎋⌫', 3),          # narrow symbols
+    ('🔊', 2),            # wide emoji
+    ('é', 1),       # combining accent
+    ('', 0),
+])
+def test_display_width(text, width):
+    assert display_width(text) == width
+
+
+@pytest.mark.parametrize('label, fitted', [
+    ('LT(NAV,⏎)', 'N:⏎'),
+    ('MO(FIRMWARE)', 'M:F'),
+    ('CT+C_BRI_DN', 'CT+C_'),
+    ('BTCLR', 'BTCLR'),
+    ('C_VOL_UP', 'C_VOL'),
+    ('🔊🔊🔊', '🔊🔊'),
+    ('éééééé', 'é' * 5),
+])
+def test_fit_default_rules(label, fitted):
+    assert LabelEngine().fit(label, 5) == fitted
+
+
+def test_user_rules_take_precedence_and_clear_the_memo():
+    engine = LabelEngine()
+    assert engine.fit('MACRO_COPY', 5) == 'MACRO'
+    engine.add_rule(r'MACRO_(?P<name>\w+)', 'M:{name}')
+    assert engine.fit('MACRO_COPY', 5) == 'M:COP'
+    assert engine.fingerprint() != LabelEngine().fingerprint()
+
+
+def test_fit_is_memoized_per_label_and_width():
+    engine = LabelEngine()
+    for _ in range(3):
+        engine.fit('LT(NAV,⏎)', 5)
+        engine.fit('LT(NAV,⏎)', 3)
+    assert engine.fit.cache_info().misses == 2
+
+
+def test_center_cells_matches_format_for_narrow_text():
+    for text in ('', 'A', 'AB', 'ABCD', 'ABCDE'):
+        assert center_cells(text, 5) == format(text, '^5')
+    assert center_cells('🔊', 5) == ' 🔊  '
+
+
+def test_layout_pads_by_display_width():
+    layout = KeyboardLayout('row', [[{'keys': [0, 1]}]], cell_width=5)
+    lines = layout.render(['🔊', 'A']).splitlines()
+    assert lines[1] == '|  🔊   |   A   |'
+    assert len({display_width(line) for line in lines}) == 1
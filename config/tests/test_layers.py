@@ -0,0 +1,78 @@
+import warnings
+
+import pytest
+
+from generate_readme import ZMKKeymapParser, LayerResolver
+
+
+def parse(layers):
+    """Parse a keymap whose layers are given as lists of bindings."""
+    nodes = ' '.join(f'layer_{index} {{ bindings = <{" ".join(bindings)}>; }};'
+                     for index, bindings in enumerate(layers))
+    parser = ZMKKeymapParser('test.keymap', '')
+    parser.parse_keymap('/ { keymap { compatible = "zmk,keymap"; ' + nodes + ' }; };')
+    return parser
+
+
+def test_transparent_keys_fall_through_to_the_layer_below():
+    parser = parse([
+        ['&kp A', '&kp B', '&mo 1', '&mo 2'],
+        ['&kp N1', '&trans', '&trans', '&trans'],
+        ['&trans', '&kp N2', '&trans', '&trans'],
+    ])
+    resolver = parser.layer_resolver()
+    source, binding = resolver.resolve(1, 1)
+    assert (source, str(binding)) == (0, '&kp B')
+    assert resolver.unreachable_layers() == []
+    assert resolver.dead_keys() == []
+
+
+def test_layer_tables_show_fall_through_labels():
+    parser = parse([
+        ['&kp A', '&kp B', '&mo 1', '&kp C'],
+        ['&kp N1', '&trans', '&trans', '&none'],
+    ])
+    labels = parser.table_labels('layer_1', parser.layers['layer_1'])
+    assert labels[:2] == ['1', '▽B']
+    assert labels[2].startswith('▽M:')
+    assert parser.table_labels('layer_0', parser.layers['layer_0'])[0] == 'A'
+
+
+def test_unreachable_layers_and_dead_keys():
+    parser = parse([
+        ['&kp A', '&mo 1', '&kp B'],
+        ['&kp N1', '&kp N2', '&trans'],   # position 1 is held to get here
+        ['&kp X', '&kp Y', '&kp Z'],      # nothing activates layer 2
+    ])
+    resolver = parser.layer_resolver()
+    assert resolver.unreachable_layers() == [2]
+    assert resolver.dead_keys() == [(1, 1)]
+
+
+def test_states_are_keyed_on_the_active_layer_mask():
+    # Six momentary keys on the base layer, visible through every layer
+    size = 6
+    layers = [[f'&mo {layer + 1}' for layer in range(size)]]
+    layers += [['&trans'] * size for _ in range(size)]
+    resolver = parse(layers).layer_resolver()
+    assert len(resolver.states) == 2 ** size
+    assert not resolver.truncated
+
+
+def test_truncated_search_warns_and_reports_nothing():
+    parser = parse([['&tog 1', '&tog 2', '&tog 3'], ['&trans'] * 3, ['&trans'] * 3, ['&trans'] * 3])
+    with pytest.warns(RuntimeWarning, match='more than 4 combinations'):
+        resolver = LayerResolver(list(parser.layers.values()), parser.layer_action, max_states=4)
+    assert resolver.truncated
+    assert resolver.unreachable_layers() == []
+    assert resolver.dead_keys() == []
+    assert str(resolver.resolve(3, 0)[1]) == '&tog 1'
+
+
+def test_resolver_is_reused_until_layers_change():
+    parser = parse([['&kp A', '&mo 1'], ['&trans', '&trans']])
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        assert parser.layer_resolver() is parser.layer_resolver()
+    parser.update_keymap(parser.tree.source.replace('&kp A', '&kp B'))
+    assert str(parser.layer_resolver().resolve(1, 0)[1]) == '&kp B'
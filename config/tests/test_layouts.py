@@ -0,0 +1,79 @@
+import os
+
+import pytest
+
+from generate_readme import KeyboardLayout, ZMKKeymapParser
+
+CONFIG_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load(name):
+    return KeyboardLayout.from_json(os.path.join(CONFIG_DIR, 'layouts', name + '.json'))
+
+
+def cell(lines, layout, key):
+    """Text of a key's cell, located through key_grid rather than the template."""
+    x, row = layout.key_grid()[key]
+    header = 2 if any('title' in segment for segment in layout.rows[0]) else 0
+    return lines[header + 1 + 2 * row][x + 1:x + layout.cell_width + 3]
+
+
+@pytest.mark.parametrize('name, key_count', [('corne', 42), ('voyager', 52), ('60_ansi', 61)])
+def test_every_key_lands_in_its_own_cell(name, key_count):
+    layout = load(name)
+    assert layout.key_count == key_count
+    assert sorted(layout.order) == list(range(key_count))
+    lines = layout.render([str(key) for key in range(key_count)]).splitlines()
+    for key in range(key_count):
+        assert cell(lines, layout, key).strip() == str(key)
+
+
+def test_corne_layer_table():
+    bindings = ' '.join(['&kp Q'] * 36 + ['&kp ESC', '&kp SPACE', '&mo 1', '&kp TAB', '&kp BSPC'])
+    parser = ZMKKeymapParser('test.keymap', '', layout=load('corne'))
+    parser.parse_keymap('/ { keymap { compatible = "zmk,keymap"; base { bindings = <' + bindings + '>; }; '
+                        'nav { bindings = <&trans>; }; }; };')
+    table = parser.generate_layer_table('base', parser.layers['base']).splitlines()
+    assert table[0] == table[-1] == '```'
+    assert table[2] == ('|                   LEFT HALF                   |    '
+                        '|                   RIGHT HALF                  |')
+    assert table[4] == '|   Q   ' * 6 + '|    ' + '|   Q   ' * 6 + '|'
+    # 41 bindings for 42 keys: the last thumb key is filled
+    assert table[-3] == ' ' * 24 + '|   ⎋   |   ␣   |  M:N  |    |   ⇥   |   ⌫   |   ✗   |'
+
+
+def test_layout_from_matrix_transform():
+    parser = ZMKKeymapParser('test.keymap', '')
+    parser.parse_keymap('''
+        #define TOP(col) RC(0, col)
+        / {
+            kscan_transform: transform {
+                compatible = "zmk,matrix-transform";
+                columns = <4>;
+                rows = <2>;
+                map = <TOP(0) TOP(1) TOP(2) TOP(3)
+                               RC(1,1) RC(1,2)>;
+            };
+            keymap {
+                compatible = "zmk,keymap";
+                base { bindings = <&kp Q &kp W &kp E &kp R &kp SPACE &kp ENTER>; };
+            };
+        };''')
+    layout = parser.matrix_layout
+    assert layout.name == 'transform'
+    assert layout.rows == [[{'indent': 0, 'keys': [0, 1]}, {'indent': 4, 'keys': [2, 3]}],
+                           [{'indent': 8, 'keys': [4]}, {'indent': 4, 'keys': [5]}]]
+    assert parser.generate_layer_table('base', parser.layers['base']).splitlines()[1:-1] == [
+        '+-------+-------+    +-------+-------+',
+        '|   Q   |   W   |    |   E   |   R   |',
+        '+-------+-------+    +-------+-------+',
+        '        |   ␣   |    |   ⏎   |',
+        '        +-------+    +-------+',
+    ]
+
+
+def test_matrix_transform_without_rc_entries_is_ignored():
+    parser = ZMKKeymapParser('test.keymap', '')
+    parser.parse_keymap('/ { transform { compatible = "zmk,matrix-transform"; map = <0 1 2>; }; '
+                        'keymap { compatible = "zmk,keymap"; base { bindings = <&kp A>; }; }; };')
+    assert parser.matrix_layout is None
@@ -0,0 +1,110 @@
+import pytest
+
+from generate_readme import DeviceTree, DTSyntaxError, MacroExpander
+
+
+def expander(source):
+    return MacroExpander.from_source(source)
+
+
+def test_object_like_macros_expand_recursively():
+    macros = expander("#define NAV 1\n#define LAYER NAV  // comment\n#define EMPTY\n")
+    assert macros.expand("&mo LAYER EMPTY") == "&mo 1 "
+    # Only whole words expand, and never inside strings
+    assert macros.expand('NAVIGATE "NAV" _NAV') == 'NAVIGATE "NAV" _NAV'
+
+
+def test_function_like_macros_expand_arguments_first():
+    macros = expander("#define K 5\n"
+                      "#define HRM(mod, key) &hm mod key\n"
+                      "#define PAIR(a, b) HRM(a, b) HRM(b, a)\n"
+                      "#define F (x)\n")
+    assert macros.expand("HRM(LCTRL, K)") == "&hm LCTRL 5"
+    assert macros.expand("PAIR(LS(A), B)") == "&hm LS(A) B &hm B LS(A)"
+    # A function-like macro name without a call is left alone
+    assert macros.expand("HRM + F") == "HRM + (x)"
+
+
+def test_stringify_and_token_pasting():
+    macros = expander('#define STR(x) #x\n'
+                      '#define CAT(a, b) a ## b\n'
+                      '#define ONE 1\n'
+                      '#define BT(n) BT_SEL ## n\n')
+    assert macros.expand('STR(ONE "q")') == '"ONE \\"q\\""'
+    # Operands of ## are pasted unexpanded, and the result is rescanned
+    assert macros.expand("CAT(ON, E) CAT(ONE, 2)") == "1 ONE2"
+    assert macros.expand("BT(2)") == "BT_SEL2"
+
+
+def test_variadic_arguments():
+    macros = expander("#define LIST(first, ...) <first __VA_ARGS__>\n#define ALL(...) [__VA_ARGS__]\n")
+    assert macros.expand("LIST(1, 2, 3)") == "<1 2, 3>"
+    assert macros.expand("ALL()") == "[]"
+
+
+def test_self_reference_and_cycles_stop():
+    macros = expander("#define SELF SELF + 1\n#define A B\n#define B A\n#define F(x) F(x + 1)\n")
+    assert macros.expand("SELF") == "SELF + 1"
+    assert macros.expand("A") == "A"
+    assert macros.expand("B") == "B"
+    assert macros.expand("F(0)") == "F(0 + 1)"
+    assert {'SELF', 'A', 'B', 'F'} <= macros.cycles
+
+
+def test_undef_and_redefinition():
+    macros = expander("#define X 1\n#define G(a) a\n#undef X\n#define G 2\n")
+    assert macros.expand("X G(3)") == "X 2(3)"
+    macros.apply_directive("#define X \\\n    4")
+    assert macros.expand("X") == "4"
+
+
+def test_conditional_groups():
+    macros = expander("#define HAS_NAV\n"
+                      "#define LEVEL 2\n"
+                      "#ifdef HAS_NAV\n#define NAV 1\n#else\n#define NAV 0\n#endif\n"
+                      "#ifndef HAS_NAV\n#define MISSING 1\n#endif\n"
+                      "#if LEVEL > 2\n#define MODE high\n"
+                      "#elif defined(HAS_NAV) && LEVEL == 2 && !defined(MISSING)\n#define MODE mid\n"
+                      "#else\n#define MODE low\n#endif\n"
+                      "#if 0\n#if this is not evaluated (\n#define NAV 9\n#endif\n#endif\n"
+                      "#if UNKNOWN_SYMBOL || (1 << 3) != 8\n#define MODE bad\n#endif\n")
+    assert macros.expand("NAV MISSING MODE") == "1 MISSING mid"
+    assert macros.active and macros.depth == 0
+
+
+@pytest.mark.parametrize('source', ["#endif\n", "#else\n", "#define A 1\n#elif A\n"])
+def test_unbalanced_conditionals_raise(source):
+    with pytest.raises(ValueError, match='without #if'):
+        expander(source)
+
+
+def test_unevaluable_if_raises():
+    with pytest.raises(ValueError, match='cannot evaluate #if'):
+        expander("#if 1 +\n#endif\n")
+
+
+def test_devicetree_skips_inactive_groups():
+    tree = DeviceTree.parse("""
+#define SPLIT
+/ {
+#ifdef SPLIT
+    split { side = <1>; };
+#else
+    unibody { broken = <; };
+    #include "unused.dtsi"
+#endif
+#if !defined(SPLIT)
+    also_skipped { };
+#endif
+};
+""")
+    assert [node.name for node in tree.roots[0].children] == ['split']
+    assert tree.includes == []
+    assert MacroExpander.from_directives(tree.directives).is_defined('SPLIT')
+
+
+def test_devicetree_reports_unterminated_conditionals():
+    with pytest.raises(DTSyntaxError, match='unterminated #if'):
+        DeviceTree.parse("#ifdef X\n/ { };\n")
+    with pytest.raises(DTSyntaxError, match=':2:1: #endif without #if'):
+        DeviceTree.parse("/ { };\n#endif\n")
@@ -0,0 +1,82 @@
+import json
+import tracemalloc
+
+import pytest
+
+from generate_readme import Profiler, main
+
+COUNTERS = {'macro_substitutions', 'bindings_decoded', 'decoder_cache_hits', 'disk_cache_hits',
+            'disk_cache_misses', 'layers', 'keys', 'combos'}
+
+
+@pytest.fixture(autouse=True)
+def stop_tracing():
+    """The profiler starts tracemalloc; don't leave it running for the rest of the suite."""
+    tracing = tracemalloc.is_tracing()
+    yield
+    if not tracing:
+        tracemalloc.stop()
+
+
+def profile(tmp_path, trace_format):
+    path = tmp_path / f'profile-{trace_format}.json'
+    assert main(['--no-cache', '--output-dir', str(tmp_path), '--profile', str(path),
+                 '--profile-format', trace_format]) == 0
+    return json.loads(path.read_text())
+
+
+def encloses(outer, inner):
+    return outer[0] <= inner[0] and inner[0] + inner[1] <= outer[0] + outer[1]
+
+
+def test_nested_phases_and_counters():
+    profiler = Profiler(trace_allocations=False)
+    with profiler.phase('outer'):
+        for index in range(2):
+            with profiler.phase('inner', index=index):
+                profiler.count('items', 3)
+    profiler.set_counter('layers', 5)
+    data = profiler.to_json()
+    assert [(phase['name'], phase['depth'], phase['args']) for phase in data['phases']] == [
+        ('outer', 0, {}), ('inner', 1, {'index': 0}), ('inner', 1, {'index': 1})]
+    assert data['totals']['inner']['calls'] == 2
+    assert data['counters'] == {'items': 6, 'layers': 5}
+
+
+def test_disabled_profiler_records_nothing():
+    profiler = Profiler(enabled=False)
+    with profiler.phase('outer'):
+        profiler.count('items')
+    assert profiler.to_json()['phases'] == [] and profiler.counters == {}
+
+
+def test_profile_json(tmp_path):
+    data = profile(tmp_path, 'json')
+    phases = data['phases']
+    assert phases[0]['name'] == 'generate' and phases[0]['depth'] == 0
+    assert max(phase['depth'] for phase in phases) >= 2
+    # Every nested phase lies within the nearest shallower phase started before it
+    for index, phase in enumerate(phases[1:], 1):
+        parent = next(other for other in reversed(phases[:index]) if other['depth'] == phase['depth'] - 1)
+        assert encloses((parent['start_ms'], parent['duration_ms']), (phase['start_ms'], phase['duration_ms']))
+        assert phase['peak_bytes'] <= parent['peak_bytes']
+    layers = [phase for phase in phases if phase['name'] == 'render layer']
+    assert [phase['depth'] for phase in layers] == [2] * data['counters']['layers']
+    assert data['totals']['render layer']['calls'] == data['counters']['layers']
+    assert set(data['counters']) == COUNTERS
+    assert data['counters']['keys'] > 0 and data['counters']['combos'] > 0
+
+
+def test_profile_chrome_trace(tmp_path):
+    data = profile(tmp_path, 'chrome')
+    assert data['displayTimeUnit'] == 'ms'
+    spans = [event for event in data['traceEvents'] if event['ph'] == 'X']
+    counters = [event for event in data['traceEvents'] if event['ph'] == 'C']
+    assert spans[0]['name'] == 'generate'
+    assert all(encloses((spans[0]['ts'], spans[0]['dur']), (event['ts'], event['dur'])) for event in spans)
+    render = next(event for event in spans if event['name'] == 'render')
+    nested = [event for event in spans if event['name'] == 'render layer']
+    assert nested and all(encloses((render['ts'], render['dur']), (event['ts'], event['dur'])) for event in nested)
+    assert {'layer', 'allocated_bytes', 'peak_bytes'} <= set(nested[0]['args'])
+    assert len(counters) == 1 and set(counters[0]['args']) == COUNTERS
+    assert counters[0]['ts'] >= max(event['ts'] + event['dur'] for event in spans)
@@ -0,0 +1,81 @@
+import json
+import os
+import re
+import xml.etree.ElementTree as ElementTree
+from html.parser import HTMLParser
+
+import pytest
+
+from generate_readme import main
+
+CONFIG_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SVG = '{http://www.w3.org/2000/svg}'
+
+
+class PageParser(HTMLParser):
+    """Collects the <h2> headings and <title>s of the HTML page."""
+
+    def __init__(self):
+        super().__init__()
+        self.headings, self.titles = [], []
+        self.tag = None
+
+    def handle_starttag(self, tag, attrs):
+        self.tag = tag
+
+    def handle_endtag(self, tag):
+        self.tag = None
+
+    def handle_data(self, data):
+        if self.tag == 'h2':
+            self.headings.append(data)
+        elif self.tag == 'title':
+            self.titles.append(data)
+
+
+@pytest.fixture(scope='module')
+def outputs(tmp_path_factory):
+    directory = tmp_path_factory.mktemp('outputs')
+    assert main(['--no-cache', '--format', 'md,svg,html,json', '--output-dir', str(directory)]) == 0
+    stem = 'clickety_split_pepito'
+    return {output_format: (directory / name).read_bytes() for output_format, name in (
+        ('md', 'readme.md'), ('svg', stem + '.svg'), ('html', stem + '.html'), ('json', stem + '.json'))}
+
+
+def test_markdown_matches_the_committed_readme(outputs):
+    with open(os.path.join(CONFIG_DIR, 'readme.md'), 'rb') as f:
+        assert outputs['md'] == f.read()
+
+
+def test_json_round_trips(outputs):
+    text = outputs['json'].decode('utf-8')
+    model = json.loads(text)
+    assert json.dumps(model, indent=2, ensure_ascii=False) + '\n' == text
+    assert model['layers'] and model['combos']
+
+
+def test_every_format_shows_the_same_parse(outputs):
+    model = json.loads(outputs['json'])
+    headings = [layer['heading'] for layer in model['layers']]
+    positions = {key for row in model['layout']['rows'] for segment in row for key in segment['keys']
+                 if key is not None}
+    bindings = [[key['binding'] for key in layer['keys'] if key['position'] in positions]
+                for layer in model['layers']]
+
+    svg = ElementTree.fromstring(outputs['svg'])
+    blocks = svg.findall(f'{SVG}g')
+    assert [block.find(f'{SVG}text').text for block in blocks] == headings
+    assert [[title.text for title in block.iter(f'{SVG}title')] for block in blocks] == bindings
+
+    page = PageParser()
+    page.feed(outputs['html'].decode('utf-8'))
+    assert page.headings[:len(headings)] == headings
+    # The first <title> is the page's own
+    assert page.titles[1:] == [binding for layer in bindings for binding in layer]
+    assert 'Combos' in page.headings
+
+    markdown = outputs['md'].decode('utf-8')
+    layer_headings = re.findall(r'^### (.+ Layer \(.+\))$', markdown, re.MULTILINE)
+    assert layer_headings and set(layer_headings) <= set(headings)
+    for combo in model['combos']:
+        assert f"| {combo['keys']} | {combo['output']} |" in markdown
@@ -0,0 +1,131 @@
+import os
+import random
+
+import pytest
+
+import timing_sim
+from timing_sim import EventLog, Timeline, KeymapModel, Simulation, simulate, compare, parameter_grid, INF
+from generate_readme import ZMKKeymapParser
+
+CONFIG_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+KEYMAP = os.path.join(CONFIG_DIR, 'clickety_split_pepito.keymap')
+# Positions on the repository keymap's base layer
+HOMEROW_A, KEY_Q, KEY_W, MO_ADJUST = 13, 1, 2, 37
+
+
+def timeline(text):
+    return Timeline(EventLog.parse(text.splitlines()))
+
+
+def test_timeline_pairs_presses_and_releases():
+    events = timeline("""
+        0 1 down
+        10 2 down   # roll
+        50 1 up
+        60 2 up
+    """)
+    assert list(events.start) == [0, 10]
+    assert list(events.end) == [50, 60]
+    assert list(events.next_start) == [10, INF]
+    assert events.nested_end[0] == 60
+    assert events.repeated_presses == events.unreleased_presses == 0
+
+
+def test_repeated_press_closes_the_previous_one():
+    events = timeline("""
+        0 1 down
+        100 1 down
+        150 1 up
+    """)
+    assert list(events.end) == [100, 150]
+    assert events.repeated_presses == 1
+
+
+def test_unreleased_press_is_clamped_to_the_log_end():
+    events = timeline("""
+        0 1 down
+        20 2 down
+        40 2 up
+    """)
+    assert list(events.end) == [40, 40]
+    assert events.unreleased_presses == 1
+
+
+def test_unsorted_log_is_sorted():
+    events = timeline("""
+        30 1 up
+        0 1 down
+    """)
+    assert list(events.end) == [30]
+
+
+def test_momentary_layer_expires_after_repaired_release():
+    parser = ZMKKeymapParser(KEYMAP, '')
+    parser.parse_keymap()
+    model = KeymapModel(parser)
+    # The &mo press is never released; the second press of it ends the first
+    events = timeline(f"""
+        0 {MO_ADJUST} down
+        10 {KEY_Q} down
+        20 {KEY_Q} up
+        30 {MO_ADJUST} down
+        40 {MO_ADJUST} up
+        50 {KEY_W} down
+        60 {KEY_W} up
+    """)
+    outcome = simulate(model, events)
+    _, adjust = parser.layer_action(list(parser.layers.values())[0][MO_ADJUST])
+    assert outcome.layer[1] == adjust
+    assert outcome.layer[3] == 0
+
+
+def test_hold_tap_timing_against_intent():
+    simulation = Simulation(KEYMAP, timeline(f"""
+        0 {HOMEROW_A} down tap
+        120 {HOMEROW_A} up
+        200 {HOMEROW_A} down hold
+        500 {HOMEROW_A} up
+    """))
+    result = simulation.run({'hm.tapping-term-ms': 100})
+    assert result['misfires']['unintended_holds'] == 1
+    assert simulation.run({'hm.tapping-term-ms': 200})['total'] == 0
+
+
+def test_parameter_grid():
+    grid = parameter_grid(['hm.tapping-term-ms=150:200:50', 'hm.flavor=balanced,tap-preferred'])
+    assert len(grid) == 4
+    assert grid[0] == {'hm.tapping-term-ms': 150, 'hm.flavor': 'balanced'}
+
+
+def random_log(presses, seed=1):
+    """Overlapping presses over the whole base layer, some of them annotated."""
+    rng = random.Random(seed)
+    lines, now = [], 0.0
+    for _ in range(presses):
+        now += rng.uniform(5, 150)
+        position = rng.randrange(44)
+        note = rng.choice(['', '', '', 'tap', 'hold', 'combo'])
+        lines.append(f"{now:.1f} {position} down {note}")
+        if rng.random() > 0.02:  # a few lost releases
+            lines.append(f"{now + rng.uniform(20, 400):.1f} {position} up")
+    return lines
+
+
+@pytest.mark.parametrize('params', [
+    {},
+    {'hm.flavor': 'balanced', 'hm.tapping-term-ms': 150},
+    {'hm.flavor': 'hold-preferred', 'hm.quick-tap-ms': 200},
+    {'hm.flavor': 'tap-unless-interrupted', 'hm.require-prior-idle-ms': 100},
+    {'hm.hold-trigger-key-positions': [18, 19, 20, 21, 22], 'lt.tapping-term-ms': 120, 'combo.timeout-ms': 30},
+])
+def test_numpy_backend_matches_python(monkeypatch, params):
+    pytest.importorskip('numpy')
+    events = timeline('\n'.join(random_log(3000)))
+    intent = {'hold-intent-ms': 250, 'combo-intent-ms': 30}
+    vectorized = Simulation(KEYMAP, events, intent=intent).run(params)
+    monkeypatch.setattr(timing_sim, 'np', None)
+    looped = Simulation(KEYMAP, events, intent=intent).run(params)
+    for result in (vectorized, looped):
+        del result['events_per_s']
+    assert vectorized['total'] > 0
+    assert vectorized == looped
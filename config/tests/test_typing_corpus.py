@@ -0,0 +1,74 @@
+import io
+
+import pytest
+
+from generate_readme import KeyboardLayout, ZMKKeymapParser
+from typing_corpus import CharMap, CorpusCounter, analyze, finger_map, format_text
+
+KEYMAP = """\
+#include <behaviors.dtsi>
+#include <dt-bindings/zmk/keys.h>
+
+/ {
+    keymap {
+        compatible = "zmk,keymap";
+        base_layer {
+            bindings = <&kp A &kp B &kp LSHFT &lt 1 SPACE &kp C &kp D>;
+        };
+        num_layer {
+            bindings = <&trans &kp N1 &trans &trans &kp EXCL &trans>;
+        };
+    };
+};
+"""
+LAYOUT = KeyboardLayout('test', [[{'indent': 0, 'keys': [0, 1, 2]}, {'indent': 2, 'keys': [3, 4, 5]}]],
+                        fingers=['LM', 'LI', 'LT', 'RT', 'RI', 'RM'])
+TEXT = "Ab cd!1 a\né"
+
+
+@pytest.fixture
+def charmap(tmp_path):
+    keymap = tmp_path / 'test.keymap'
+    keymap.write_text(KEYMAP)
+    parser = ZMKKeymapParser(str(keymap), '', layout=LAYOUT)
+    parser.parse_keymap()
+    return CharMap(parser, finger_map(LAYOUT))
+
+
+def count(charmap, text, chunk_size=4096, use_numpy=False):
+    counter = CorpusCounter(charmap, use_numpy=use_numpy)
+    counter.feed_file(io.BytesIO(text.encode()), chunk_size)
+    return counter
+
+
+def test_characters_resolve_to_layer_keys_and_shift(charmap):
+    assert charmap.paths == {0: [], 1: [3]}
+    assert charmap.keys['a'] == (0, (0,), None)
+    assert charmap.keys['A'] == (0, (0,), 2)
+    assert charmap.keys[' '] == (0, (3,), None)
+    assert charmap.keys['1'] == (1, (1,), None)
+    # EXCL carries its own shift
+    assert charmap.keys['!'] == (1, (4,), None)
+
+
+def test_counts_do_not_depend_on_chunk_size(charmap):
+    expected = count(charmap, TEXT).counts()
+    # One-byte chunks split the two-byte 'é' and every bigram
+    assert count(charmap, TEXT, chunk_size=1).counts() == expected
+
+
+def test_numpy_backend_matches_python(charmap):
+    pytest.importorskip('numpy')
+    assert count(charmap, TEXT, chunk_size=3, use_numpy=True).counts() == count(charmap, TEXT).counts()
+
+
+def test_report_counts_shift_and_layer_holds(charmap):
+    report = analyze(count(charmap, TEXT), LAYOUT)
+    assert report['characters'] == len(TEXT)
+    assert report['unmapped'] == 2
+    # "!" and "1" share one run on num_layer, entered once after the space
+    assert report['layer_switches'] == 1
+    assert report['layer_presses'] == {'base_layer': 7, 'num_layer': 2}
+    assert report['hold_taps'][3] == {'binding': '&lt 1 SPACE', 'kind': 'layer', 'taps': 2, 'holds': 1}
+    assert report['presses'][2] == 1
+    assert 'layer switches: 1' in format_text(report, LAYOUT)
@@ -0,0 +1,683 @@
+#!/usr/bin/env python3
+"""
+Hold-tap and combo timing simulator for a ZMK keymap.
+
+Replays recorded key-event logs through ZMK-like hold-tap and combo state
+machines built from the parsed behaviors and combos, and reports the
+misfires a set of timing parameters would cause: unintended holds, missed
+holds, missed or spurious combos, and rolls resolved as holds.
+
+A log has one event per line: ``<time_ms> <position> <down|up>``, with an
+optional intent on presses (``tap``, ``hold``, ``combo`` or ``key``) and
+``#`` comments. Presses without an intent are classified from the typing
+itself: a hold-tap is meant as a hold when another key is pressed and
+released inside it or it is held for --hold-intent-ms, and keys pressed
+within --combo-intent-ms of each other are meant as a combo.
+
+Everything that does not depend on the timing parameters (release times,
+the next press, the earliest nested release, ...) is computed once per
+log. For each parameter set, the hold-tap decision of every press is then
+computed in one vectorized step over those arrays, and so are the
+misfire counts. This uses NumPy when it is installed and a plain loop,
+at about half the speed, otherwise. The remaining sequential pass only
+tracks layers and combos. Parameter grids are spread over a process
+pool; the log is read once and its arrays are handed to each worker.
+
+Usage:
+    python3 timing_sim.py typing.log
+    python3 timing_sim.py typing.log --set hm.tapping-term-ms=150:250:25 --set hm.flavor=tap-preferred,balanced
+    python3 timing_sim.py typing.log --set combo.timeout-ms=30,40,50 --jobs 4 --json
+"""
+
+import os
+import sys
+import json
+import time
+import heapq
+import argparse
+import itertools
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from generate_readme import ZMKKeymapParser, ComboIndex
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_KEYMAP = os.path.join(SCRIPT_DIR, 'clickety_split_pepito.keymap')
+INF = float('inf')
+
+# ZMK's own defaults, from behaviors.dtsi and the hold-tap binding
+HOLD_TAP_DEFAULTS = {'flavor': 'hold-preferred', 'tapping-term-ms': 200, 'quick-tap-ms': 0,
+                     'require-prior-idle-ms': 0, 'hold-trigger-key-positions': None}
+BUILTIN_HOLD_TAPS = {
+    'mt': {'flavor': 'hold-preferred', 'tapping-term-ms': 200},
+    'lt': {'flavor': 'tap-preferred', 'tapping-term-ms': 200},
+}
+FLAVORS = ('hold-preferred', 'balanced', 'tap-preferred', 'tap-unless-interrupted')
+
+# Intent annotations and per-press outcomes
+INTENTS = {'': 0, 'tap': 1, 'hold': 2, 'combo': 3, 'key': 4}
+PRESS, TAP, HOLD, COMBO = 0, 1, 2, 3
+OUTCOMES = ('press', 'tap', 'hold', 'combo')
+
+# What a key does on a given layer state
+PLAIN, HOLD_TAP, LAYER = 0, 1, 2
+
+MISFIRES = ('unintended_holds', 'missed_holds', 'rolls_misresolved', 'missed_combos', 'false_combos',
+            'wrong_layer')
+
+
+class EventLog:
+    """Key events as parallel arrays, sorted by time."""
+
+    def __init__(self, times: array, positions: array, down: array, intents: array):
+        self.times = times
+        self.positions = positions
+        self.down = down
+        self.intents = intents
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+    @classmethod
+    def parse(cls, lines) -> 'EventLog':
+        """Read ``<time_ms> <position> <down|up> [intent]`` lines."""
+        times, positions, down, intents = array('d'), array('H'), array('B'), array('B')
+        for number, line in enumerate(lines, 1):
+            fields = line.split('#', 1)[0].split()
+            if not fields:
+                continue
+            try:
+                state = fields[2].lower()
+                times.append(float(fields[0]))
+                positions.append(int(fields[1]))
+                down.append(state in ('down', 'd', 'press', '1'))
+                intents.append(INTENTS[fields[3].lower()] if len(fields) > 3 else 0)
+                if state not in ('down', 'd', 'press', '1', 'up', 'u', 'release', '0'):
+                    raise ValueError(f"unknown key state {fields[2]!r}")
+            except (IndexError, KeyError, ValueError) as e:
+                raise ValueError(f"line {number}: cannot parse {line.strip()!r} ({e})") from None
+        log = cls(times, positions, down, intents)
+        if any(times[i] > times[i + 1] for i in range(len(times) - 1)):
+            log = log.sorted()
+        return log
+
+    @classmethod
+    def load(cls, path: str) -> 'EventLog':
+        if path == '-':
+            return cls.parse(sys.stdin)
+        with open(path, 'r') as f:
+            return cls.parse(f)
+
+    def sorted(self) -> 'EventLog':
+        """A copy ordered by time; events at the same time keep their order."""
+        order = sorted(range(len(self)), key=self.times.__getitem__)
+        return EventLog(array('d', (self.times[i] for i in order)), array('H', (self.positions[i] for i in order)),
+                        array('B', (self.down[i] for i in order)), array('B', (self.intents[i] for i in order)))
+
+
+class Timeline:
+    """Per-press facts that do not depend on timing parameters.
+
+    For press k: ``start[k]``/``end[k]`` are its press and release times,
+    ``next_start``/``next_position`` describe the following press,
+    ``nested_end`` is the earliest release of any later press (a key
+    pressed and released inside press k when it is below ``end[k]``),
+    ``previous_start`` is the preceding press and ``previous_same`` the
+    index of the last press of the same key, or -1.
+
+    Logs with lost events are repaired: a second press of a key that was
+    never released ends the first one at the new press, and presses still
+    open at the end of the log are released at its last event. Both are
+    counted in ``repeated_presses`` and ``unreleased_presses``.
+    """
+
+    def __init__(self, log: EventLog):
+        start, end, position, intent = array('d'), array('d'), array('H'), array('B')
+        open_presses = {}
+        repeated = 0
+        for time_ms, key, down, note in zip(log.times, log.positions, log.down, log.intents):
+            if down:
+                previous = open_presses.get(key)
+                if previous is not None:
+                    end[previous] = time_ms
+                    repeated += 1
+                open_presses[key] = len(start)
+                start.append(time_ms)
+                end.append(INF)
+                position.append(key)
+                intent.append(note)
+            elif key in open_presses:
+                end[open_presses.pop(key)] = time_ms
+        last_event = log.times[-1] if len(log) else 0.0
+        for k in open_presses.values():
+            end[k] = last_event
+        count = len(start)
+        self.events = len(log)
+        self.repeated_presses = repeated
+        self.unreleased_presses = len(open_presses)
+        self.start, self.end, self.position, self.intent = start, end, position, intent
+
+        self.next_start = array('d', start[1:]) + array('d', [INF])
+        self.next_position = array('H', position[1:]) + array('H', [0])
+        self.previous_start = array('d', [-INF]) + array('d', start[:-1]) if count else array('d')
+        nested_end = array('d', [INF]) * count
+        earliest = INF
+        for k in range(count - 1, -1, -1):
+            nested_end[k] = earliest
+            if end[k] < earliest:
+                earliest = end[k]
+        self.nested_end = nested_end
+        previous_same = array('l', [-1]) * count
+        last = {}
+        for k, key in enumerate(position):
+            previous_same[k] = last.get(key, -1)
+            last[key] = k
+        self.previous_same = previous_same
+
+    def __len__(self) -> int:
+        return len(self.start)
+
+
+class KeymapModel:
+    """The parsed keymap reduced to what the state machines need.
+
+    ``hold_taps`` holds the timing properties of every hold-tap behavior
+    and ``combos`` the combos with their positions and timeouts. Both can
+    be overridden with ``{'hm.tapping-term-ms': 150, 'combo.timeout-ms':
+    40}`` style parameters, where ``combo`` means every combo and a combo
+    name means just that one.
+    """
+
+    def __init__(self, parser: ZMKKeymapParser, params: Optional[Dict] = None):
+        self.parser = parser
+        self.resolver = parser.layer_resolver()
+        self.combo_index = parser.combo_index
+        self.hold_taps = {}
+        for name, behavior in list(BUILTIN_HOLD_TAPS.items()) + list(parser.behaviors.items()):
+            if behavior.get('compatible', 'zmk,behavior-hold-tap') == 'zmk,behavior-hold-tap':
+                settings = dict(HOLD_TAP_DEFAULTS, **BUILTIN_HOLD_TAPS.get(name, {}))
+                settings.update((key, value) for key, value in behavior.items() if key in HOLD_TAP_DEFAULTS)
+                self.hold_taps[name] = settings
+        self.combos = [{'name': combo['name'], 'positions': frozenset(combo['positions']),
+                        'timeout-ms': combo['timeout_ms'] or ComboIndex.DEFAULT_TIMEOUT_MS}
+                       for combo in parser.combos]
+        for name, value in (params or {}).items():
+            self.set(name, value)
+        for settings in self.hold_taps.values():
+            if settings['flavor'] not in FLAVORS:
+                raise ValueError(f"unknown hold-tap flavor {settings['flavor']!r}")
+            triggers = settings['hold-trigger-key-positions']
+            if triggers is not None and not isinstance(triggers, frozenset):
+                settings['hold-trigger-key-positions'] = frozenset(triggers if isinstance(triggers, list) else [triggers])
+        self._keys = {}
+        self._states = {}
+
+    def set(self, name: str, value):
+        """Override one ``target.property`` timing parameter."""
+        target, _, prop = name.partition('.')
+        if target in self.hold_taps and prop in HOLD_TAP_DEFAULTS:
+            self.hold_taps[target][prop] = value
+            return
+        combos = [combo for combo in self.combos if target in ('combo', combo['name'])]
+        if combos and prop == 'timeout-ms':
+            for combo in combos:
+                combo['timeout-ms'] = value
+            return
+        raise ValueError(f"unknown parameter {name!r}")
+
+    def keys(self, mask: int) -> List[Tuple[int, Optional[Dict], Optional[Tuple[str, int]]]]:
+        """``(kind, hold-tap settings, layer action)`` per position for an active-layer mask."""
+        keys = self._keys.get(mask)
+        if keys is None:
+            keys = []
+            for _, binding in self.resolver.effective(mask):
+                settings = self.hold_taps.get(binding.behavior)
+                action = self.parser.layer_action(binding)
+                if settings is not None:
+                    keys.append((HOLD_TAP, settings, action))
+                elif action is not None:
+                    keys.append((LAYER, None, action))
+                else:
+                    keys.append((PLAIN, None, None))
+            self._keys[mask] = keys
+        return keys
+
+    def state(self, explicit: int) -> Tuple[int, Dict[int, int], List]:
+        """Top layer, its combo masks and :meth:`keys` for a mask of explicitly activated layers."""
+        state = self._states.get(explicit)
+        if state is None:
+            mask = self.resolver.active_mask(explicit)
+            top = mask.bit_length() - 1
+            masks = self.combo_index.masks
+            state = (top, masks[top] if top < len(masks) else {}, self.keys(mask))
+            self._states[explicit] = state
+        return state
+
+
+class Outcome:
+    """What happened to every press in one run: outcome code, combo id and top layer."""
+
+    def __init__(self, count: int):
+        self.kind = array('B', [PRESS]) * count
+        self.combo = array('h', [-1]) * count
+        self.layer = array('B', [0]) * count
+        self.combo_start = array('B', [0]) * count
+
+
+def hold_tap_decisions(timeline: Timeline, settings: Optional[Dict] = None, intent: Optional[Dict] = None) -> List[int]:
+    """TAP or HOLD for every press, as if each were a hold-tap with these settings.
+
+    Quick-tap depends on how the previous press of the key was resolved,
+    so the sequential pass applies it. With intent, the log's annotations
+    and ``hold-intent-ms`` decide instead of the settings.
+    """
+    if not len(timeline):
+        return []
+    if np is None:
+        return _hold_tap_decisions_python(timeline, settings, intent)
+    start = np.frombuffer(timeline.start, dtype=np.float64)
+    end = np.frombuffer(timeline.end, dtype=np.float64)
+    interrupt = np.frombuffer(timeline.next_start, dtype=np.float64)
+    nested = np.frombuffer(timeline.nested_end, dtype=np.float64)
+    if intent:
+        notes = np.frombuffer(timeline.intent, dtype=np.uint8)
+        hold = (nested < end) | ((interrupt >= end) & (end - start >= intent['hold-intent-ms']))
+        hold = (notes == INTENTS['hold']) | ((notes != INTENTS['tap']) & hold)
+        return np.where(hold, HOLD, TAP).tolist()
+    deadline = start + settings['tapping-term-ms']
+    flavor = settings['flavor']
+    if flavor == 'tap-preferred':
+        hold = deadline < end
+    elif flavor == 'hold-preferred':
+        hold = np.minimum(deadline, interrupt) < end
+    elif flavor == 'balanced':
+        hold = np.minimum(deadline, nested) < end
+    else:
+        hold = interrupt < np.minimum(deadline, end)
+    if settings['require-prior-idle-ms'] > 0:
+        previous_start = np.frombuffer(timeline.previous_start, dtype=np.float64)
+        hold &= start - previous_start >= settings['require-prior-idle-ms']
+    triggers = settings['hold-trigger-key-positions']
+    if triggers is not None:
+        next_position = np.frombuffer(timeline.next_position, dtype=np.uint16)
+        hold &= ~((interrupt < end) & (interrupt < deadline) & ~np.isin(next_position, list(triggers)))
+    return np.where(hold, HOLD, TAP).tolist()
+
+
+def _hold_tap_decisions_python(timeline: Timeline, settings: Optional[Dict], intent: Optional[Dict]) -> List[int]:
+    decisions = []
+    presses = zip(timeline.start, timeline.end, timeline.next_start, timeline.nested_end)
+    if intent:
+        hold_intent = intent['hold-intent-ms']
+        for (now, release, interrupt, nested), note in zip(presses, timeline.intent):
+            if note in (INTENTS['tap'], INTENTS['hold']):
+                decisions.append(TAP if note == INTENTS['tap'] else HOLD)
+            elif nested < release:
+                decisions.append(HOLD)
+            elif interrupt < release:
+                decisions.append(TAP)
+            else:
+                decisions.append(HOLD if release - now >= hold_intent else TAP)
+        return decisions
+    term, flavor = settings['tapping-term-ms'], settings['flavor']
+    prior_idle, triggers = settings['require-prior-idle-ms'], settings['hold-trigger-key-positions']
+    for (now, release, interrupt, nested), previous_start, next_position in zip(
+            presses, timeline.previous_start, timeline.next_position):
+        deadline = now + term
+        if prior_idle > 0 and now - previous_start < prior_idle:
+            decision = TAP
+        elif (triggers is not None and interrupt < release and interrupt < deadline and
+              next_position not in triggers):
+            decision = TAP
+        elif flavor == 'tap-preferred':
+            decision = HOLD if deadline < release else TAP
+        elif flavor == 'hold-preferred':
+            decision = HOLD if min(deadline, interrupt) < release else TAP
+        elif flavor == 'balanced':
+            decision = HOLD if min(deadline, nested) < release else TAP
+        else:
+            decision = HOLD if interrupt < min(deadline, release) else TAP
+        decisions.append(decision)
+    return decisions
+
+
+def simulate(model: KeymapModel, timeline: Timeline, intent: Optional[Dict] = None) -> Outcome:
+    """Run the presses through the combo and hold-tap state machines.
+
+    With intent, decisions follow the log's annotations and the intent
+    heuristics (``hold-intent-ms``, ``combo-intent-ms``) instead of the
+    model's timing parameters, giving the outcome the typist meant.
+    """
+    start, end, position, notes = timeline.start, timeline.end, timeline.position, timeline.intent
+    previous_same = timeline.previous_same
+    count = len(timeline)
+    outcome = Outcome(count)
+    kinds, combo_ids, layers = outcome.kind, outcome.combo, outcome.layer
+    combos = model.combos
+    state = model.state
+    combo_intent = intent['combo-intent-ms'] if intent else 0
+    combo_note = INTENTS['combo']
+    # Hold-tap decisions for every press, per settings dict, made on first use
+    intended = hold_tap_decisions(timeline, intent=intent) if intent else None
+    decided = {}
+
+    explicit = 1
+    # Held momentary layers as a heap of (release time, layer bit), with a
+    # hold count per bit so overlapping holds of one layer stack correctly
+    momentary = []
+    held = {}
+    held_mask = 0
+    current = None
+    for k in range(count):
+        if kinds[k] == COMBO:
+            continue
+        now = start[k]
+        while momentary and momentary[0][0] <= now:
+            _, bit = heapq.heappop(momentary)
+            held[bit] -= 1
+            if not held[bit]:
+                held_mask &= ~bit
+        # The layer state only changes on layer keys, so look it up only then
+        if explicit | held_mask != current:
+            current = explicit | held_mask
+            top, top_combos, keys = state(current)
+        layers[k] = top
+        key = position[k]
+
+        # Combos: keys pressed within the timeout of the first, with no release in between
+        candidates = top_combos.get(key, 0)
+        if candidates and (not intent or notes[k] in (0, combo_note)):
+            pressed = {key}
+            members = [k]
+            released = end[k]
+            fired = -1
+            j = k + 1
+            while candidates and j < count:
+                elapsed = start[j] - now
+                if start[j] >= released or kinds[j] == COMBO:
+                    break
+                if intent:
+                    if notes[j] not in (0, combo_note) or (notes[k] == 0 and elapsed > combo_intent):
+                        break
+                narrowed = candidates & top_combos.get(position[j], 0)
+                remaining = 0
+                bits = narrowed
+                while bits:
+                    low = bits & -bits
+                    bit = low.bit_length() - 1
+                    if intent or elapsed <= combos[bit]['timeout-ms']:
+                        remaining |= low
+                    bits ^= low
+                if not remaining:
+                    break
+                candidates = remaining
+                pressed.add(position[j])
+                members.append(j)
+                released = min(released, end[j])
+                complete = [bit for bit in _bits(candidates) if combos[bit]['positions'] == pressed]
+                if complete:
+                    fired = complete[0]
+                    # Wait for a larger combo only while one is still possible
+                    if all(combos[bit]['positions'] == pressed for bit in _bits(candidates)):
+                        break
+                j += 1
+            if fired >= 0:
+                outcome.combo_start[k] = 1
+                for member in members:
+                    if position[member] in combos[fired]['positions']:
+                        kinds[member] = COMBO
+                        combo_ids[member] = fired
+                        layers[member] = top
+                continue
+
+        kind, settings, action = keys[key]
+        if kind == LAYER:
+            verb, target = action
+            if verb == 'mo':
+                bit = 1 << target
+                heapq.heappush(momentary, (end[k], bit))
+                held[bit] = held.get(bit, 0) + 1
+                held_mask |= bit
+            elif verb == 'to':
+                explicit = 1 | 1 << target
+            elif target:
+                explicit ^= 1 << target
+            continue
+        if kind == PLAIN:
+            continue
+
+        if intent:
+            decision = intended[k]
+        else:
+            decisions = decided.get(id(settings))
+            if decisions is None:
+                decisions = decided[id(settings)] = hold_tap_decisions(timeline, settings)
+            quick_tap = settings['quick-tap-ms']
+            previous = previous_same[k]
+            if (quick_tap > 0 and previous >= 0 and kinds[previous] == TAP and
+                    now - start[previous] < quick_tap):
+                decision = TAP
+            else:
+                decision = decisions[k]
+        kinds[k] = decision
+        if decision == HOLD and action is not None:
+            verb, target = action
+            if verb == 'to':
+                explicit = 1 | 1 << target
+            elif verb == 'tog':
+                explicit ^= 1 << target if target else 0
+            else:
+                bit = 1 << target
+                heapq.heappush(momentary, (end[k], bit))
+                held[bit] = held.get(bit, 0) + 1
+                held_mask |= bit
+    return outcome
+
+
+def _bits(mask: int):
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+def compare(timeline: Timeline, intended: Outcome, actual: Outcome, examples: int = 10) -> Dict:
+    """Count the presses whose simulated outcome differs from the intended one."""
+    if np is None or not len(timeline):
+        return _compare_python(timeline, intended, actual, examples)
+    want = np.frombuffer(intended.kind, dtype=np.uint8)
+    got = np.frombuffer(actual.kind, dtype=np.uint8)
+    want_combo = np.frombuffer(intended.combo, dtype=np.int16)
+    got_combo = np.frombuffer(actual.combo, dtype=np.int16)
+    unintended_holds = (want == TAP) & (got == HOLD)
+    rolls = np.frombuffer(timeline.next_start, dtype=np.float64) < np.frombuffer(timeline.end, dtype=np.float64)
+    found = {
+        'missed_combos': np.frombuffer(intended.combo_start, dtype=np.bool_) & (got_combo != want_combo),
+        'false_combos': np.frombuffer(actual.combo_start, dtype=np.bool_) & (want_combo != got_combo),
+        'unintended_holds': unintended_holds,
+        'rolls_misresolved': unintended_holds & rolls,
+        'missed_holds': (want == HOLD) & (got == TAP),
+        'wrong_layer': ((want != COMBO) & (got != COMBO) &
+                        (np.frombuffer(intended.layer, dtype=np.uint8) != np.frombuffer(actual.layer, dtype=np.uint8))),
+    }
+    counts = {name: int(np.count_nonzero(found[name])) for name in MISFIRES}
+    samples = [_example(timeline, intended, actual, k, [name for name, misfired in found.items() if misfired[k]])
+               for k in np.flatnonzero(np.logical_or.reduce(list(found.values())))[:examples].tolist()]
+    return {'misfires': counts, 'total': sum(counts.values()) - counts['rolls_misresolved'], 'examples': samples}
+
+
+def _compare_python(timeline: Timeline, intended: Outcome, actual: Outcome, examples: int) -> Dict:
+    counts = dict.fromkeys(MISFIRES, 0)
+    samples = []
+    rolls = timeline.next_start
+    end = timeline.end
+    for k in range(len(timeline)):
+        want, got = intended.kind[k], actual.kind[k]
+        found = []
+        if intended.combo_start[k] and actual.combo[k] != intended.combo[k]:
+            found.append('missed_combos')
+        if actual.combo_start[k] and intended.combo[k] != actual.combo[k]:
+            found.append('false_combos')
+        if want == TAP and got == HOLD:
+            found.append('unintended_holds')
+            if rolls[k] < end[k]:
+                found.append('rolls_misresolved')
+        elif want == HOLD and got == TAP:
+            found.append('missed_holds')
+        if want != COMBO and got != COMBO and intended.layer[k] != actual.layer[k]:
+            found.append('wrong_layer')
+        for name in found:
+            counts[name] += 1
+        if found and len(samples) < examples:
+            samples.append(_example(timeline, intended, actual, k, found))
+    return {'misfires': counts, 'total': sum(counts.values()) - counts['rolls_misresolved'], 'examples': samples}
+
+
+def _example(timeline: Timeline, intended: Outcome, actual: Outcome, k: int, found: List[str]) -> Dict:
+    return {'time_ms': timeline.start[k], 'position': timeline.position[k], 'misfires': found,
+            'intended': OUTCOMES[intended.kind[k]], 'simulated': OUTCOMES[actual.kind[k]]}
+
+
+def summarize(timeline: Timeline, intended: Outcome) -> Dict:
+    """Parameter-independent counts describing a log."""
+    return {
+        'events': timeline.events,
+        'presses': len(timeline),
+        'hold_taps': sum(1 for kind in intended.kind if kind in (TAP, HOLD)),
+        'intended_holds': sum(1 for kind in intended.kind if kind == HOLD),
+        'intended_combos': sum(intended.combo_start),
+        'repeated_presses': timeline.repeated_presses,
+        'unreleased_presses': timeline.unreleased_presses,
+    }
+
+
+class Simulation:
+    """A log and keymap prepared once, evaluated for any number of parameter sets."""
+
+    def __init__(self, keymap_file: str, timeline: Timeline, intended: Optional[Outcome] = None,
+                 intent: Optional[Dict] = None):
+        self.parser = ZMKKeymapParser(keymap_file, '')
+        self.parser.parse_keymap()
+        self.timeline = timeline
+        self.intended = intended or simulate(KeymapModel(self.parser), timeline, intent)
+
+    def run(self, params: Dict) -> Dict:
+        model = KeymapModel(self.parser, params)
+        started = time.perf_counter()
+        actual = simulate(model, self.timeline)
+        elapsed = time.perf_counter() - started
+        result = compare(self.timeline, self.intended, actual)
+        result['params'] = params
+        result['events_per_s'] = self.timeline.events / elapsed if elapsed else 0.0
+        return result
+
+
+_worker = None
+
+
+def _init_worker(keymap_file: str, timeline: Timeline, intended: Outcome):
+    global _worker
+    _worker = Simulation(keymap_file, timeline, intended)
+
+
+def _run_worker(params: Dict) -> Dict:
+    return _worker.run(params)
+
+
+def parse_values(text: str) -> List:
+    """``150,175`` or an inclusive ``start:stop:step`` range; non-numbers stay strings."""
+    if text.count(':') == 2:
+        first, last, step = (int(part) for part in text.split(':'))
+        return list(range(first, last + 1, step))
+    values = []
+    for part in text.split(','):
+        try:
+            values.append(int(part))
+        except ValueError:
+            values.append(part)
+    return values
+
+
+def parameter_grid(settings: List[str]) -> List[Dict]:
+    """Every combination of ``name=values`` settings."""
+    axes = []
+    for setting in settings:
+        name, separator, values = setting.partition('=')
+        if not separator or not values:
+            raise ValueError(f"expected NAME=VALUES, got {setting!r}")
+        axes.append([(name, value) for value in parse_values(values)])
+    return [dict(combination) for combination in itertools.product(*axes)]
+
+
+def run_grid(log_file: str, keymap_file: str, grid: List[Dict], intent: Dict, jobs: int = 1) -> Tuple[Dict, List[Dict]]:
+    """Evaluate every parameter set; returns the log summary and one result per set."""
+    simulation = Simulation(keymap_file, Timeline(EventLog.load(log_file)), intent=intent)
+    for params in grid:
+        KeymapModel(simulation.parser, params)  # reject bad names before starting workers
+    summary = summarize(simulation.timeline, simulation.intended)
+    if jobs <= 1 or len(grid) <= 1:
+        return summary, [simulation.run(params) for params in grid]
+    # Workers get the prepared arrays rather than re-reading the log
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                             initargs=(keymap_file, simulation.timeline, simulation.intended)) as pool:
+        chunksize = max(1, len(grid) // (jobs * 4))
+        return summary, list(pool.map(_run_worker, grid, chunksize=chunksize))
+
+
+def format_text(summary: Dict, results: List[Dict]) -> str:
+    """Results best first, one line per parameter set."""
+    lines = [f"{summary['events']} events, {summary['presses']} presses, {summary['hold_taps']} hold-taps "
+             f"({summary['intended_holds']} meant as holds), {summary['intended_combos']} combos meant"]
+    if summary['repeated_presses'] or summary['unreleased_presses']:
+        lines.append(f"repaired {summary['repeated_presses']} presses without a release before the next press "
+                     f"and {summary['unreleased_presses']} still held at the end of the log")
+    for result in sorted(results, key=lambda result: result['total']):
+        params = ' '.join(f"{name}={value}" for name, value in result['params'].items()) or 'keymap settings'
+        counts = ', '.join(f"{name.replace('_', ' ')} {count}" for name, count in result['misfires'].items() if count)
+        lines.append(f"{result['total']:6} misfires  {params}" + (f"  ({counts})" if counts else ''))
+    best = min(results, key=lambda result: result['total'])
+    for example in best['examples']:
+        lines.append(f"  {example['time_ms']:>10.1f} ms  pos {example['position']:>3}: "
+                     f"{example['intended']} -> {example['simulated']} ({', '.join(example['misfires'])})")
+    return '\n'.join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point."""
+    arg_parser = argparse.ArgumentParser(description="Replay key-event logs through hold-tap and combo timing.")
+    arg_parser.add_argument('log', help="key-event log, or - for stdin")
+    arg_parser.add_argument('--keymap', default=DEFAULT_KEYMAP)
+    arg_parser.add_argument('--set', action='append', default=[], metavar='NAME=VALUES',
+                            help="timing parameter to sweep, e.g. hm.tapping-term-ms=150:250:25 or "
+                                 "combo.timeout-ms=30,50; may be repeated")
+    arg_parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1, help="worker processes for grids")
+    arg_parser.add_argument('--hold-intent-ms', type=float, default=250,
+                            help="unannotated solo hold-taps held this long are meant as holds")
+    arg_parser.add_argument('--combo-intent-ms', type=float, default=30,
+                            help="unannotated presses this close together are meant as a combo")
+    arg_parser.add_argument('--json', action='store_true', help="print the results as JSON")
+    args = arg_parser.parse_args(argv)
+
+    intent = {'hold-intent-ms': args.hold_intent_ms, 'combo-intent-ms': args.combo_intent_ms}
+    try:
+        grid = parameter_grid(args.set)
+        summary, results = run_grid(args.log, args.keymap, grid, intent, args.jobs)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+
+    if args.json:
+        print(json.dumps({'summary': summary, 'results': results}, indent=2))
+    else:
+        print(format_text(summary, results))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
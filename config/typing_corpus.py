@@ -0,0 +1,445 @@
+#!/usr/bin/env python3
+"""
+Typing-corpus analyzer for a ZMK keymap.
+
+Streams one or more text files through the parsed keymap and reports how
+often each physical key is pressed (including the shift and layer keys
+needed to reach a character), layer switches, hold-tap usage and
+same-hand / same-finger bigram rates, with a press heatmap drawn on the
+same grid as the README's layer tables.
+
+The corpus is read in fixed-size chunks, so multi-gigabyte logs never
+have to fit in memory. Only character and bigram counts are accumulated;
+every statistic is derived from them afterwards. NumPy is used for the
+counting when it is installed, otherwise a pure-Python counter is used.
+
+Usage:
+    python3 typing_corpus.py corpus.txt
+    python3 typing_corpus.py logs/*.txt --json report.json
+    cat notes.md | python3 typing_corpus.py -
+"""
+
+import os
+import sys
+import json
+import codecs
+import argparse
+import operator
+from collections import Counter, deque
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from generate_readme import ZMKKeymapParser, KeyboardLayout, Binding, BindingDecoder
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+CHUNK_SIZE = 4 * 1024 * 1024
+
+# Characters produced by keys whose key_symbols label is not the character itself
+KEYCODE_CHARS = {'SPACE': ' ', 'RET': '\n', 'ENTER': '\n', 'TAB': '\t'}
+# Shifted keycodes ZMK sends with an implicit shift, e.g. ``&kp EXCL``
+SHIFTED_KEYCODES = {
+    'EXCL': '!', 'AT': '@', 'HASH': '#', 'DLLR': '$', 'PRCNT': '%', 'CARET': '^', 'AMPS': '&',
+    'STAR': '*', 'ASTRK': '*', 'UNDER': '_', 'PLUS': '+', 'PIPE': '|', 'COLON': ':', 'DQT': '"',
+    'TILDE': '~', 'LT': '<', 'GT': '>', 'QMARK': '?',
+}
+# What Shift turns each unshifted character into on a US layout
+US_SHIFT = dict(zip("`1234567890-=[]\\;',./", '~!@#$%^&*()_+{}|:"<>?'))
+SHIFT_KEYCODES = ('LSHFT', 'RSHFT', 'LSHIFT', 'RSHIFT', 'LEFT_SHIFT', 'RIGHT_SHIFT')
+FINGER_NAMES = {'T': 'thumb', 'I': 'index', 'M': 'middle', 'R': 'ring', 'P': 'pinky'}
+
+
+def finger_map(layout: KeyboardLayout) -> Dict[int, str]:
+    """Hand and finger of each key position, e.g. ``{13: 'LP', 14: 'LR'}``.
+
+    Uses the layout's ``fingers`` list when present. Otherwise the first
+    and last segment of a row are the left and right hand (a single
+    segment is split in the middle), segments of three keys or fewer are
+    thumbs, and fingers are assigned from the inner edge of each hand:
+    two index columns, then middle, ring and pinky for the rest.
+    """
+    if layout.fingers:
+        return {position: finger for position, finger in enumerate(layout.fingers) if finger}
+    fingers = {}
+    for row in layout.rows:
+        segments = [segment['keys'] for segment in row]
+        if len(segments) == 1:
+            keys = segments[0]
+            halves = [('L', keys[:(len(keys) + 1) // 2]), ('R', keys[(len(keys) + 1) // 2:])]
+        else:
+            halves = [('L', segments[0]), ('R', segments[-1])] + [('R', keys) for keys in segments[1:-1]]
+        for hand, keys in halves:
+            for column, position in enumerate(keys):
+                if position is None:
+                    continue
+                if len(keys) <= 3 and len(row) > 1:
+                    finger = 'T'
+                else:
+                    inner = len(keys) - 1 - column if hand == 'L' else column
+                    finger = 'IIMR'[inner] if inner < 4 else 'P'
+                fingers[position] = hand + finger
+    return fingers
+
+
+class CharMap:
+    """Resolves each character to the keys pressed to type it.
+
+    Characters come from the parsed layers: ``&kp`` keycodes, the tap half
+    of hold-taps such as ``&hm LCTRL A`` and ``&lt 1 RET``, labels from
+    ``key_symbols`` that are a single character, their shifted forms and
+    combo outputs. Layers are reached by holding the ``&mo``/``&lt`` keys
+    found by a breadth-first search from the base layer; the cheapest way
+    to type a character (fewest keys, then lowest layer) wins.
+    """
+
+    def __init__(self, parser: ZMKKeymapParser, fingers: Dict[int, str]):
+        if not parser.layers:
+            raise ValueError(f"{parser.keymap_file} defines no layers")
+        self.parser = parser
+        self.fingers = fingers
+        self.layer_names = list(parser.layers)
+        self.paths = self._layer_paths()
+        self.shift_keys = self._shift_keys()
+        # char -> (layer, key positions, shift position or None)
+        self.keys = {}
+        self._resolve()
+        self.chars = sorted(self.keys)
+        self.ids = {char: index for index, char in enumerate(self.chars)}
+
+    def _hold_tap_kind(self, behavior: str) -> Optional[str]:
+        """'layer' or 'mod' for hold-tap behaviors, None for anything else."""
+        if behavior == 'lt':
+            return 'layer'
+        if behavior == 'mt':
+            return 'mod'
+        definition = self.parser.behaviors.get(behavior)
+        if not definition or definition.get('compatible') != 'zmk,behavior-hold-tap':
+            return None
+        hold = definition.get('bindings', ['&kp'])
+        hold = hold[0] if isinstance(hold, list) else hold
+        return 'layer' if hold.strip() in ('&mo', '&to', '&tog') else 'mod'
+
+    def split(self, binding: Binding) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+        """Return ``(kind, hold, tap)`` where kind is 'layer', 'mod' or None."""
+        params = binding.params
+        if binding.behavior == 'kp' and params:
+            return None, None, params[0]
+        if binding.behavior == 'mo' and params:
+            return 'layer', params[0], None
+        kind = self._hold_tap_kind(binding.behavior)
+        if kind and len(params) >= 2:
+            return kind, params[0], params[1]
+        return None, None, None
+
+    def _layer_index(self, code: str) -> Optional[int]:
+        try:
+            index = int(code, 0)
+        except ValueError:
+            return None
+        return index if 0 <= index < len(self.layer_names) else None
+
+    def _layer_paths(self) -> Dict[int, List[int]]:
+        """Positions held to reach each layer from the base layer."""
+        paths = {0: []}
+        queue = deque([0])
+        while queue:
+            layer = queue.popleft()
+            for position, binding in enumerate(self.parser.layers[self.layer_names[layer]]):
+                kind, hold, _ = self.split(binding)
+                target = self._layer_index(hold) if kind == 'layer' else None
+                if target is not None and target not in paths:
+                    paths[target] = paths[layer] + [position]
+                    queue.append(target)
+        return paths
+
+    def _shift_keys(self) -> Dict[int, str]:
+        """Base-layer positions that act as Shift, from ``&kp LSHFT`` or a hold-tap holding it."""
+        keys = {}
+        for position, binding in enumerate(self.parser.layers[self.layer_names[0]]):
+            kind, hold, tap = self.split(binding)
+            if (kind is None and tap in SHIFT_KEYCODES) or (kind == 'mod' and hold in SHIFT_KEYCODES):
+                keys[position] = self.fingers.get(position, '?')[0]
+        return keys
+
+    def keycode_char(self, keycode: str) -> Tuple[Optional[str], bool]:
+        """Character a keycode types and whether ZMK adds an implicit shift."""
+        if keycode in KEYCODE_CHARS:
+            return KEYCODE_CHARS[keycode], False
+        if keycode in SHIFTED_KEYCODES:
+            return SHIFTED_KEYCODES[keycode], True
+        if len(keycode) == 1 and keycode.isalpha():
+            return keycode.lower(), False
+        if keycode.startswith('LS(') and keycode.endswith(')'):
+            char, _ = self.keycode_char(keycode[3:-1])
+            return (char.upper() if char and char.isalpha() else US_SHIFT.get(char)), True
+        label = self.parser.key_symbols.get(keycode)
+        if label and len(label) == 1 and label.isascii() and label.isprintable():
+            return label, label in US_SHIFT.values()
+        return None, False
+
+    def _shift_for(self, position: int) -> Optional[int]:
+        """A shift key, preferring the hand opposite the key being shifted."""
+        hand = self.fingers.get(position, '?')[0]
+        for shift, shift_hand in self.shift_keys.items():
+            if shift_hand != hand:
+                return shift
+        return next(iter(self.shift_keys), None)
+
+    def _offer(self, char: str, layer: int, positions: Tuple[int, ...], shift: Optional[int]):
+        cost = (len(self.paths[layer]) + len(positions) + (shift is not None), layer)
+        current = self.keys.get(char)
+        if current is None or cost < current[0]:
+            self.keys[char] = (cost, layer, positions, shift)
+
+    def _offer_binding(self, binding: Binding, layer: int, positions: Tuple[int, ...]):
+        _, _, tap = self.split(binding)
+        char, implicit_shift = self.keycode_char(tap) if tap else (None, False)
+        if char is None:
+            return
+        self._offer(char, layer, positions, None)
+        if implicit_shift:
+            return
+        shifted = char.upper() if char.isalpha() else US_SHIFT.get(char)
+        shift = self._shift_for(positions[0])
+        if shifted and shift is not None:
+            self._offer(shifted, layer, positions, shift)
+
+    def _resolve(self):
+        for layer in sorted(self.paths):
+            for position, binding in enumerate(self.parser.layers[self.layer_names[layer]]):
+                self._offer_binding(binding, layer, (position,))
+        for combo in self.parser.combos:
+            binding = Binding(*BindingDecoder.tokenize(combo['binding']))
+            for layer in combo['layers'] or range(len(self.layer_names)):
+                if layer in self.paths and combo['positions']:
+                    self._offer_binding(binding, layer, tuple(combo['positions']))
+        self.keys = {char: key[1:] for char, key in self.keys.items()}
+
+
+class CorpusCounter:
+    """Streams text and accumulates character and bigram counts.
+
+    Characters outside the CharMap share one "unmapped" id. With NumPy a
+    chunk is converted to code points and counted with ``bincount``; the
+    fallback counts characters and character pairs with ``Counter``.
+    """
+
+    def __init__(self, charmap: CharMap, use_numpy: bool = True):
+        self.charmap = charmap
+        self.size = len(charmap.chars) + 1
+        self.unmapped = self.size - 1
+        self.backend = 'numpy' if use_numpy and np is not None else 'python'
+        # The stream starts after an unmapped "character", so the first key is a layer change
+        self.previous = None
+        if self.backend == 'numpy':
+            top = max((ord(char) for char in charmap.chars), default=0) + 1
+            self.table = np.full(top + 1, self.unmapped, dtype=np.int64)
+            for char, index in charmap.ids.items():
+                self.table[ord(char)] = index
+            self.char_counts = np.zeros(self.size, dtype=np.int64)
+            self.pair_counts = np.zeros(self.size * self.size, dtype=np.int64)
+        else:
+            self.char_counter = Counter()
+            self.pair_counter = Counter()
+
+    def feed(self, text: str):
+        """Count one chunk of text, continuing bigrams across chunk boundaries."""
+        if not text:
+            return
+        if self.backend == 'numpy':
+            codes = np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32)
+            ids = self.table[np.minimum(codes, len(self.table) - 1)]
+            self.char_counts += np.bincount(ids, minlength=self.size)
+            previous = self.unmapped if self.previous is None else self.previous
+            pairs = np.concatenate(([previous], ids[:-1])) * self.size + ids
+            self.pair_counts += np.bincount(pairs, minlength=self.size * self.size)
+            self.previous = int(ids[-1])
+        else:
+            previous = '\0' if self.previous is None else self.previous
+            self.char_counter.update(text)
+            self.pair_counter.update(map(operator.add, previous + text[:-1], text))
+            self.previous = text[-1]
+
+    def feed_file(self, stream, chunk_size: int = CHUNK_SIZE):
+        """Decode and count a binary stream chunk by chunk."""
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        while True:
+            data = stream.read(chunk_size)
+            if not data:
+                break
+            self.feed(decoder.decode(data))
+        self.feed(decoder.decode(b'', final=True))
+
+    def counts(self) -> Tuple[List[int], Dict[Tuple[int, int], int]]:
+        """Character counts by id and nonzero bigram counts by id pair."""
+        if self.backend == 'numpy':
+            chars = self.char_counts.tolist()
+            nonzero = np.flatnonzero(self.pair_counts)
+            pairs = {(int(index) // self.size, int(index) % self.size): int(self.pair_counts[index])
+                     for index in nonzero}
+            return chars, pairs
+        ids = self.charmap.ids
+        chars = [0] * self.size
+        for char, count in self.char_counter.items():
+            chars[ids.get(char, self.unmapped)] += count
+        pairs = Counter()
+        for pair, count in self.pair_counter.items():
+            pairs[ids.get(pair[0], self.unmapped), ids.get(pair[1], self.unmapped)] += count
+        return chars, dict(pairs)
+
+
+def analyze(counter: CorpusCounter, layout: KeyboardLayout) -> Dict:
+    """Derive per-key presses, layer switches, hold-tap use and bigram rates."""
+    charmap = counter.charmap
+    parser = charmap.parser
+    chars, pairs = counter.counts()
+    unmapped = counter.unmapped
+    keys = [charmap.keys[char] for char in charmap.chars]
+    key_count = max(layout.key_count, max((len(layer) for layer in parser.layers.values()), default=0))
+
+    presses = [0] * key_count
+    layer_presses = dict.fromkeys(charmap.layer_names, 0)
+    holds = Counter()
+    for index, (layer, positions, shift) in enumerate(keys):
+        count = chars[index]
+        for position in positions:
+            presses[position] += count
+        layer_presses[charmap.layer_names[layer]] += count
+        if shift is not None:
+            presses[shift] += count
+            holds[shift] += count
+
+    # Layer keys are pressed once per run of characters on the same layer
+    layer_switches = 0
+    same_hand = same_finger = bigrams = 0
+    fingers = charmap.fingers
+    for (first, second), count in pairs.items():
+        if second == unmapped:
+            continue
+        layer = keys[second][0]
+        if layer and (first == unmapped or keys[first][0] != layer):
+            layer_switches += count
+            for position in charmap.paths[layer]:
+                presses[position] += count
+                holds[position] += count
+        if first == unmapped:
+            continue
+        bigrams += count
+        # A combo counts as its first key for the hand and finger statistics
+        a, b = keys[first][1][0], keys[second][1][0]
+        finger_a, finger_b = fingers.get(a), fingers.get(b)
+        if finger_a and finger_b and finger_a[0] == finger_b[0]:
+            same_hand += count
+            if finger_a == finger_b and a != b:
+                same_finger += count
+
+    hold_taps = {}
+    for position, binding in enumerate(parser.layers[charmap.layer_names[0]]):
+        kind, hold, _ = charmap.split(binding)
+        if kind and binding.behavior not in ('kp', 'mo'):
+            hold_taps[position] = {
+                'binding': str(binding),
+                'kind': kind,
+                'taps': presses[position] - holds[position],
+                'holds': holds[position],
+            }
+
+    finger_presses = Counter()
+    for position, count in enumerate(presses):
+        finger = fingers.get(position)
+        if finger and count:
+            finger_presses[('left ' if finger[0] == 'L' else 'right ') + FINGER_NAMES.get(finger[1], finger[1])] += count
+
+    return {
+        'backend': counter.backend,
+        'characters': sum(chars),
+        'unmapped': chars[unmapped],
+        'presses': presses,
+        'layer_presses': layer_presses,
+        'layer_switches': layer_switches,
+        'hold_taps': hold_taps,
+        'finger_presses': dict(finger_presses.most_common()),
+        'bigrams': bigrams,
+        'same_hand_rate': same_hand / bigrams if bigrams else 0.0,
+        'same_finger_rate': same_finger / bigrams if bigrams else 0.0,
+    }
+
+
+def heatmap(report: Dict, layout: KeyboardLayout) -> str:
+    """Share of all key presses per position, drawn on the layer-table grid."""
+    total = sum(report['presses'])
+    width = layout.cell_width
+    labels = []
+    for count in report['presses']:
+        share = 100 * count / total if total else 0.0
+        label = f"{share:.1f}" if share < 99.95 else '100'
+        labels.append(label[:width] if count else '')
+    return layout.render(labels, fill='')
+
+
+def format_text(report: Dict, layout: KeyboardLayout) -> str:
+    """Heatmap followed by the summary statistics."""
+    lines = ["Key presses (% of total):", heatmap(report, layout), ""]
+    mapped = report['characters'] - report['unmapped']
+    lines.append(f"characters: {report['characters']} ({report['unmapped']} not on the keymap)")
+    lines.append(f"key presses: {sum(report['presses'])} for {mapped} typed characters")
+    lines.append(f"layer switches: {report['layer_switches']}")
+    for name, count in report['layer_presses'].items():
+        if count:
+            lines.append(f"  {name}: {count}")
+    lines.append(f"same-hand bigrams: {report['same_hand_rate']:.1%}")
+    lines.append(f"same-finger bigrams: {report['same_finger_rate']:.1%}")
+    if report['hold_taps']:
+        lines.append("hold-taps (base layer):")
+        for position, usage in report['hold_taps'].items():
+            lines.append(f"  {position:>3} {usage['binding']:<18} taps {usage['taps']:>10}  holds {usage['holds']:>10}")
+    return '\n'.join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point."""
+    arg_parser = argparse.ArgumentParser(description="Analyze a typing corpus against a ZMK keymap.")
+    arg_parser.add_argument('corpus', nargs='+', help="text files to analyze, or - for stdin")
+    arg_parser.add_argument('--keymap', default=os.path.join(SCRIPT_DIR, 'clickety_split_pepito.keymap'))
+    arg_parser.add_argument('--layout', metavar='JSON',
+                            help="physical layout file (default: the README generator's choice)")
+    arg_parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help="bytes read per chunk")
+    arg_parser.add_argument('--no-numpy', action='store_true', help="use the pure-Python counter")
+    arg_parser.add_argument('--json', metavar='PATH', help="also write the full report as JSON")
+    args = arg_parser.parse_args(argv)
+
+    layout = KeyboardLayout.from_json(args.layout) if args.layout else None
+    parser = ZMKKeymapParser(args.keymap, '', layout=layout)
+    try:
+        parser.parse_keymap()
+        charmap = CharMap(parser, finger_map(parser.layout))
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+    counter = CorpusCounter(charmap, use_numpy=not args.no_numpy)
+    for path in args.corpus:
+        try:
+            if path == '-':
+                counter.feed_file(sys.stdin.buffer, args.chunk_size)
+            else:
+                with open(path, 'rb') as f:
+                    counter.feed_file(f, args.chunk_size)
+        except OSError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return 1
+
+    report = analyze(counter, parser.layout)
+    print(format_text(report, parser.layout))
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+            f.write('\n')
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())